@@ -1,13 +1,18 @@
 import os
 import datetime
 import time
-import feedparser
 import ollama
 from google import genai
 from openai import OpenAI
 from PyQt6.QtCore import QThread, pyqtSignal
 import akshare as ak
 import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from news_cache import HeadlineScoreCache
+from news_fetcher import FeedFetcher
 
 # ================= 配置区域 =================
 # 1. Gemini 配置
@@ -15,9 +20,15 @@ GEMINI_MODEL = "models/gemini-2.5-flash"
 
 # 2. DeepSeek 配置
 DEEPSEEK_MODEL = "deepseek-reasoner"
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+# 专家委员会的总截止时间 (秒)：两位专家并发调用，超时未返回的一方本轮弃权
+COMMITTEE_DEADLINE = 120
 
 # 3. LocalModel 配置
 LOCAL_LLM_MODEL = "qwen3:8b"
+LOCAL_BATCH_SIZE = 12  # 每个 prompt 打包的新闻条数
+LOCAL_MAX_INFLIGHT = 2  # 同时发往 Ollama 的请求数上限
 
 
 # ===========================================
@@ -26,24 +37,30 @@ class AIAgent(QThread):
     # 信号: (分析文本, 打分, 新闻列表)
     ai_advice_signal = pyqtSignal(str, int, list)
 
-    def __init__(self, api_config=None):
+    PROVIDER_NAMES = {'deepseek': 'DeepSeek', 'gemini': 'Gemini'}
+
+    def __init__(self, api_config=None, news_sources=None):
         super().__init__()
         self.is_running = True
         self.last_analysis_time = None
         self.last_news_fingerprint = ""
 
-        # 从配置中读取 Key
-        self.gemini_key = ""
-        self.deepseek_key = ""
-        if api_config:
-            self.gemini_key = api_config.get('gemini', '')
-            self.deepseek_key = api_config.get('deepseek', '')
+        # 从配置中读取 Key (base_url 可指向本地模拟服务，便于测试)
+        api_config = api_config or {}
+        self.gemini_key = api_config.get('gemini', '')
+        self.deepseek_key = api_config.get('deepseek', '')
+        gemini_base_url = api_config.get('gemini_base_url')
+        deepseek_base_url = api_config.get('deepseek_base_url', DEEPSEEK_BASE_URL)
+        self.committee_deadline = api_config.get('committee_deadline', COMMITTEE_DEADLINE)
 
         # --- 初始化 Gemini ---
         self.gemini_client = None
         if self.gemini_key:
             try:
-                self.gemini_client = genai.Client(api_key=self.gemini_key)
+                # 与 DeepSeek 一样给 HTTP 请求设超时 (genai 的 timeout 单位为毫秒)，超时的请求不会在后台一直挂着
+                http_options = {'timeout': int(self.committee_deadline * 1000)}
+                if gemini_base_url: http_options['base_url'] = gemini_base_url
+                self.gemini_client = genai.Client(api_key=self.gemini_key, http_options=http_options)
                 print("[AI Agent] Gemini 客户端加载成功")
             except Exception as e:
                 print(f"[AI Agent] Gemini 初始化失败: {e}")
@@ -55,14 +72,26 @@ class AIAgent(QThread):
                 # DeepSeek 使用 OpenAI 兼容接口
                 self.ds_client = OpenAI(
                     api_key=self.deepseek_key,
-                    base_url="https://api.deepseek.com"
+                    base_url=deepseek_base_url,
+                    timeout=self.committee_deadline
                 )
                 print("[AI Agent] DeepSeek 客户端加载成功")
             except Exception as e:
                 print(f"[AI Agent] DeepSeek 初始化失败: {e}")
 
+        # --- 专家委员会：并发调用 + 每个专家的耗时/超时统计 ---
+        self._committee_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="committee")
+        self._stats_lock = threading.Lock()
+        self.provider_stats = {name: {'calls': 0, 'ok': 0, 'errors': 0, 'timeouts': 0,
+                                      'last_latency': None, 'avg_latency': None}
+                               for name in self.PROVIDER_NAMES}
+
         # --- 初始化本地 Ollama ---
         print(f"[AI Agent] 本地过滤器已启用，目标模型: {LOCAL_LLM_MODEL}")
+        # 逐条新闻的本地打分缓存 (跨重启保留)，只有新标题才送去 Ollama
+        self.score_cache = HeadlineScoreCache("news_score_cache.json")
+        # 新闻源可插拔：默认见 news_fetcher.DEFAULT_NEWS_SOURCES
+        self.news_fetcher = FeedFetcher(news_sources)
 
     def _get_sentry_mode_config(self):
         """
@@ -97,80 +126,15 @@ class AIAgent(QThread):
         """
         获取全球混合新闻源 (英文优先 + 中文兜底)
         """
-        news_data = []
-
-        # === 配置高质量英文源 (优先级: 高) ===
-        rss_sources_en = [
-            # 1. CNBC 全球市场 (宏观/美联储)
-            {
-                "url": "https://search.cnbc.com/rs/search/combinedcms/view.xml?partnerId=wrss01&id=10000664",
-                "tag": "[CNBC]"
-            },
-            # 2. FXStreet (外汇/黄金/加密 交易员必看)
-            {
-                "url": "https://www.fxstreet.com/rss/news",
-                "tag": "[FXStreet]"
-            },
-            # 3. Investing.com 英文版 (大宗商品)
-            {
-                "url": "https://www.investing.com/rss/news_25.rss",
-                "tag": "[Inv-US]"
-            }
-        ]
-
-        # === 配置中文源 (作为补充) ===
-        rss_sources_cn = [
-            # Investing.com 中文版
-            {
-                "url": "https://cn.investing.com/rss/news_285.rss",
-                "tag": "[Inv-CN]"
-            }
-        ]
-
-        # 1. 抓取英文源 (每个源抓前 10 条)
+        # 1. 并发抓取全部 RSS 源 (带超时 + ETag/Last-Modified 条件请求)
         # print("[AI Agent] 正在连接华尔街英文情报源...")
-        for source in rss_sources_en:
-            try:
-                # 设置超时，防止连不上外网导致卡死
-                feed = feedparser.parse(source["url"])
-
-                # 检查是否成功 (feedparser 不会抛异常，要检查 bozo 或 status)
-                if hasattr(feed, 'status') and feed.status != 200:
-                    print(f"  -> {source['tag']} 连接失败 (Status: {feed.status})")
-                    continue
+        news_data = self.news_fetcher.fetch_all()
 
-                count = 0
-                for entry in feed.entries:
-                    # 简单的关键词过滤，确保和钱有关 (可选)
-                    # if any(k in entry.title.lower() for k in ['gold', 'usd', 'fed', 'rate', 'cpi', 'data']):
-                    news_data.append({
-                        'title': f"{source['tag']} {entry.title}",  # 加上来源标签
-                        'link': entry.link,
-                        'lang': 'en'
-                    })
-                    count += 1
-                    if count >= 8: break  # 每个英文源只取最新 8 条
-                # print(f"  -> {source['tag']} 获取成功: {count} 条")
-            except Exception as e:
-                print(f"  -> {source['tag']} 解析错误: {e}")
-
-        # 2. 抓取中文源 (作为补充，抓 5 条)
-        for source in rss_sources_cn:
-            try:
-                feed = feedparser.parse(source["url"])
-                for entry in feed.entries[:5]:
-                    news_data.append({
-                        'title': f"{source['tag']} {entry.title}",
-                        'link': entry.link,
-                        'lang': 'cn'
-                    })
-            except:
-                pass
-
-        # 3. AkShare 兜底 (如果 RSS 全挂了)
+        # 2. AkShare 兜底 (如果 RSS 全挂了)
         if len(news_data) < 5:
             try:
-                df = ak.stock_news_em(symbol="601899")
+                df = self.news_fetcher.submit(ak.stock_news_em, symbol="601899").result(
+                    timeout=self.news_fetcher.timeout)
                 for index, row in df.head(5).iterrows():
                     news_data.append({
                         'title': f"[AkShare] {row['新闻标题']}",
@@ -180,7 +144,7 @@ class AIAgent(QThread):
             except:
                 pass
 
-        # 4. 去重 (防止同一条新闻中英文重复发，虽然标题不同很难完全去重，但防一下完全一样的)
+        # 3. 去重 (防止同一条新闻中英文重复发，虽然标题不同很难完全去重，但防一下完全一样的)
         unique_news = []
         seen_titles = set()
         for n in news_data:
@@ -190,46 +154,124 @@ class AIAgent(QThread):
                 unique_news.append(n)
                 seen_titles.add(clean_title)
 
-        # 5. 排序与截断 (为了 token 考虑，总共保留 35 条给本地 LLM 筛选)
+        # 4. 排序与截断 (为了 token 考虑，总共保留 35 条给本地 LLM 筛选)
         # 英文放前面
         unique_news.sort(key=lambda x: x['lang'] == 'cn')  # False(0) 在前，True(1) 在后 -> 英文在前
 
         # print(f"[AI Agent] 情报聚合完毕，共 {len(unique_news)} 条 (英文优先)。")
         return unique_news[:35]
 
+    def _score_single(self, title):
+        """逐条打分 (批量结果解析失败时的兜底)，推理出错返回 None"""
+        # 极简 Prompt，追求速度
+        prompt = f"判断新闻对黄金/美元的影响(0-10分)，只返回一个数字。新闻：{title}"
+        try:
+            response = ollama.generate(model=LOCAL_LLM_MODEL, prompt=prompt)
+            content = response['response'].strip()
+
+            # 提取数字
+            match = re.search(r'\d+', content)
+            return max(0, min(10, int(match.group()))) if match else 0
+        except Exception as e:
+            print(f"[Local LLM] 推理错误: {e}")
+            return None
+
+    @staticmethod
+    def _parse_batch_scores(content, n):
+        """
+        解析批量打分结果，期望 {"scores": [..]} (JSON 模式)；
+        兼容模型直接输出数组或 "1: 7" 逐行格式。条数对不上返回 None
+        """
+        scores = None
+        try:
+            data = json.loads(content)
+            if isinstance(data, dict):
+                data = data.get('scores', next(iter(data.values()), None))
+            if isinstance(data, list): scores = data
+        except:
+            pass
+
+        if scores is None:
+            pairs = re.findall(r'^\s*(\d+)\s*[.:：、)\]]\s*(\d+)', content, re.M)
+            found = {int(i): int(v) for i, v in pairs}
+            if set(found) == set(range(1, n + 1)):
+                scores = [found[i] for i in range(1, n + 1)]
+
+        if scores is None or len(scores) != n: return None
+        try:
+            return [max(0, min(10, int(round(float(v))))) for v in scores]
+        except:
+            return None
+
+    def _score_batch(self, titles):
+        """一个 prompt 给多条新闻打分；结构化解析失败时退化为逐条调用"""
+        if len(titles) == 1: return [self._score_single(titles[0])]
+
+        lines = "\n".join(f"{i}. {t}" for i, t in enumerate(titles, 1))
+        prompt = (
+            f"判断下面 {len(titles)} 条新闻各自对黄金/美元的影响(0-10分)。\n"
+            f'只返回 JSON: {{"scores": [按编号顺序的 {len(titles)} 个整数]}}\n'
+            f"新闻：\n{lines}"
+        )
+        try:
+            response = ollama.generate(model=LOCAL_LLM_MODEL, prompt=prompt, format='json')
+            scores = self._parse_batch_scores(response['response'].strip(), len(titles))
+            if scores is not None: return scores
+            print(f"[Local LLM] 批量结果无法解析，改为逐条打分 ({len(titles)} 条)")
+        except Exception as e:
+            print(f"[Local LLM] 批量推理错误: {e}，改为逐条打分")
+        return [self._score_single(t) for t in titles]
+
+    def _score_titles(self, titles):
+        """
+        返回与 titles 等长的分数列表 (推理失败的为 None)
+        先查打分缓存，只把没见过的标题按批切分并发打分 (在途请求数不超过 LOCAL_MAX_INFLIGHT)
+        """
+        scores = [self.score_cache.get(t, LOCAL_LLM_MODEL) for t in titles]
+        keys = [HeadlineScoreCache.key(t) for t in titles]
+        # 按缓存键去重：同一条新闻换了来源标签/大小写也只打分一次
+        first = {}
+        for title, k, s in zip(titles, keys, scores):
+            if s is None: first.setdefault(k, title)
+        pending = list(first.values())
+
+        batches = [pending[i:i + LOCAL_BATCH_SIZE] for i in range(0, len(pending), LOCAL_BATCH_SIZE)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(LOCAL_MAX_INFLIGHT, len(batches))) as pool:
+                results = list(pool.map(self._score_batch, batches))
+            fresh = dict(zip(first, (score for batch in results for score in batch)))
+
+            for title, score in zip(pending, fresh.values()):
+                # 推理失败的不缓存，下一轮重试
+                if score is not None: self.score_cache.put(title, LOCAL_LLM_MODEL, score)
+            scores = [fresh[k] if s is None else s for k, s in zip(keys, scores)]
+        # 命中也会刷新最近使用时间，一并落盘
+        self.score_cache.flush()
+
+        if len(pending) < len(titles):
+            print(f"[Local LLM] 缓存命中 {len(titles) - len(pending)} 条，新打分 {len(pending)} 条")
+        return scores
+
     def _filter_by_local_llm(self, news_list):
         """
         [核心功能] 使用本地显卡 (Ollama) 快速过滤新闻
+        多条新闻打包进一个 prompt 批量打分，几次往返即可扫完全部新闻
         """
         if not news_list: return []
 
         # print(f"[Local LLM] 正在筛选 {len(news_list)} 条新闻...")
         high_value_news = []
-
-        for news in news_list:
-            # 极简 Prompt，追求速度
-            prompt = f"判断新闻对黄金/美元的影响(0-10分)，只返回一个数字。新闻：{news['title']}"
-
-            try:
-                # 调用本地 Ollama
-                response = ollama.generate(model=LOCAL_LLM_MODEL, prompt=prompt)
-                content = response['response'].strip()
-
-                # 提取数字
-                match = re.search(r'\d+', content)
-                score = int(match.group()) if match else 0
-
-                # 筛选阈值：6分以上保留
-                if score >= 6:
-                    print(f"  ★ 保留 [{score}分]: {news['title']}")
-                    # 可以在这里把本地分数也存进去，供云端参考
-                    news['local_score'] = score
-                    high_value_news.append(news)
-                # else:
-                #     print(f"  pass [{score}分]: {news['title']}")
-
-            except Exception as e:
-                print(f"[Local LLM] 推理错误: {e}")
+        scores = self._score_titles([news['title'] for news in news_list])
+
+        for news, score in zip(news_list, scores):
+            # 筛选阈值：6分以上保留
+            if score is not None and score >= 6:
+                print(f"  ★ 保留 [{score}分]: {news['title']}")
+                # 可以在这里把本地分数也存进去，供云端参考
+                news['local_score'] = score
+                high_value_news.append(news)
+            # else:
+            #     print(f"  pass [{score}分]: {news['title']}")
 
         print(f"[Local LLM] 筛选完毕，剩余 {len(high_value_news)} 条关键情报。")
         return high_value_news
@@ -287,6 +329,53 @@ class AIAgent(QThread):
             print(f"[DeepSeek Error] {e}")
             return None
 
+    def _record_provider(self, name, outcome, latency=None):
+        """更新专家统计；outcome 为 ok / errors / timeouts"""
+        with self._stats_lock:
+            st = self.provider_stats[name]
+            st[outcome] += 1
+            if latency is not None:
+                st['last_latency'] = latency
+                # 只对成功的调用做滑动平均
+                st['avg_latency'] = latency if st['avg_latency'] is None else 0.8 * st['avg_latency'] + 0.2 * latency
+
+    @staticmethod
+    def _timed_call(func, prompt):
+        start = time.perf_counter()
+        text = func(prompt)
+        return text, time.perf_counter() - start
+
+    def _consult_committee(self, prompt):
+        """
+        DeepSeek / Gemini 并发调用，总耗时 ≈ 较慢的一方，且不超过 committee_deadline
+        返回 {'deepseek': text 或 None, 'gemini': text 或 None}，超时的专家记为 None
+        """
+        experts = {}
+        if self.ds_client: experts['deepseek'] = self._call_deepseek
+        if self.gemini_client: experts['gemini'] = self._call_gemini
+
+        futures = {}
+        for name, func in experts.items():
+            with self._stats_lock:
+                self.provider_stats[name]['calls'] += 1
+            futures[name] = self._committee_pool.submit(self._timed_call, func, prompt)
+        if futures:
+            print(f"--> {' + '.join(self.PROVIDER_NAMES[n] for n in futures)} 并行思考中...")
+            wait(futures.values(), timeout=self.committee_deadline)
+
+        results = {'deepseek': None, 'gemini': None}
+        for name, future in futures.items():
+            if future.done():
+                text, latency = future.result()
+                results[name] = text
+                self._record_provider(name, 'ok' if text else 'errors', latency if text else None)
+            else:
+                # 超时的请求留在后台自行结束，结果丢弃
+                future.cancel()
+                self._record_provider(name, 'timeouts')
+                print(f"[{self.PROVIDER_NAMES[name]}] 超过 {self.committee_deadline}s 未返回，本轮弃权")
+        return results
+
     def _extract_score(self, text):
         """辅助函数：从文本中提取分数"""
         if not text: return 0
@@ -349,6 +438,9 @@ class AIAgent(QThread):
                     if n.get('local_score', 0) >= score_threshold:
                         high_value_news.append(n)
 
+                # 本地筛选期间可能已经 stop()，不再发起云端调用
+                if not self.is_running: break
+
                 # 如果全是垃圾新闻 (比如 "某公司股价微跌")，本地 LLM 拦截，不打扰云端
                 if not high_value_news:
                     print(f"[AI Agent] 虽有新新闻，但未达到哨兵模式阈值 ({score_threshold}分)，忽略。")
@@ -359,22 +451,12 @@ class AIAgent(QThread):
                 # print(f"[AI Agent] 提交 {len(high_value_news)} 条关键情报给云端...")
                 prompt = self._generate_prompt(high_value_news, "实盘")
 
-                text_ds = None
-                score_ds = 0
-                text_gemini = None
-                score_gemini = 0
-
-                # 尝试 DeepSeek
-                if self.ds_client:
-                    print("--> DeepSeek 思考中...")
-                    text_ds = self._call_deepseek(prompt)
-                    score_ds = self._extract_score(text_ds)
-
-                # 尝试 Gemini
-                if self.gemini_client:
-                    print("--> Gemini 思考中...")
-                    text_gemini = self._call_gemini(prompt)
-                    score_gemini = self._extract_score(text_gemini)
+                # 两位专家并发调用，截止时间内没回来的一方按缺席处理 (下面的加权自动退化为单专家)
+                answers = self._consult_committee(prompt)
+                text_ds = answers['deepseek']
+                score_ds = self._extract_score(text_ds)
+                text_gemini = answers['gemini']
+                score_gemini = self._extract_score(text_gemini)
 
                 # === 加权决策计算 ===
                 final_score = 0
@@ -414,12 +496,21 @@ class AIAgent(QThread):
 
             except Exception as e:
                 print(f"[Agent Loop Error] {e}")
-                self.ai_advice_signal.emit(f"系统错误: {e}", 0, [])
+                if self.is_running: self.ai_advice_signal.emit(f"系统错误: {e}", 0, [])
 
             # 休息
             for _ in range(100):
                 if not self.is_running: break
                 self.msleep(100)
 
+        # 线程池在循环退出后才关闭：stop() 时正在进行的这一轮不会 submit 到已关闭的池
+        self._close_pools()
+
     def stop(self):
-        self.is_running = False
\ No newline at end of file
+        self.is_running = False
+        # 线程没在运行 (未启动/已退出) 时由这里关闭，否则交给 run() 收尾
+        if not self.isRunning(): self._close_pools()
+
+    def _close_pools(self):
+        self.news_fetcher.close()
+        self._committee_pool.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+
+class BarRingBuffer:
+    """
+    预分配的 K 线环形缓冲区 (OHLCV + int64 纳秒时间戳)
+    每个值同时写入 [i] 和 [i + capacity] 两处，使得任意时刻的有序窗口都是一段连续内存，
+    取视图不需要拷贝；追加新 K 线 / 改写当前 K 线都是 O(1) 且不分配内存
+    紧凑模式：dtype=np.float32 价格占用减半；with_volume=False 不存成交量 (实时报价没有成交量，
+    读取时按全 0 处理)，月级别的分钟 K 线也能常驻内存
+    """
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+    OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+    def __init__(self, capacity=3000, dtype=np.float64, with_volume=True):
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.with_volume = with_volume
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._ohlcv = np.zeros((len(self.COLUMNS) if with_volume else self.VOLUME, 2 * self.capacity),
+                               dtype=self.dtype)
+        self.start = 0
+        self.size = 0
+        self.version = 0  # 每次写入自增，供外部判断缓存是否过期
+        # 整体重建 (清空/载入历史) 时自增：中间的 K 线可能被改写，增量状态 (指标/绘图缓存) 必须全量重算
+        # 满了以后追加挤掉最旧一根只是窗口滑动，不算重建：消费者靠首根时间戳识别，照常走增量路径
+        self.generation = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def empty(self):
+        return self.size == 0
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+        self.version += 1
+        self.generation += 1
+
+    def append(self, ts_ns, open_, high, low, close, volume=0.0):
+        """追加一根新 K 线，满了就挤掉最旧的一根"""
+        w = (self.start + self.size) % self.capacity
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.size += 1
+
+        bars = self._ohlcv
+        for i in (w, w + self.capacity):
+            self._ts[i] = ts_ns
+            bars[self.OPEN, i] = open_
+            bars[self.HIGH, i] = high
+            bars[self.LOW, i] = low
+            bars[self.CLOSE, i] = close
+            if self.with_volume: bars[self.VOLUME, i] = volume
+        self.version += 1
+
+    def update_last(self, price):
+        """同一分钟内的跳动：原地更新最后一根的 High/Low/Close"""
+        w = (self.start + self.size - 1) % self.capacity
+        bars = self._ohlcv
+        for i in (w, w + self.capacity):
+            bars[self.CLOSE, i] = price
+            if price > bars[self.HIGH, i]: bars[self.HIGH, i] = price
+            if price < bars[self.LOW, i]: bars[self.LOW, i] = price
+        self.version += 1
+
+    def last_ts(self):
+        return int(self._ts[self.start + self.size - 1]) if self.size else None
+
+    def last(self, col):
+        if col >= len(self._ohlcv): return 0.0
+        return float(self._ohlcv[col, self.start + self.size - 1])
+
+    @staticmethod
+    def _readonly(view):
+        # 只锁视图本身，缓冲区照常写入
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self):
+        """按时间顺序的 int64 时间戳视图 (零拷贝，只读)"""
+        return self._readonly(self._ts[self.start:self.start + self.size])
+
+    def column(self, col):
+        """按时间顺序的单列视图 (零拷贝，只读)；未存储的成交量列返回全 0"""
+        if col >= len(self._ohlcv): return self._readonly(np.zeros(self.size, dtype=self.dtype))
+        return self._readonly(self._ohlcv[col, self.start:self.start + self.size])
+
+    def columns(self):
+        """实际存储的各列视图 {列名: 数组} (零拷贝，只读)"""
+        return {col: self.column(i) for i, col in enumerate(self.COLUMNS[:len(self._ohlcv)])}
+
+    @property
+    def nbytes(self):
+        return self._ts.nbytes + self._ohlcv.nbytes
+
+    def load_frame(self, df):
+        """整体替换为一个 OHLCV DataFrame (超出容量只保留最近的部分)"""
+        self.clear()
+        if df is None or df.empty: return
+        df = df.iloc[-self.capacity:]
+        n = len(df)
+
+        ts = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').view(np.int64)
+        self._ts[:n] = ts
+        self._ts[self.capacity:self.capacity + n] = ts
+        for i, col in enumerate(self.COLUMNS[:len(self._ohlcv)]):
+            values = df[col].to_numpy(dtype=self.dtype) if col in df.columns else np.zeros(n, dtype=self.dtype)
+            self._ohlcv[i, :n] = values
+            self._ohlcv[i, self.capacity:self.capacity + n] = values
+        self.size = n
+
+    def to_frame(self):
+        """按需构建 DataFrame (拷贝一份，不与缓冲区共享内存)"""
+        index = pd.DatetimeIndex(self.timestamps().astype('datetime64[ns]'))
+        data = {col: values.copy() for col, values in self.columns().items()}
+        return pd.DataFrame(data, index=index)
@@ -0,0 +1,162 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bar_buffer import BarRingBuffer
+from bar_store import BarLog
+
+
+DAY_NS = 24 * 3600 * 10 ** 9
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _lock_for(root):
+    """同一进程里指向同一目录的多个 BarDatabase 共用一把写锁 (如界面与优化器各有一个 DataHandler)"""
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(os.path.abspath(root), threading.Lock())
+
+
+class BarDatabase:
+    """
+    本地 K 线库：按天分区的二进制文件 (<root>/YYYY-MM-DD.bin)，记录格式与 BarLog 相同 (48 字节定长)
+    1. 每个分区内按时间戳严格递增；新数据都在末尾时直接追加，只有与已存数据重叠时才原子地重写该分区
+    2. 读取时先对分区文件名二分定位，再在 mmap 的时间戳列上 searchsorted，只拷贝命中的区间
+    3. meta.json 记录最近一次联网回填的时间，用于跳过重复下载
+    """
+    MAGIC = b"QBARDB01"
+    RECORD = BarLog.RECORD
+
+    def __init__(self, root):
+        self.root = root
+        self.meta_path = os.path.join(root, "meta.json")
+        os.makedirs(root, exist_ok=True)
+        self._lock = _lock_for(root)
+        self._partitions = None  # 已排序的分区名 (YYYY-MM-DD)
+
+    # --- 分区管理 ---
+    @staticmethod
+    def _day_name(day_ns):
+        return pd.Timestamp(day_ns).strftime('%Y-%m-%d')
+
+    def _path(self, name):
+        return os.path.join(self.root, name + ".bin")
+
+    def partitions(self):
+        if self._partitions is None:
+            self._partitions = sorted(f[:-4] for f in os.listdir(self.root) if f.endswith(".bin"))
+        return self._partitions
+
+    def _records(self, name):
+        """mmap 读取一个分区 (只读视图；文件损坏/为空返回空数组)"""
+        path = self._path(name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=self.RECORD)
+        n = (size - len(self.MAGIC)) // self.RECORD.itemsize
+        if n <= 0: return np.empty(0, dtype=self.RECORD)
+        return np.memmap(path, dtype=self.RECORD, mode='r', offset=len(self.MAGIC), shape=(n,))
+
+    # --- 写入 ---
+    def last_ts(self):
+        """库里最后一根 K 线的时间戳 (ns)；空库返回 None"""
+        for name in reversed(self.partitions()):
+            records = self._records(name)
+            if len(records): return int(records['ts'][-1])
+        return None
+
+    def write(self, df):
+        """写入一段 OHLCV K 线 (可与已存数据重叠，重叠部分以新数据为准)；返回新增/改写的记录数"""
+        if df is None or df.empty: return 0
+        records = np.empty(len(df), dtype=self.RECORD)
+        records['ts'] = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').view(np.int64)
+        for col in BarRingBuffer.COLUMNS:
+            records[col] = df[col].to_numpy(dtype=np.float64) if col in df.columns else 0.0
+        records = records[np.argsort(records['ts'], kind='stable')]
+
+        with self._lock:
+            days = records['ts'] - records['ts'] % DAY_NS
+            bounds = np.flatnonzero(np.diff(days)) + 1
+            for chunk in np.split(records, bounds):
+                self._write_partition(self._day_name(int(chunk['ts'][0] - chunk['ts'][0] % DAY_NS)), chunk)
+            self._partitions = None
+        return len(records)
+
+    def _write_partition(self, name, chunk):
+        # 同一批数据里的重复时间戳以最后一条为准
+        _, rev_idx = np.unique(chunk['ts'][::-1], return_index=True)
+        chunk = chunk[len(chunk) - 1 - rev_idx]
+
+        path = self._path(name)
+        existing = self._records(name)
+        if len(existing) == 0 or chunk['ts'][0] > existing['ts'][-1]:
+            # 全部在末尾之后：O(新增量) 追加
+            new_file = len(existing) == 0
+            del existing
+            with open(path, 'wb' if new_file else 'ab') as f:
+                if new_file: f.write(self.MAGIC)
+                f.write(chunk.tobytes())
+            return
+
+        # 与已存数据重叠 (如上次保存的最后一根 K 线当时还没收完)：合并后原子重写该分区
+        old = np.array(existing[~np.isin(existing['ts'], chunk['ts'])])
+        del existing
+        merged = np.concatenate([old, chunk])
+        merged = merged[np.argsort(merged['ts'], kind='stable')]
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(merged.tobytes())
+        os.replace(tmp_path, path)
+
+    # --- 读取 ---
+    def read(self, start=None, end=None, max_rows=None):
+        """
+        读取 [start, end] 区间的 K 线 (start/end 可为 Timestamp/datetime/None)，
+        max_rows 只保留最近的若干根；分区和分区内的位置都用二分查找定位
+        """
+        names = self.partitions()
+        start_ns = pd.Timestamp(start).value if start is not None else None
+        end_ns = pd.Timestamp(end).value if end is not None else None
+
+        lo = bisect.bisect_left(names, self._day_name(start_ns - start_ns % DAY_NS)) if start_ns is not None else 0
+        hi = bisect.bisect_right(names, self._day_name(end_ns - end_ns % DAY_NS)) if end_ns is not None else len(names)
+
+        parts, total = [], 0
+        # 从最新的分区往回读，凑够 max_rows 就停
+        for name in reversed(names[lo:hi]):
+            records = self._records(name)
+            ts = records['ts']
+            i = int(np.searchsorted(ts, start_ns, 'left')) if start_ns is not None else 0
+            j = int(np.searchsorted(ts, end_ns, 'right')) if end_ns is not None else len(ts)
+            if j > i:
+                parts.append(np.array(records[i:j]))
+                total += j - i
+            del records, ts
+            if max_rows and total >= max_rows: break
+
+        if not parts: return pd.DataFrame()
+        rows = np.concatenate(parts[::-1])
+        if max_rows: rows = rows[-max_rows:]
+        index = pd.DatetimeIndex(rows['ts'].astype('datetime64[ns]'))
+        return pd.DataFrame({col: rows[col] for col in BarRingBuffer.COLUMNS}, index=index)
+
+    # --- 回填记录 ---
+    def last_fetch(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('fetched_at', 0.0)
+        except:
+            return 0.0
+
+    def mark_fetched(self):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': time.time()}, f)
+        os.replace(tmp_path, self.meta_path)
@@ -0,0 +1,110 @@
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from bar_buffer import BarRingBuffer
+
+
+class BarLog:
+    """
+    定长记录的二进制 K 线日志 (追加写 + 定期压缩)
+    每条记录 48 字节: int64 时间戳(ns) + Open/High/Low/Close/Volume (float64)
+    同一分钟的多次更新直接追加，读取时同一时间戳以最后一条为准；
+    压缩通过 "写临时文件 + os.replace" 原子完成，进程崩溃不会留下写了一半的文件
+    """
+    MAGIC = b"QBARLOG1"
+    RECORD = np.dtype([('ts', '<i8'), ('Open', '<f8'), ('High', '<f8'),
+                       ('Low', '<f8'), ('Close', '<f8'), ('Volume', '<f8')])
+    _PACK = struct.Struct('<q5d')
+
+    def __init__(self, path, compact_after=6000):
+        self.path = path
+        self.compact_after = compact_after  # 日志记录数超过该值时触发压缩
+        self._fh = None
+        self._records = 0
+
+    def _open(self):
+        if self._fh is not None: return
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size >= len(self.MAGIC):
+            with open(self.path, 'rb') as f:
+                valid = f.read(len(self.MAGIC)) == self.MAGIC
+            if not valid:
+                # 与 load() 一致：文件头不对就不是本日志 (旧格式/损坏)，继续追加只会得到读不出的文件
+                print(f"[BarLog] {self.path} 文件头无效，重新建立日志")
+                size = 0
+        if size < len(self.MAGIC):
+            self._fh = open(self.path, 'wb')
+            self._fh.write(self.MAGIC)
+            self._records = 0
+        else:
+            self._fh = open(self.path, 'r+b')
+            # 丢掉崩溃时写了一半的尾部记录，保证后续追加仍按记录对齐
+            self._records = (size - len(self.MAGIC)) // self.RECORD.itemsize
+            self._fh.truncate(len(self.MAGIC) + self._records * self.RECORD.itemsize)
+            self._fh.seek(0, os.SEEK_END)
+
+    def close(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except:
+                pass
+            self._fh = None
+
+    @property
+    def needs_compaction(self):
+        return self._records > self.compact_after
+
+    def append(self, ts_ns, open_, high, low, close, volume=0.0):
+        """追加一条记录 (O(1) 磁盘写入)"""
+        self._open()
+        self._fh.write(self._PACK.pack(ts_ns, open_, high, low, close, volume))
+        self._fh.flush()
+        self._records += 1
+
+    def rewrite(self, bars):
+        """用当前缓冲区 (BarRingBuffer) 的内容原子地重写整个日志"""
+        records = np.empty(len(bars), dtype=self.RECORD)
+        records['ts'] = bars.timestamps()
+        for i, col in enumerate(BarRingBuffer.COLUMNS):
+            records[col] = bars.column(i)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._records = len(records)
+
+    def load(self, max_rows=None):
+        """mmap 读取日志，按时间戳去重 (保留最后一次写入)，返回 OHLCV DataFrame"""
+        if not os.path.exists(self.path): return pd.DataFrame()
+
+        size = os.path.getsize(self.path)
+        n = (size - len(self.MAGIC)) // self.RECORD.itemsize
+        if n <= 0: return pd.DataFrame()
+
+        with open(self.path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC: return pd.DataFrame()
+
+        mm = np.memmap(self.path, dtype=self.RECORD, mode='r', offset=len(self.MAGIC), shape=(n,))
+        try:
+            ts = np.asarray(mm['ts'])
+            # 倒序取 unique 的首次出现 = 正序的最后一次写入，结果按时间排序
+            _, rev_idx = np.unique(ts[::-1], return_index=True)
+            keep = n - 1 - rev_idx
+            if max_rows: keep = keep[-max_rows:]
+            rows = np.array(mm[keep])
+        finally:
+            del mm
+
+        index = pd.DatetimeIndex(rows['ts'].astype('datetime64[ns]'))
+        return pd.DataFrame({col: rows[col] for col in BarRingBuffer.COLUMNS}, index=index)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+
+class ChartPayload:
+    """
+    交易线程发给界面的绘图数据包 (全部是连续的 float64 / 字符串数组，界面线程只需交给 pyqtgraph)
+    changed_from: 该位置之前的 K 线与上一个数据包完全相同 (0 表示需要完整重绘)
+    generation: 数据源的重建代数 (BarRingBuffer.generation)，没有时为 None
+    """
+    __slots__ = ('n', 'x', 'ts', 'open', 'high', 'low', 'close', 'sma_f', 'sma_s', 'bbu', 'bbl', 'rsi',
+                 'tick_labels', 'hover_times', 'changed_from', 'generation')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+
+class ChartPayloadBuilder:
+    """
+    在交易线程里把带指标的 DataFrame 转成 ChartPayload
+    时间标签只格式化新增的 K 线，其余沿用上一个数据包
+    """
+    INDICATORS = {'sma_f': 'SMA_F', 'sma_s': 'SMA_S', 'bbu': 'BBU', 'bbl': 'BBL', 'rsi': 'RSI'}
+
+    def __init__(self):
+        self.last = None
+
+    @staticmethod
+    def _column(columns, col):
+        # 拷贝一份 (同时转成连续的 float64)，数据包发出后与交易线程的数据再无共享
+        return np.array(columns[col], dtype=np.float64) if col in columns else None
+
+    def build(self, df):
+        ts = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').view(np.int64)
+        return self.build_columns(ts, {col: df[col].to_numpy() for col in df.columns})
+
+    def build_columns(self, ts, columns, generation=None):
+        """
+        列式输入：int64 时间戳 + {列名: 数组} (如 check_signal_bars 返回的视图)
+        generation 与上一个数据包不同 (缓冲区被整体重建，中间的 K 线可能已改写) 时强制完整重绘
+        """
+        n = len(ts)
+
+        # 首根时间相同且长度没变短：只有上一包的最后一根 (正在走的 K 线) 之后可能变化
+        # 环形缓冲区满后整体左移，x 坐标全变，需要完整重绘
+        prev = self.last
+        if (prev is not None and prev.n and n >= prev.n and ts[0] == prev.ts[0]
+                and generation == prev.generation):
+            changed_from = prev.n - 1
+        else:
+            changed_from = 0
+
+        index = pd.DatetimeIndex(np.asarray(ts[changed_from:]).astype('datetime64[ns]'))
+        if changed_from:
+            tick_labels = np.concatenate([prev.tick_labels[:changed_from],
+                                          np.asarray(index.strftime('%H:%M'), dtype=object)])
+            hover_times = np.concatenate([prev.hover_times[:changed_from],
+                                          np.asarray(index.strftime('%Y-%m-%d %H:%M:%S'), dtype=object)])
+        else:
+            tick_labels = np.asarray(index.strftime('%H:%M'), dtype=object)
+            hover_times = np.asarray(index.strftime('%Y-%m-%d %H:%M:%S'), dtype=object)
+
+        payload = ChartPayload(
+            n=n, x=np.arange(n, dtype=np.float64), ts=np.array(ts, dtype=np.int64),
+            open=self._column(columns, 'Open'), high=self._column(columns, 'High'),
+            low=self._column(columns, 'Low'), close=self._column(columns, 'Close'),
+            tick_labels=tick_labels, hover_times=hover_times, changed_from=changed_from, generation=generation,
+            **{name: self._column(columns, col) for name, col in self.INDICATORS.items()},
+        )
+        self.last = payload
+        return payload
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import akshare as ak
 import datetime
@@ -5,6 +6,13 @@ import time
 import os
 import atexit
 import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from bar_buffer import BarRingBuffer
+from bar_db import BarDatabase
+from bar_store import BarLog
+from tick_store import TickStore
+from quote_sources import SinaQuoteSource, StreamQuoteSource, CallableQuoteSource, QuoteSourceManager
 
 # === Selenium 依赖 ===
 from selenium import webdriver
@@ -19,21 +27,67 @@ class DataHandler:
     """
     数据调度员 (终极融合版：历史底仓 + 实时爬虫驻留)
     """
+    HISTORY_REFRESH = 300  # 距上次联网回填历史不足该秒数时只读本地 K 线库
+    HISTORY_ROOT = os.path.join("history_db", "au0")  # 历史 K 线库目录 (优化器也从这里只读)
 
-    def __init__(self, max_len=3000):
+    def __init__(self, max_len=3000, sources=None, dtype=np.float64, with_volume=False, stream_url=None):
         # 扩容缓冲区至 3000，以容纳 15分钟级别的月度历史数据
         self.max_len = max_len
         self.symbol = "Au99.99"
-        self.buffer = pd.DataFrame()
-        self.cache_file = "gold_price_cache.csv"
-        self.last_request_time = 0
+        # 逐笔报价 + 1m/5m/15m/1h K 线由 TickStore 从同一报价流增量维护；
+        # 1 分钟 K 线 (预分配的环形缓冲区) 即策略使用的主缓冲区，DataFrame 只在有人读取 buffer 时才构建
+        # 实时报价没有成交量，默认不存 Volume 列；dtype=np.float32 可让价格占用再减半
+        self.ticks = TickStore(bar_capacity=max_len, dtype=dtype, with_volume=with_volume)
+        self.bars = self.ticks.bars['1min']
+        self._frame = pd.DataFrame()
+        self._frame_version = -1
+        # 本地缓存：定长记录的二进制追加日志 (旧版 CSV 缓存只在首次启动时迁移读取)
+        self.cache_file = "gold_price_cache.bin"
+        self.legacy_cache_file = "gold_price_cache.csv"
+        self.store = BarLog(self.cache_file, compact_after=max(2 * max_len, 1000))
+        # 历史 K 线库 (按天分区，增量回填)
+        self.history_db = BarDatabase(self.HISTORY_ROOT)
 
         # === 爬虫专用状态 ===
         self.driver = None
         self.crawler_url = "https://finance.sina.com.cn/futures/quotes/AUTD.shtml"
 
+        # === 报价源 (列表顺序即优先级；可传入自定义列表，测试时可用 FakeQuoteSource) ===
+        # 由 QuoteSourceManager 按健康度路由，故障源自动熔断、后台探测恢复
+        # stream_url：可选的推送行情地址 (按行推送的 SSE/chunked 流)，配置后作为首选源
+        self.sources = list(sources) if sources is not None else self._default_sources(stream_url)
+        self.quotes = QuoteSourceManager(self.sources)
+        self.last_source = None
+        # 后台启动任务 (历史底仓 / 首个实时报价)
+        self._history_job = None
+        self._quote_job = None
+
         # 注册退出时的清理函数
+        atexit.register(self.close_sources)
         atexit.register(self.close_driver)
+        atexit.register(self.store.close)
+
+    def _default_sources(self, stream_url=None):
+        """
+        默认报价源：
+        0. (可选) 推送行情流：后台线程常驻读取，取价只读内存
+        1. 新浪行情 HTTP 接口 (长连接，几十毫秒一次)
+        2. SGE 官方 (AkShare)
+        3. Selenium 网页爬虫 (最后手段：常驻浏览器占内存、每次刷新约 1 秒，只在前两者都失败时才启动)
+        """
+        stream = []
+        if stream_url:
+            source = StreamQuoteSource("Stream", stream_url)
+            source.start()  # 提前连上，首次取价时已有推送
+            stream.append(source)
+        return stream + [
+            SinaQuoteSource("gds_AUTD"),
+            CallableQuoteSource("SGE API", self._fetch_from_sge, min_interval=2),
+            CallableQuoteSource("Selenium", self._fetch_from_crawler, min_interval=2, on_close=self.close_driver),
+        ]
+
+    def close_sources(self):
+        self.quotes.close()
 
     def _init_driver(self):
         """启动驻留式隐形浏览器"""
@@ -108,33 +162,22 @@ class DataHandler:
             # print(f"[Crawler] 读取微小波动: {e}")
             return None
 
+    def _fetch_from_sge(self):
+        """渠道B: SGE 官方行情 (AkShare)"""
+        df = ak.spot_quotations_sge(symbol=self.symbol)
+        if df is not None and not df.empty and '最新价' in df.columns:
+            return float(df['最新价'].iloc[0])
+        return None
+
+    def _fetch_quote(self):
+        """从当前最健康的报价源取价，返回 (price, dt, 来源名)；全部失败返回 (None, None, "None")"""
+        price, dt, name = self.quotes.quote()
+        if price is not None: self.last_source = name
+        return price, dt, name
+
     def _fetch_intraday_data(self):
-        """获取实时数据 (优先爬虫，备用SGE)"""
-        now = time.time()
-        if now - self.last_request_time < 2:
-            time.sleep(1)
-        self.last_request_time = time.time()
-
-        price = None
-        dt = None
-        source_used = "None"
-
-        # 1. 爬虫 (Selenium)
-        res_crawler = self._fetch_from_crawler()
-        if res_crawler:
-            price, dt = res_crawler
-            source_used = "Selenium"
-
-        # 2. SGE 官方 (备用)
-        if price is None:
-            try:
-                df = ak.spot_quotations_sge(symbol=self.symbol)
-                if df is not None and not df.empty and '最新价' in df.columns:
-                    price = float(df['最新价'].iloc[0])
-                    dt = datetime.datetime.now()
-                    source_used = "SGE API"
-            except:
-                pass
+        """获取实时数据 (按报价源顺序：HTTP 接口 -> SGE -> 爬虫)"""
+        price, dt, source_used = self._fetch_quote()
 
         if price is None:
             return pd.DataFrame(), source_used
@@ -151,134 +194,213 @@ class DataHandler:
         except Exception:
             return pd.DataFrame(), source_used
 
-    def fetch_long_history(self, days=30):
+    def fetch_long_history(self, days=30, refresh_interval=None):
         """
-        获取历史数据
-        注意：使用黄金期货主力(Au0)的15分钟线作为历史底仓
+        获取历史数据 (最近 days 天的 1 分钟 K 线，来自本地 K 线库)
+        注意：使用黄金期货主力(Au0)的 1 分钟线作为历史底仓 (5m/15m/1h 由 TickStore 从中聚合)
         原因：spot_hist_sge 是日线数据，无法用于分钟级技术分析。
-             Au0 15分钟线既提供了足够长的历史视窗，又能与实时分钟线平滑衔接。
+             Au0 1 分钟线既提供了足够长的历史视窗，又能与实时分钟线平滑衔接。
+        本地库只回填上次保存之后的新 K 线，历史深度随运行时间累积，不受单次接口返回长度限制；
+        距上次联网回填不足 refresh_interval 秒时直接读库，不再重复下载
         """
+        self._backfill_history(self.HISTORY_REFRESH if refresh_interval is None else refresh_interval)
         try:
-            # period="15" -> 15分钟级别
-            df = ak.futures_zh_minute_sina(symbol="au0", period="1")
-            df.rename(columns={'datetime': 'Datetime', 'open': 'Open', 'high': 'High',
-                               'low': 'Low', 'close': 'Close', 'volume': 'Volume'}, inplace=True)
-            df['Datetime'] = pd.to_datetime(df['Datetime'])
-            df.set_index('Datetime', inplace=True)
-            cols = ['Open', 'High', 'Low', 'Close', 'Volume']
-            df[cols] = df[cols].apply(pd.to_numeric, errors='coerce')
-            return df
-        except Exception:
+            return self.history_db.read(start=pd.Timestamp.now() - pd.Timedelta(days=days))
+        except Exception as e:
+            print(f"[DataHandler] 本地 K 线库读取失败: {e}")
             return pd.DataFrame()
 
-    def update_tick(self, current_price):
-        """更新 K 线 (核心：向前平移时间轴)"""
-        if current_price is None: return self.buffer
+    def _download_history(self):
+        # period="1" -> 1 分钟级别 (接口每次返回整段近期数据，不支持按起点增量拉取)
+        df = ak.futures_zh_minute_sina(symbol="au0", period="1")
+        df.rename(columns={'datetime': 'Datetime', 'open': 'Open', 'high': 'High',
+                           'low': 'Low', 'close': 'Close', 'volume': 'Volume'}, inplace=True)
+        df['Datetime'] = pd.to_datetime(df['Datetime'])
+        df.set_index('Datetime', inplace=True)
+        cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+        df[cols] = df[cols].apply(pd.to_numeric, errors='coerce')
+        return df[cols].dropna(subset=['Close'])
+
+    def _backfill_history(self, refresh_interval):
+        """联网回填本地 K 线库：只写入库中最后一根 (可能当时未收完) 及之后的 K 线"""
+        if time.time() - self.history_db.last_fetch() < refresh_interval: return
+        try:
+            df = self._download_history()
+        except Exception as e:
+            print(f"[DataHandler] ⚠️ 在线历史下载失败，使用本地 K 线库: {e}")
+            return
 
-        now = datetime.datetime.now().replace(second=0, microsecond=0)
+        try:
+            last = self.history_db.last_ts()
+            if last is not None: df = df[df.index >= pd.Timestamp(last)]
+            n = self.history_db.write(df)
+            self.history_db.mark_fetched()
+            print(f"[DataHandler] 本地 K 线库回填 {n} 根 (库内最新: {df.index[-1] if n else '无更新'})")
+        except Exception as e:
+            print(f"[DataHandler] 本地 K 线库写入失败: {e}")
 
-        # 1. 新的一分钟 -> 追加新行
-        if self.buffer.empty or self.buffer.index[-1] != now:
-            open_price = current_price
-            if not self.buffer.empty: open_price = self.buffer.iloc[-1]['Close']
+    @property
+    def buffer(self):
+        """按需把环形缓冲区物化为 DataFrame (数据未变化时直接复用上一次的结果)"""
+        if self._frame_version != self.bars.version:
+            self._frame = self.bars.to_frame()
+            self._frame_version = self.bars.version
+        return self._frame
 
-            new_row = pd.DataFrame({
-                'Open': [open_price],
-                'High': [current_price],
-                'Low': [current_price],
-                'Close': [current_price],
-                'Volume': [0]
-            }, index=[now])
+    @buffer.setter
+    def buffer(self, df):
+        # 1 分钟主缓冲区和各高周期一起重建 (load_frame/clear 会推进 generation，下游增量状态随之失效)
+        self.ticks.seed(df)
 
-            self.buffer = pd.concat([self.buffer, new_row])
+    def bars_for(self, rule):
+        """任意已维护周期的 K 线 (如 '15min')，不需要对 1 分钟数据重新重采样"""
+        return self.ticks.frame(rule)
 
-            # 保持缓冲区长度，实现"向前平移" (挤掉最旧的数据)
-            if len(self.buffer) > self.max_len:
-                self.buffer = self.buffer.iloc[-self.max_len:]
+    def update_tick(self, current_price):
+        """记录一个报价并更新各周期 K 线 (核心：向前平移时间轴)，全部是 O(1) 原地写入环形缓冲区"""
+        if current_price is None: return
 
-        # 2. 同一分钟 -> 更新 High/Low/Close
-        else:
-            last_idx = self.buffer.index[-1]
-            self.buffer.at[last_idx, 'Close'] = current_price
-            if current_price > self.buffer.at[last_idx, 'High']:
-                self.buffer.at[last_idx, 'High'] = current_price
-            if current_price < self.buffer.at[last_idx, 'Low']:
-                self.buffer.at[last_idx, 'Low'] = current_price
+        # 新的一分钟 -> 追加新行 (缓冲区满时自动挤掉最旧的数据，实现"向前平移")；同一分钟 -> 更新 High/Low/Close
+        now_ns = int(pd.Timestamp(datetime.datetime.now()).value)
+        self.ticks.add(now_ns, current_price)
 
         self._save_to_cache()
-        return self.buffer
 
-    def _save_to_cache(self):
-        if not self.buffer.empty:
-            try:
-                self.buffer.to_csv(self.cache_file)
-            except:
-                pass
+    def _save_to_cache(self, full=False):
+        """
+        持久化缓冲区：平时只追加最新一根 K 线 (O(1) 磁盘写入)；
+        full=True 或日志过长时，用整个缓冲区原子地重写 (压缩)
+        """
+        if self.bars.empty: return
+        try:
+            if full or self.store.needs_compaction:
+                self.store.rewrite(self.bars)
+            else:
+                self.store.append(self.bars.last_ts(),
+                                  *(self.bars.last(i) for i in range(len(BarRingBuffer.COLUMNS))))
+        except Exception as e:
+            print(f"[DataHandler] 缓存写入失败: {e}")
 
     def _load_from_cache(self):
-        if not os.path.exists(self.cache_file): return pd.DataFrame()
         try:
-            return pd.read_csv(self.cache_file, index_col=0, parse_dates=True)
+            df = self.store.load(max_rows=self.max_len)
+            if not df.empty: return df
+        except Exception as e:
+            print(f"[DataHandler] 缓存读取失败: {e}")
+
+        # 兼容旧版 CSV 缓存
+        if not os.path.exists(self.legacy_cache_file): return pd.DataFrame()
+        try:
+            return pd.read_csv(self.legacy_cache_file, index_col=0, parse_dates=True)
         except:
             return pd.DataFrame()
 
-    def initialize(self):
+    def load_cached(self):
+        """启动第一步：只读本地缓存 (毫秒级)，让界面马上有图可画；返回是否有数据"""
+        self.buffer = self._load_from_cache()
+        if not self.bars.empty:
+            print(f"[DataHandler] ✅ 本地缓存已载入: {len(self.bars)} 根 K 线")
+        return not self.bars.empty
+
+    def start(self):
         """
-        初始化流程 (修复版：先加载历史，再接实时)
+        分阶段启动 (不阻塞调用线程)
+        1. 先载入本地缓存
+        2. 历史底仓和首个实时报价在后台线程里并行获取 (冷启动的浏览器要几十秒，不再挡住首帧)
+        3. 调用方轮询 poll_startup()，到达的数据在调用方线程里并入缓冲区
         """
         print(f"[DataHandler] 正在初始化数据引擎 ({self.symbol})...")
-        self._init_driver()  # 预启动爬虫
+        self.load_cached()
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup")
+        print("[DataHandler] 正在后台构建历史 K 线底仓 (基于 Au0 期货)...")
+        self._history_job = pool.submit(self.fetch_long_history, 30)
+        self._quote_job = pool.submit(self._fetch_intraday_data)
+        pool.shutdown(wait=False)
+
+    @property
+    def startup_pending(self):
+        return self._history_job is not None or self._quote_job is not None
+
+    def _merge_history(self, history_df):
+        """
+        历史底仓与缓冲区合并：重叠区间以历史数据为准，
+        缓冲区里早于历史起点的缓存 K 线、晚于历史终点的实时 K 线都保留
+        合并可能改写中间的 K 线而首尾不变，因此一律经 buffer setter 整体重建：
+        各周期缓冲区的 generation 随之自增，策略的增量指标和图表缓存据此全量重算
+        """
+        current = self.buffer
+        if current.empty:
+            self.buffer = history_df
+            return
+        start, end = history_df.index[0], history_df.index[-1]
+        self.buffer = pd.concat([current[current.index < start], history_df, current[current.index > end]])
 
-        # === 步骤1: 加载历史底仓 (解决只有几个点的问题) ===
-        # 优先从 akshare 获取近期的 15分钟 K 线，构建完美的技术分析底图
-        try:
-            print("[DataHandler] 正在构建历史 K 线底仓 (基于 Au0 期货)...")
-            history_df = self.fetch_long_history(days=30)
+    def poll_startup(self):
+        """把已经完成的后台启动任务并入缓冲区 (必须在读写缓冲区的线程里调用)；返回缓冲区是否变化"""
+        changed = False
 
+        # 先并历史，再接实时价，保证实时 K 线落在历史末尾之后
+        if self._history_job is not None and self._history_job.done():
+            try:
+                history_df = self._history_job.result()
+            except Exception as e:
+                print(f"[DataHandler] 历史初始化异常: {e}")
+                history_df = pd.DataFrame()
+            self._history_job = None
             if not history_df.empty:
-                self.buffer = history_df
-                print(f"[DataHandler] ✅ 历史数据构建完成: {len(self.buffer)} 根 K 线")
+                self._merge_history(history_df)
+                changed = True
+                print(f"[DataHandler] ✅ 历史数据构建完成: {len(self.bars)} 根 K 线")
             else:
-                # 如果没网，尝试读本地缓存
-                print("[DataHandler] ⚠️ 在线历史获取失败，加载本地缓存...")
-                self.buffer = self._load_from_cache()
-
-        except Exception as e:
-            print(f"[DataHandler] 历史初始化异常: {e}")
-            self.buffer = self._load_from_cache()
-
-        # === 步骤2: 获取当前实时价格 ===
-        realtime_df, src = self._fetch_intraday_data()
+                print("[DataHandler] ⚠️ 在线历史获取失败，继续使用本地缓存")
 
-        if not realtime_df.empty:
-            print(f"[DataHandler] ✅ 实时连接成功! 来源: {src}")
-            current_price = realtime_df.iloc[-1]['Close']
+        if self._history_job is None and self._quote_job is not None and self._quote_job.done():
+            try:
+                realtime_df, src = self._quote_job.result()
+            except Exception:
+                realtime_df, src = pd.DataFrame(), "None"
+            self._quote_job = None
+            if not realtime_df.empty:
+                print(f"[DataHandler] ✅ 实时连接成功! 来源: {src}")
+                # 将最新的实时价格追加到历史数据的末尾：[长长的历史曲线] --- [跳动的实时点]
+                self.update_tick(realtime_df.iloc[-1]['Close'])
+                changed = True
+            else:
+                print("[DataHandler] ⚠️ 实时数据暂不可用，等待下一轮更新...")
 
-            # === 步骤3: 无缝拼接 ===
-            # 将最新的实时价格，通过 update_tick 追加到历史数据的末尾
-            # 这样界面上就会显示：[长长的历史曲线] --- [跳动的实时点]
-            self.update_tick(current_price)
-        else:
-            print("[DataHandler] ⚠️ 实时数据暂不可用，等待下一轮更新...")
+        if changed and not self.startup_pending:
+            # 启动完成：整体写一次快照，确保下次启动有数据
+            self._save_to_cache(full=True)
+        return changed
 
-        # 再次保存，确保下次启动有数据
-        self._save_to_cache()
+    def initialize(self, timeout=None):
+        """同步初始化 (脚本/测试使用)：启动后等到后台任务全部完成"""
+        self.start()
+        for job in (self._history_job, self._quote_job):
+            try:
+                job.result(timeout=timeout)
+            except Exception:
+                pass
+        self.poll_startup()
+        if not self.bars.empty: self._save_to_cache(full=True)
 
     def fetch_realtime_price(self):
-        df, src = self._fetch_intraday_data()
-        if not df.empty:
-            return float(df.iloc[-1]['Close'])
-        return None
+        # 启动报价仍在后台进行时不并发取价 (避免同时拉起两个浏览器)，结果由 poll_startup 并入
+        if self._quote_job is not None: return None
+        price, _, _ = self._fetch_quote()
+        return price
 
 
 if __name__ == "__main__":
     handler = DataHandler()
     handler.initialize()
-    print(f"当前缓冲区长度: {len(handler.buffer)}")
+    print(f"当前缓冲区长度: {len(handler.bars)}")
     print("测试 5 次连续抓取:")
     for i in range(5):
         p = handler.fetch_realtime_price()
         print(f"[{i + 1}] {p}")
         handler.update_tick(p)
         time.sleep(2)
-    handler.close_driver()
\ No newline at end of file
+    for name, h in handler.quotes.snapshot().items():
+        print(f"  {name}: 状态 {h['state']}, 错误率 {h['error_rate']:.0%}, 延迟 {h['latency']}, 熔断 {h['trips']} 次")
+    handler.close_sources()
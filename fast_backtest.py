@@ -0,0 +1,275 @@
+import numpy as np
+import pandas as pd
+from backtesting.test import SMA
+
+from strategy import AdaptiveMomentumReversion, cached_indicator
+
+
+def _first_valid(values):
+    """与 backtesting 的指标预热判定一致：第一个非 NaN 的位置"""
+    return int(np.isnan(np.asarray(values, dtype=float)).argmin(axis=-1).max())
+
+
+def _geometric_mean(returns):
+    returns = np.nan_to_num(returns) + 1
+    if np.any(returns <= 0): return 0
+    return np.exp(np.log(returns).sum() / (len(returns) or np.nan)) - 1
+
+
+class FastBacktest:
+    """
+    AdaptiveMomentumReversion 的向量化快速回测 (参数筛选专用)
+    1. 指标和多空入场信号一次性对整段数组计算 (指标复用 strategy.cached_indicator 缓存)
+    2. 持仓/止损止盈/每日交易上限只在"事件"之间跳转：空仓时直接跳到下一个入场信号，
+       持仓时用数组搜索下一个止损止盈触发点，不再逐 K 线执行 Python 代码
+    撮合规则与 backtesting.py 一致 (下一根开盘价成交、按比例下单取整、双边佣金)，
+    统计口径与 bt.run() 的同名字段一致
+    """
+
+    def __init__(self, df, cash=100000, commission=0.00002, finalize_trades=False,
+                 strategy=AdaptiveMomentumReversion):
+        self.df = df
+        self.cash = float(cash)
+        self.commission = float(commission)
+        self.finalize_trades = finalize_trades
+        self.strategy = strategy
+
+        self.open = df['Open'].to_numpy(dtype=float)
+        self.high = df['High'].to_numpy(dtype=float)
+        self.low = df['Low'].to_numpy(dtype=float)
+        self.close = df['Close'].to_numpy(dtype=float)
+        self.volume = df['Volume'].to_numpy(dtype=float) if 'Volume' in df.columns else np.zeros(len(df))
+        self.n = len(df)
+
+        # 交易日编号 + 每根 K 线所在交易日之后第一根 K 线的位置 (用于每日上限跳转)
+        index = pd.DatetimeIndex(df.index)
+        self.day = index.normalize().values.astype('datetime64[D]').astype(np.int64)
+        self.next_day_first = np.searchsorted(self.day, self.day, side='right')
+
+        # 年化口径 (与 backtesting._stats 一致：日内数据按日收益计算)
+        have_weekends = index.dayofweek.to_series().between(5, 6).mean() > 2 / 7 * .6
+        self.annual_trading_days = 365 if have_weekends else 252
+        self.day_last = np.flatnonzero(np.append(self.day[1:] != self.day[:-1], True))
+
+    def _params(self, params):
+        p = {k: getattr(self.strategy, k) for k in dir(self.strategy)
+             if not k.startswith('_') and isinstance(getattr(self.strategy, k), (int, float))}
+        for k, v in params.items():
+            if k not in p: raise AttributeError(f"Strategy '{self.strategy.__name__}' lacks parameter '{k}'")
+            p[k] = v
+        return p
+
+    def _signals(self, p):
+        """向量化计算入场信号 (与 AdaptiveMomentumReversion._generate_signals 完全对应)"""
+        s = self.strategy
+        c, h, l = self.close, self.high, self.low
+
+        rsi = cached_indicator(s._rsi)(None, c, p['rsi_period'])
+        bb_upper, bb_mid, bb_lower = cached_indicator(s._bollinger_bands)(None, c, p['bb_period'], p['bb_std'])
+        atr = cached_indicator(s._atr)(None, h, l, c, p['atr_period'])
+        sma_f = cached_indicator(SMA)(c, p['sma_fast'])
+        sma_s = cached_indicator(SMA)(c, p['sma_slow'])
+
+        # 预热长度要覆盖策略 init 中登记的全部指标
+        others = [
+            cached_indicator(s._volatility)(None, c, p['vol_period']),
+            *cached_indicator(s._macd)(None, c, p['macd_fast'], p['macd_slow'], p['macd_signal']),
+            cached_indicator(s._adx)(None, h, l, c, 14),
+            cached_indicator(s._volume_ma)(None, self.volume, 20),
+            cached_indicator(SMA)(c, 50),
+        ]
+        warmup = max(_first_valid(x) for x in [rsi, bb_upper, bb_mid, bb_lower, atr, sma_f, sma_s, *others])
+
+        with np.errstate(invalid='ignore'):
+            sma_bull = sma_f > sma_s
+            sma_bear = sma_f < sma_s
+            long_sig = sma_bull & ((rsi < p['rsi_os'] + 5) | (c <= bb_lower * 1.0005))
+            short_sig = sma_bear & ((rsi > p['rsi_ob'] - 5) | (c >= bb_upper * 0.9995))
+
+        entries = np.zeros(self.n, dtype=np.int8)
+        entries[long_sig & ~short_sig] = 1
+        entries[short_sig & ~long_sig] = -1
+        return entries, atr, 1 + warmup
+
+    def _position_size(self, p, equity, entry_p, sl_p):
+        """与 AdaptiveMomentumReversion._calculate_position_size 相同的算式"""
+        if sl_p is None or sl_p == 0:
+            return 0.95
+        risk_per_unit = abs(entry_p - sl_p)
+        if risk_per_unit == 0:
+            return 0.95
+        units = equity * p['risk_pct'] / risk_per_unit
+        max_units = equity / entry_p
+        size = min(units / max_units, 0.95)
+        return max(0.1, min(size, 0.95))
+
+    def _fill_units(self, frac, price, cash):
+        """按比例下单在成交时折算为整数手数 (与 backtesting 的 _Broker 一致)"""
+        adjusted = price + (abs(frac) * price * self.commission) / abs(frac)
+        return int((cash * abs(frac)) // adjusted)
+
+    def _next_exit(self, start, direction, sl, tp):
+        """从 start 开始查找第一根触发止损/止盈的 K 线 (分段向量化搜索)"""
+        c = self.close
+        chunk = 256
+        with np.errstate(invalid='ignore'):
+            while start < self.n:
+                seg = c[start:start + chunk]
+                hit = (seg <= sl) | (seg >= tp) if direction > 0 else (seg >= sl) | (seg <= tp)
+                pos = np.flatnonzero(hit)
+                if len(pos): return start + int(pos[0])
+                start += chunk
+                chunk *= 2
+        return -1
+
+    def run(self, **params):
+        p = self._params(params)
+        entries, atr, start = self._signals(p)
+        n, o, c, day = self.n, self.open, self.close, self.day
+        max_trades = p['max_trades_per_day']
+        comm = self.commission
+
+        entry_bars = np.flatnonzero(entries[start:]) + start
+        trades = []  # (size, entry_bar, exit_bar, entry_price, exit_price)
+        open_trade = None  # (size, entry_bar, entry_price)
+        pending_entry = None  # 最后一根 K 线发出、尚未成交的入场单
+
+        cash = self.cash
+        cur_day, cur_count = None, 0
+        i = start
+
+        def count_on(bar):
+            nonlocal cur_day, cur_count
+            if day[bar] != cur_day:
+                cur_day, cur_count = day[bar], 0
+            return cur_count
+
+        while i < n:
+            # --- 空仓：跳到下一个入场信号 ---
+            k = np.searchsorted(entry_bars, i)
+            if k == len(entry_bars): break
+            j = int(entry_bars[k])
+            if count_on(j) >= max_trades:
+                i = int(self.next_day_first[j])
+                continue
+
+            direction = int(entries[j])
+            sl = c[j] - direction * p['sl_atr_mult'] * atr[j]
+            tp = c[j] + direction * p['tp_atr_mult'] * atr[j]
+            frac = self._position_size(p, cash, c[j], sl)
+            cur_count += 1
+            if j + 1 >= n:
+                pending_entry = direction * frac
+                break
+
+            e = j + 1
+            units = self._fill_units(frac, o[e], cash)
+            if not units:  # 资金不足，订单被取消
+                i = e
+                continue
+            size = direction * units
+            cash -= units * o[e] * comm
+            open_trade = (size, e, o[e])
+
+            # --- 持仓：查找下一个止损/止盈，跳过已达每日上限的交易日 ---
+            s = e
+            while True:
+                x = self._next_exit(s, direction, sl, tp)
+                if x < 0:
+                    s = n
+                    break
+                if count_on(x) >= max_trades:
+                    s = int(self.next_day_first[x])
+                    continue
+                cur_count += 1
+                break
+
+            # 平仓单在最后一根 K 线发出时不会成交 (finalize_trades 时在下方统一处理)
+            if s >= n or x + 1 >= n:
+                break
+
+            exit_bar = x + 1
+            cash += size * (o[exit_bar] - o[e]) - abs(size) * o[exit_bar] * comm
+            trades.append((size, e, exit_bar, o[e], o[exit_bar]))
+            open_trade = None
+            i = exit_bar
+
+        # --- 回测结束：finalize_trades 时按最后一根 K 线的开盘价平仓 ---
+        final_open = None
+        if self.finalize_trades and n > start:
+            last = n - 1
+            if open_trade is not None:
+                size, e, entry_p = open_trade
+                cash += size * (o[last] - entry_p) - abs(size) * o[last] * comm
+                trades.append((size, e, last, entry_p, o[last]))
+                open_trade = None
+            elif pending_entry is not None:
+                units = self._fill_units(pending_entry, o[last], cash)
+                if units:
+                    size = int(np.sign(pending_entry)) * units
+                    cash -= units * o[last] * comm
+                    final_open = (size, last, o[last])
+        if final_open is not None:
+            open_trade = final_open
+
+        equity = self._equity_curve(trades, open_trade)
+        return self._stats(trades, equity)
+
+    def _equity_curve(self, trades, open_trade):
+        n, c, comm = self.n, self.close, self.commission
+        delta = np.zeros(n + 1)
+        unrealized = np.zeros(n)
+        for size, e, x, entry_p, exit_p in trades:
+            delta[e] -= abs(size) * entry_p * comm
+            delta[x] += size * (exit_p - entry_p) - abs(size) * exit_p * comm
+            unrealized[e:x] += size * (c[e:x] - entry_p)
+        if open_trade is not None:
+            size, e, entry_p = open_trade
+            delta[e] -= abs(size) * entry_p * comm
+            unrealized[e:] += size * (c[e:] - entry_p)
+        return self.cash + np.cumsum(delta)[:n] + unrealized
+
+    def _stats(self, trades, equity):
+        """计算与 bt.run() 同名的核心统计量"""
+        comm = self.commission
+        n_trades = len(trades)
+        if n_trades:
+            t = np.array(trades, dtype=float)
+            size, e, x, entry_p, exit_p = t.T
+            commissions = np.abs(size) * (entry_p + exit_p) * comm
+            pl = size * (exit_p - entry_p) - commissions
+            returns = np.sign(size) * (exit_p / entry_p - 1) - commissions / (np.abs(size) * entry_p)
+            have_position = np.zeros(self.n, dtype=bool)
+            for eb, xb in zip(e.astype(int), x.astype(int)):
+                have_position[eb:xb + 1] = True
+            exposure = have_position.mean() * 100
+        else:
+            pl = returns = np.array([])
+            exposure = 0.0
+
+        dd = 1 - equity / np.maximum.accumulate(equity)
+        day_equity = equity[self.day_last]
+        day_returns = day_equity[1:] / day_equity[:-1] - 1
+        g = _geometric_mean(day_returns)
+        a = self.annual_trading_days
+        ann_return = (1 + g) ** a - 1
+        var = day_returns.var(ddof=1) if len(day_returns) > 1 else np.nan
+        ann_vol = np.sqrt((var + (1 + g) ** 2) ** a - (1 + g) ** (2 * a))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sortino = ann_return / (np.sqrt(np.mean(day_returns.clip(-np.inf, 0) ** 2)) * np.sqrt(a))
+
+        return {
+            'Exposure Time [%]': exposure,
+            'Equity Final [$]': equity[-1],
+            'Equity Peak [$]': equity.max(),
+            'Return [%]': (equity[-1] - equity[0]) / equity[0] * 100,
+            'Return (Ann.) [%]': ann_return * 100,
+            'Volatility (Ann.) [%]': ann_vol * 100,
+            'Sharpe Ratio': (ann_return * 100) / (ann_vol * 100 or np.nan),
+            'Sortino Ratio': sortino,
+            'Max. Drawdown [%]': -np.nan_to_num(dd.max()) * 100,
+            '# Trades': n_trades,
+            'Win Rate [%]': (pl > 0).mean() * 100 if n_trades else np.nan,
+            'Profit Factor': returns[returns > 0].sum() / (abs(returns[returns < 0].sum()) or np.nan)
+            if n_trades else np.nan,
+        }
@@ -0,0 +1,319 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+class RollingWindow:
+    """
+    固定窗口滚动统计 (O(1) 更新)
+    只保存已收盘的 n-1 个值，最后一个位置留给正在跳动的实时 K 线
+    """
+
+    def __init__(self, n, ddof=0):
+        self.n = max(int(n), 1)
+        self.ddof = ddof
+        self.values = deque(maxlen=self.n - 1)
+        self.shift = 0.0  # 以窗口均值附近为基准累加，降低平方和相减的精度损失
+        self.s = 0.0
+        self.sq = 0.0
+        self._steps = 0
+
+    def _ready(self, x):
+        return x == x and len(self.values) == self.n - 1
+
+    def mean(self, x, commit=False):
+        out = (self.s + (x - self.shift)) / self.n + self.shift if self._ready(x) else NAN
+        if commit: self._commit(x)
+        return out
+
+    def std(self, x, commit=False):
+        out = NAN
+        if self._ready(x) and self.n > self.ddof:
+            d = x - self.shift
+            s = self.s + d
+            var = (self.sq + d * d - s * s / self.n) / (self.n - self.ddof)
+            out = math.sqrt(var) if var > 0 else 0.0
+        if commit: self._commit(x)
+        return out
+
+    def _commit(self, x):
+        # NaN 会打断窗口 (与 pandas rolling 默认 min_periods=window 的行为一致)
+        if x != x:
+            self.values.clear()
+            self.s = self.sq = 0.0
+            return
+        if self.n == 1: return
+
+        if not self.values: self.shift = x
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0] - self.shift
+            self.s -= old
+            self.sq -= old * old
+        self.values.append(x)
+        d = x - self.shift
+        self.s += d
+        self.sq += d * d
+
+        # 定期按窗口重算，消除浮点累积误差 (均摊仍是 O(1))
+        self._steps += 1
+        if self._steps >= 64 * self.n:
+            self._steps = 0
+            self.shift = math.fsum(self.values) / len(self.values)
+            self.s = math.fsum(v - self.shift for v in self.values)
+            self.sq = math.fsum((v - self.shift) ** 2 for v in self.values)
+
+
+class SeededAverage:
+    """
+    递推均线 (EMA / Wilder)，与 TA-Lib 一致：先用前 n 个值的 SMA 做种子，之后按 alpha 递推
+    """
+
+    def __init__(self, n, alpha):
+        self.n = max(int(n), 1)
+        self.alpha = alpha
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = NAN
+
+    def update(self, x, commit=False):
+        if x != x: return NAN
+
+        c = self.count + 1
+        if c < self.n:
+            out = NAN
+        elif c == self.n:
+            out = (self.seed_sum + x) / self.n
+        else:
+            out = self.value + self.alpha * (x - self.value)
+
+        if commit:
+            if c <= self.n: self.seed_sum += x
+            self.count = c
+            self.value = out
+        return out
+
+
+class RSI:
+    """Wilder RSI (对齐 TA-Lib / pandas_ta 的 talib 模式)"""
+
+    def __init__(self, n):
+        self.gain = SeededAverage(n, 1.0 / max(int(n), 1))
+        self.loss = SeededAverage(n, 1.0 / max(int(n), 1))
+        self.prev = NAN
+
+    def update(self, close, commit=False):
+        out = NAN
+        if self.prev == self.prev:
+            d = close - self.prev
+            g = self.gain.update(max(d, 0.0), commit)
+            l = self.loss.update(max(-d, 0.0), commit)
+            if g == g:
+                total = g + l
+                out = 100.0 * g / total if total != 0 else 0.0
+        if commit: self.prev = close
+        return out
+
+
+class ATR:
+    """Wilder ATR，首个值为前 n 根真实波幅的均值"""
+
+    def __init__(self, n):
+        self.avg = SeededAverage(n, 1.0 / max(int(n), 1))
+        self.prev_close = NAN
+
+    def update(self, high, low, close, commit=False):
+        out = NAN
+        pc = self.prev_close
+        if pc == pc:
+            tr = max(high - low, abs(high - pc), abs(low - pc))
+            out = self.avg.update(tr, commit)
+        if commit: self.prev_close = close
+        return out
+
+
+class MACD:
+    """
+    MACD (对齐 TA-Lib)：快慢 EMA 在同一根 K 线上起算，信号线用 MACD 的 SMA 做种子
+    """
+
+    def __init__(self, fast, slow, signal):
+        fast, slow = int(fast), int(slow)
+        if slow < fast: fast, slow = slow, fast
+        self.fast = SeededAverage(fast, 2.0 / (fast + 1))
+        self.slow = SeededAverage(slow, 2.0 / (slow + 1))
+        self.signal = SeededAverage(signal, 2.0 / (int(signal) + 1))
+        self.skip = slow - fast  # 快线跳过的前置 K 线数
+        self.count = 0
+
+    def update(self, close, commit=False):
+        fast = self.fast.update(close, commit) if self.count >= self.skip else NAN
+        slow = self.slow.update(close, commit)
+        if commit: self.count += 1
+
+        line = fast - slow
+        if line != line: return NAN, NAN
+        sig = self.signal.update(line, commit)
+        if sig != sig: return NAN, NAN
+        return line, sig
+
+
+class IndicatorBlock:
+    """
+    预分配的指标数组块 (行 = K 线, 列 = 指标)
+    追加 / 改写最后一行都是 O(1)，头部丢弃只移动起点，空间用尽时再整体压缩
+    """
+
+    def __init__(self, columns, capacity=4096):
+        self.columns = list(columns)
+        self.data = np.full((capacity, len(self.columns)), np.nan)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def clear(self):
+        self.start = self.end = 0
+
+    def append(self, row):
+        if self.end == len(self.data):
+            n = len(self)
+            if n * 2 > len(self.data):
+                grown = np.full((len(self.data) * 2, len(self.columns)), np.nan)
+                grown[:n] = self.data[self.start:self.end]
+                self.data = grown
+            else:
+                self.data[:n] = self.data[self.start:self.end]
+            self.start, self.end = 0, n
+        self.data[self.end] = row
+        self.end += 1
+
+    def set_last(self, row):
+        self.data[self.end - 1] = row
+
+    def keep_last(self, n):
+        self.start = max(self.start, self.end - n)
+
+    def last(self):
+        return self.data[self.end - 1]
+
+    def view(self):
+        return self.data[self.start:self.end]
+
+
+class IncrementalIndicators:
+    """
+    增量指标引擎
+    每个指标只保存 O(1) 的递推状态：同一分钟内的跳动只重算最后一根，新 K 线到来时先把上一根"收盘"入账
+    """
+    # 收益率 pct 只是 vol 的中间量，不单独存一列
+    COLUMNS = ['RSI', 'BBL', 'BBU', 'MACD', 'MACD_SIG', 'SMA_F', 'SMA_S', 'vol', 'vol_ma', 'ATR']
+
+    def __init__(self, params):
+        self.params = dict(params)
+        p = self.params
+        self.rsi = RSI(p['rsi_period'])
+        self.bb = RollingWindow(p['bb_period'], ddof=0)  # TA-Lib BBANDS 使用总体标准差
+        self.macd = MACD(p['macd_fast'], p['macd_slow'], p['macd_signal'])
+        self.sma_f = RollingWindow(p['sma_fast'])
+        self.sma_s = RollingWindow(p['sma_slow'])
+        self.pct = RollingWindow(p['vol_period'], ddof=1)
+        self.vol_ma = RollingWindow(p['vol_ma_period'])
+        self.atr = ATR(p['atr_period'])
+        self.prev_close = NAN
+
+        self.block = IndicatorBlock(self.COLUMNS)
+        self.first_ts = None
+        self.last_ts = None
+        self.generation = None
+
+    def _step(self, high, low, close, commit):
+        p = self.params
+        rsi = self.rsi.update(close, commit)
+
+        bb_mid = self.bb.mean(close)
+        bb_sd = self.bb.std(close, commit)
+        bbl = bb_mid - p['bb_std'] * bb_sd
+        bbu = bb_mid + p['bb_std'] * bb_sd
+
+        macd, macd_sig = self.macd.update(close, commit)
+        sma_f = self.sma_f.mean(close, commit)
+        sma_s = self.sma_s.mean(close, commit)
+
+        pc = self.prev_close
+        pct = (close - pc) / pc if pc == pc and pc != 0 else NAN
+        vol = self.pct.std(pct, commit)
+        vol_ma = self.vol_ma.mean(vol, commit)
+
+        atr = self.atr.update(high, low, close, commit)
+        if commit: self.prev_close = close
+
+        return (rsi, bbl, bbu, macd, macd_sig, sma_f, sma_s, vol, vol_ma, atr)
+
+    def _reseed(self, high, low, close):
+        """全量重建状态 (首次调用 / 参数变化 / 历史被整体替换时)"""
+        self.__init__(self.params)
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+
+        last = len(close) - 1
+        for i in range(last + 1):
+            self.block.append(self._step(high[i], low[i], close[i], commit=i < last))
+
+    def sync(self, df_raw):
+        """
+        将状态同步到 df_raw 的最新一根 K 线，返回最新一行指标 (dict)
+        只有末尾 K 线变化时是 O(1)；其它情况自动回退到全量重建
+        """
+        ts = pd.DatetimeIndex(df_raw.index).values.astype('datetime64[ns]').view(np.int64)
+        return self.sync_arrays(ts, df_raw['High'].to_numpy(), df_raw['Low'].to_numpy(),
+                                df_raw['Close'].to_numpy())
+
+    def sync_arrays(self, ts, high, low, close, generation=None):
+        """
+        同 sync，直接接收 int64 时间戳和 High/Low/Close 数组 (如环形缓冲区的零拷贝视图)
+        generation: 数据源的重建代数 (BarRingBuffer.generation)；与上次不同说明中间的 K 线可能被改写
+        (首尾时间戳和长度都没变也一样)，直接全量重建
+        """
+        n = len(ts)
+        prev_len = len(self.block)
+
+        if generation is not None and generation != self.generation:
+            self._reseed(high, low, close)
+        elif (self.last_ts is not None and n == prev_len and ts[-1] == self.last_ts
+                and ts[0] == self.first_ts):
+            # 同一分钟：仅改写最后一根
+            self.block.set_last(self._step(float(high[-1]), float(low[-1]), float(close[-1]), commit=False))
+        elif (self.last_ts is not None and n >= 2 and n in (prev_len, prev_len + 1)
+              and ts[-2] == self.last_ts):
+            # 新的一分钟：上一根按最终值入账，再计算新 K 线
+            self.block.set_last(self._step(float(high[-2]), float(low[-2]), float(close[-2]), commit=True))
+            self.block.append(self._step(float(high[-1]), float(low[-1]), float(close[-1]), commit=False))
+            self.block.keep_last(n)
+        else:
+            self._reseed(high, low, close)
+
+        self.first_ts = int(ts[0])
+        self.last_ts = int(ts[-1])
+        self.generation = generation
+        return dict(zip(self.COLUMNS, self.block.last()))
+
+    def update(self, high, low, close):
+        """逐根推进一根已收盘的 K 线 (历史回放用，不写指标块)，返回该根的指标 (dict)"""
+        return dict(zip(self.COLUMNS, self._step(float(high), float(low), float(close), commit=True)))
+
+    def columns(self):
+        """各指标列的视图 {列名: 数组} (与最近一次 sync 的 K 线一一对应，零拷贝，只读)"""
+        view = self.block.view()
+        view.flags.writeable = False  # 只锁视图，指标块照常写入
+        return {col: view[:, j] for j, col in enumerate(self.COLUMNS)}
+
+    def frame(self, df_raw):
+        """拼出与 calculate_indicators 同结构的 DataFrame (只做内存拷贝，不做指标计算)"""
+        block = pd.DataFrame(self.block.view(), index=df_raw.index, columns=self.COLUMNS)
+        return pd.concat([df_raw, block], axis=1)
@@ -9,6 +9,7 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QPushButton, QScrollArea, QGroupBox, QTextBrowser)
 from PyQt6.QtGui import QFont, QDoubleValidator, QColor, QPicture, QPainter
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QPointF, QRectF, QTimer
+import numpy as np
 import pyqtgraph as pg
 from pyqtgraph import InfiniteLine, TextItem
 
@@ -18,6 +19,7 @@ from ai_agent import AIAgent
 from portfolio_manager import PortfolioManager
 from optimizer_worker import OptimizerWorker
 from notifier import EmailNotifier
+from chart_payload import ChartPayloadBuilder
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,11 +34,13 @@ logging.basicConfig(
 class TradingWorker(QThread):
     data_updated = pyqtSignal(float, str, str, object)
 
-    def __init__(self):
+    def __init__(self, stream_url=None):
         super().__init__()
         self.is_running = True
-        self.data_handler = DataHandler(max_len=200)
+        self.data_handler = DataHandler(max_len=200, stream_url=stream_url)
         self.strategy = QuantalyticsEngine()
+        # 绘图数据在本线程准备好，界面线程只负责把数组交给 pyqtgraph
+        self.chart_builder = ChartPayloadBuilder()
 
     def is_trading_time(self):
         """
@@ -57,21 +61,29 @@ class TradingWorker(QThread):
 
         return t_start <= t <= t_end
 
+    def _publish(self):
+        """用当前缓冲区算一遍指标并发给 UI (列式路径：K 线和指标都是视图，只在打包时拷贝一次)"""
+        bars = self.data_handler.bars
+        if bars.empty: return
+        current_price = bars.last(bars.CLOSE)
+        signal, reason, columns = self.strategy.check_signal_bars(bars)
+        payload = self.chart_builder.build_columns(bars.timestamps(), columns, bars.generation)
+        self.data_updated.emit(current_price, signal, reason, payload)
+
+    def _idle(self, ticks):
+        """碎片化睡眠 (每 0.1s 检查一次关闭信号)；后台启动数据到达时立即刷新图表"""
+        for _ in range(ticks):
+            if not self.is_running: break
+            if self.data_handler.startup_pending and self.data_handler.poll_startup():
+                self._publish()
+            self.msleep(100)
+
     def run(self):
         # logging.info("[Worker] 交易线程启动，正在初始化数据...")
-        self.data_handler.initialize()
-
-        if not self.data_handler.buffer.empty:
-            # 取出当前缓冲区里的最新数据
-            current_price = self.data_handler.buffer.iloc[-1]['Close']
-
-            # 即使没有新信号，也先算一遍指标以便画图
-            # 注意：check_signal 会处理数据量不足的情况，返回 df_raw
-            signal, reason, processed_df = self.strategy.check_signal(self.data_handler.buffer)
-
-            # 马上发给 UI，让用户看见图
-            self.data_updated.emit(current_price, signal, reason, processed_df)
-            # logging.info("[Worker] 首帧数据已发送至 UI")
+        # 分阶段启动：本地缓存立即出图，历史底仓/实时报价在后台并行获取，到达后再合并刷新
+        self.data_handler.start()
+        self._publish()
+        # logging.info("[Worker] 首帧数据已发送至 UI")
 
         while self.is_running:
             # === 1. 交易时间检查 ===
@@ -80,36 +92,29 @@ class TradingWorker(QThread):
                 # logging.info("[System] 休市中，暂停监控...")
 
                 # 长时间休眠：1分钟 (600 * 0.1s)
-                # 使用碎片化睡眠，确保能随时响应关闭信号
-                for _ in range(600):
-                    if not self.is_running: break
-                    self.msleep(100)
+                self._idle(600)
                 continue
 
             # === 2. 正常交易逻辑 ===
             try:
+                if self.data_handler.startup_pending and self.data_handler.poll_startup():
+                    self._publish()
+
                 price = self.data_handler.fetch_realtime_price()
                 if price is not None:
                     # 更新数据
-                    raw_df = self.data_handler.update_tick(price)
+                    self.data_handler.update_tick(price)
 
-                    # 计算信号 (返回: 信号, 理由, 带指标的DF)
-                    signal, reason, processed_df = self.strategy.check_signal(raw_df)
-
-                    # 发送给 UI
-                    self.data_updated.emit(price, signal, reason, processed_df)
+                    # 计算信号并发送给 UI (绘图数据包)
+                    self._publish()
 
                 # 正常间隔：3秒 (30 * 0.1s)
-                for _ in range(30):
-                    if not self.is_running: break
-                    self.msleep(100)
+                self._idle(30)
 
             except Exception as e:
                 logging.error(f"[Worker] Error: {e}")
                 # 出错后等待 5秒
-                for _ in range(50):
-                    if not self.is_running: break
-                    self.msleep(100)
+                self._idle(50)
 
     def stop(self):
         self.is_running = False
@@ -120,84 +125,136 @@ class StringAxis(pg.AxisItem):
     """
     def __init__(self, orientation='bottom', **kwargs):
         super().__init__(orientation, **kwargs)
-        self.ticks_mapper = {} # 存储 {index: time_str}
+        self.labels = np.empty(0, dtype=object)
 
-    def set_ticks(self, data_index):
-        """传入 DataFrame 的 index (时间戳列表)"""
-        self.ticks_mapper = {}
-        for i, timestamp in enumerate(data_index):
-            # 存一下映射关系，只显示时:分
-            self.ticks_mapper[i] = timestamp.strftime('%H:%M')
+    def set_ticks(self, labels):
+        """传入已格式化好的时:分标签数组 (由交易线程准备)"""
+        self.labels = labels
 
     def tickStrings(self, values, scale, spacing):
         """重写父类方法：根据 value (整数索引) 返回显示文本"""
         strings = []
+        n = len(self.labels)
         for v in values:
             idx = int(v)
-            # 如果索引在字典里，就返回时间；否则返回空
-            if idx in self.ticks_mapper:
-                strings.append(self.ticks_mapper[idx])
-            else:
-                strings.append("")
+            # 索引在范围内就返回时间；否则返回空
+            strings.append(self.labels[idx] if 0 <= idx < n else "")
         return strings
 
 class CandlestickItem(pg.GraphicsObject):
     """
-    专业的 K 线蜡烛图组件
+    专业的 K 线蜡烛图组件 (常驻图表，分层细节渲染)
+    1. 只绘制当前可见的 x 区间；同色 K 线合并成一条影线路径 + 一条实体路径，整屏只有 4 次绘制调用
+    2. 可见 K 线多于像素列时，按 k 根一组合并为"分箱 OHLC"再画，十万根 K 线缩放/平移依然流畅
+    3. 已收盘 K 线的路径按 (数据版本, 可见区间, 分箱大小) 缓存；跳动时只重算最后一个分箱
     """
+    UP_COLOR = '#ff4444'  # 涨 (红)
+    DOWN_COLOR = '#00cc00'  # 跌 (绿)
 
-    def __init__(self, data):
+    def __init__(self):
+        pg.GraphicsObject.__init__(self)
+        self.opens = self.highs = self.lows = self.closes = np.empty(0)
+        self._closed_count = 0
+        self._version = 0  # 已收盘 K 线每次变化自增 (路径缓存失效)
+        self._closed_range = (np.inf, -np.inf)  # 已收盘 K 线的价格范围
+        self._cache_key = None
+        self._cache_paths = None
+        self._bounds = QRectF()
+        self._pens = {True: pg.mkPen(self.UP_COLOR), False: pg.mkPen(self.DOWN_COLOR)}
+        self._brushes = {True: pg.mkBrush(self.UP_COLOR), False: pg.mkBrush(self.DOWN_COLOR)}
+
+    def set_data(self, opens, highs, lows, closes, changed_from=0):
         """
-        data: 列表，格式 [(time, open, close, low, high), ...]
+        更新数据；changed_from 之前的 K 线与上一次完全相同 (由调用方保证)
+        同一根 K 线内跳动时已收盘部分的缓存全部保留，只有最后一个分箱需要重算
         """
-        pg.GraphicsObject.__init__(self)
-        self.data = data
-        self.picture = QPicture()
-        self.generatePicture()
-
-    def generatePicture(self):
-        p = QPainter(self.picture)
-
-        # 1. 计算宽度的逻辑
-        # 如果数据少于2个，给个默认宽；否则计算相邻两点的时间差的 1/3 作为半宽
-        if len(self.data) > 1:
-            w = (self.data[1][0] - self.data[0][0]) / 3.0
-        else:
-            w = 60 / 3.0  # 假设是分钟线
-
-        for (t, open, close, low, high) in self.data:
-            # 2. 设定颜色 (中国习惯：红涨绿跌)
-            if close >= open:
-                # 涨 (红)
-                p.setPen(pg.mkPen('#ff4444'))
-                p.setBrush(pg.mkBrush('#ff4444'))
-            else:
-                # 跌 (绿)
-                p.setPen(pg.mkPen('#00cc00'))
-                p.setBrush(pg.mkBrush('#00cc00'))
-
-            # 3. 画上下影线 (Low 到 High)
-            p.drawLine(QPointF(t, low), QPointF(t, high))
-
-            # 4. 画实体 (Open 到 Close)
-            # drawRect(x, y, w, h)
-            # 注意：Y轴向下是正方向(在屏幕坐标系)，但在PlotWidget里会自动翻转
-            # 我们只需要画出矩形即可
-            if open == close:
-                # 十字星
-                p.drawLine(QPointF(t - w, open), QPointF(t + w, close))
-            else:
-                # 实体矩形
-                # 这里的 y 取 open，height 取 close-open 是没问题的
-                p.drawRect(QRectF(t - w, open, w * 2, close - open))
-
-        p.end()
+        self.opens, self.highs, self.lows, self.closes = opens, highs, lows, closes
+        closed = max(len(closes) - 1, 0)
+        if changed_from < self._closed_count or closed != self._closed_count:
+            self._version += 1
+            self._closed_count = closed
+            with np.errstate(invalid='ignore'):
+                self._closed_range = (np.nanmin(lows[:closed], initial=np.inf),
+                                      np.nanmax(highs[:closed], initial=-np.inf))
+
+        low, high = self._closed_range
+        if len(closes) > closed:
+            low, high = np.nanmin([low, lows[-1]]), np.nanmax([high, highs[-1]])
+        bounds = QRectF(-1, low, len(closes) + 1, high - low) if np.isfinite(high - low) else QRectF()
+        if bounds != self._bounds:
+            self.prepareGeometryChange()
+            self._bounds = bounds
+        self.update()
+
+    def _bins(self, start, stop, k):
+        """[start, stop) 按 k 根一组聚合：返回 (x 中心, open, high, low, close)"""
+        if k == 1:
+            return (np.arange(start, stop, dtype=float), self.opens[start:stop], self.highs[start:stop],
+                    self.lows[start:stop], self.closes[start:stop])
+        first = np.arange(start, stop, k)
+        last = np.minimum(first + k, stop) - 1
+        offsets = first - start
+        with np.errstate(invalid='ignore'):
+            highs = np.fmax.reduceat(self.highs[start:stop], offsets)
+            lows = np.fmin.reduceat(self.lows[start:stop], offsets)
+        return (first + last) / 2.0, self.opens[first], highs, lows, self.closes[last]
+
+    def _paths(self, start, stop, k):
+        """把 [start, stop) 的 K 线 (或分箱) 按涨跌分成两组，每组一条影线路径 + 一条实体路径"""
+        if stop <= start: return []
+        x, o, h, l, c = self._bins(start, stop, k)
+        ok = np.isfinite(o) & np.isfinite(h) & np.isfinite(l) & np.isfinite(c)
+        w = k / 3.0  # 半宽：相邻两根 (或两个分箱) 间距的 1/3
+
+        paths = []
+        for up in (True, False):
+            sel = ok & ((c >= o) if up else (c < o))
+            if not sel.any(): continue
+            xs, os_, hs, ls, cs = x[sel], o[sel], h[sel], l[sel], c[sel]
+            m = len(xs)
+
+            # 影线 (Low 到 High)：每根两点，两两相连
+            wick = pg.arrayToQPath(np.repeat(xs, 2), np.column_stack([ls, hs]).ravel(), connect='pairs')
+
+            # 实体 (Open 到 Close)：每根一个闭合矩形 (开收相同时退化为一条横线，即十字星)
+            bx = np.column_stack([xs - w, xs + w, xs + w, xs - w, xs - w]).ravel()
+            by = np.column_stack([os_, os_, cs, cs, os_]).ravel()
+            connect = np.tile(np.array([1, 1, 1, 1, 0], dtype=np.int32), m)
+            body = pg.arrayToQPath(bx, by, connect=connect)
+            paths.append((up, wick, body))
+        return paths
 
     def paint(self, p, *args):
-        p.drawPicture(0, 0, self.picture)
+        n = len(self.closes)
+        if n == 0: return
+
+        # 1. 可见区间 + 分箱大小 (每个像素列最多一根)
+        view = self.viewRect()
+        i0, i1 = 0, n
+        if view is not None:
+            i0 = max(int(np.floor(view.left())), 0)
+            i1 = min(int(np.ceil(view.right())) + 1, n)
+        if i1 <= i0: return
+        px = self.pixelWidth() or 1.0  # 每个像素对应的 x 跨度 (= K 线根数)
+        k = max(1, int(np.ceil(px))) if px > 1 else 1
+
+        # 2. 分箱对齐到 k 的整数倍，平移时形状稳定；包含最新 K 线的分箱每次重算
+        i0 -= i0 % k
+        live_start = min((self._closed_count // k) * k, i1)
+        key = (self._version, i0, live_start, k)
+        if key != self._cache_key:
+            self._cache_key = key
+            self._cache_paths = self._paths(i0, live_start, k)
+        tail = self._paths(max(live_start, i0), i1, k)
+
+        for up, wick, body in self._cache_paths + tail:
+            p.setPen(self._pens[up])
+            p.drawPath(wick)
+            p.setBrush(self._brushes[up])
+            p.drawPath(body)
 
     def boundingRect(self):
-        return QRectF(self.picture.boundingRect())
+        return self._bounds
 
 
 # --- 主窗口 ---
@@ -244,12 +301,14 @@ class MainWindow(QMainWindow):
         self.notifier = EmailNotifier(config=email_cfg)  # <--- 注入依赖
         self.last_notified_signal = "NEUTRAL"  # 防止重复发送
 
-        self.worker = TradingWorker()
+        # 可选的推送行情地址 (config.json 的 quote_stream_url)，没有则只用轮询源
+        self.worker = TradingWorker(stream_url=self.config_data.get('quote_stream_url'))
         self.worker.data_updated.connect(self.update_tech_ui)
         self.worker.start()
 
         self.opt_worker = OptimizerWorker()
         self.opt_worker.optimization_finished.connect(self.apply_new_params)
+        self.opt_worker.candidate_finished.connect(self.on_optimization_progress)
 
         self.settings_file = "config.json"
         self.load_settings()
@@ -339,6 +398,17 @@ class MainWindow(QMainWindow):
         # 将图表加入布局
         chart_layout.addWidget(self.plot_widget)
 
+        # 常驻图元：K 线 + 均线 + 布林带，之后每次更新只 setData，不再 clear() 重建
+        self.candle_item = CandlestickItem()
+        self.plot_widget.addItem(self.candle_item)
+        # 快线 (SMA_F): 黄色；慢线 (SMA_S): 紫色
+        self.curve_sma_f = self.plot_widget.plot(pen=pg.mkPen('#ffff00', width=1), name="SMA Fast")
+        self.curve_sma_s = self.plot_widget.plot(pen=pg.mkPen('#da70d6', width=1), name="SMA Slow")
+        # 布林带 (Bollinger Bands) - 蓝色细线
+        bb_pen = pg.mkPen('#00bfff', width=1, style=Qt.PenStyle.DashLine)
+        self.curve_bbu = self.plot_widget.plot(pen=bb_pen)
+        self.curve_bbl = self.plot_widget.plot(pen=bb_pen)
+
         main_layout.addLayout(chart_layout, stretch=6)
 
         # === 初始化十字光标 ===
@@ -356,13 +426,20 @@ class MainWindow(QMainWindow):
         # 3. 信息浮窗 (显示在左上角)
         self.cursor_label = TextItem(anchor=(0, 0), fill=(0, 0, 0, 200))  # 黑色半透明背景
         self.plot_widget.addItem(self.cursor_label, ignoreBounds=True)
+        # 确保十字光标在最上层
+        self.cursor_label.setZValue(999)
+        self.v_line.setZValue(999)
+        self.h_line.setZValue(999)
 
         # 4. 监听鼠标移动事件
-        # 使用 SignalProxy 是官方推荐的高性能做法，但直接连 signal 也行
-        self.plot_widget.scene().sigMouseMoved.connect(self.on_mouse_moved)
+        # 使用 SignalProxy 限流到屏幕刷新率 (60Hz)，快速划过长图表时不再占满 GUI 线程
+        self.mouse_proxy = pg.SignalProxy(self.plot_widget.scene().sigMouseMoved,
+                                          rateLimit=60, slot=self.on_mouse_moved)
 
-        # 初始化数据缓存
-        self.df_cache = None
+        # 十字光标查询用的列数组 (每次数据更新时准备好，鼠标移动时 O(1) 取值)
+        self.hover_cols = {}
+        self.hover_times = np.empty(0, dtype=object)
+        self.hover_idx = None
 
         # === 右侧：情报面板 ===
         scroll = QScrollArea()
@@ -587,8 +664,8 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logging.error(f"[System] 保存配置失败: {e}")
 
-    def update_tech_ui(self, price, signal, reason, df):
-        """更新技术面图表 (专业版)"""
+    def update_tech_ui(self, price, signal, reason, chart):
+        """更新技术面图表 (专业版)；chart 为交易线程准备好的 ChartPayload"""
         self.current_price = price
         self.current_tech_signal = signal
         self.price_label.setText(f"¥{price:.2f}")
@@ -599,50 +676,22 @@ class MainWindow(QMainWindow):
         self.lbl_tech_signal.setStyleSheet(f"color: {c}")
         self.txt_tech_detail.setText(reason)
 
-        # --- 核心绘图逻辑优化 ---
-        if not df.empty:
-            self.df_cache = df
-            self.plot_widget.clear()  # <--- 这一步删除了所有东西，包括十字线
-
-            # === 【修复重点】重新添加被 clear() 删掉的十字光标组件 ===
-            self.plot_widget.addItem(self.v_line, ignoreBounds=True)
-            self.plot_widget.addItem(self.h_line, ignoreBounds=True)
-            self.plot_widget.addItem(self.cursor_label, ignoreBounds=True)
-            # 确保标签在最上层
-            self.cursor_label.setZValue(999)
-            self.v_line.setZValue(999)
-            self.h_line.setZValue(999)
-            # ===================================================
-
-            self.x_axis.set_ticks(df.index)
-
-            # 1. 准备 K 线数据
-            # 格式: (timestamp, open, close, low, high)
-            ohlc_data = []
-            x_axis_indices = range(len(df))  # 0, 1, 2, ... len-1
-            for i, (index_ts, row) in enumerate(df.iterrows()):
-                # 注意：这里第一个参数传 i (0,1,2...)，而不是时间戳
-                ohlc_data.append((i, row['Open'], row['Close'], row['Low'], row['High']))
-
-            # 2. 绘制 K 线 (放到最底层)
-            candle_item = CandlestickItem(ohlc_data)
-            self.plot_widget.addItem(candle_item)
-
-            # 3. 绘制均线 (SMA) - 这就是你要的"专业曲线"
-            # 快线 (SMA_F): 黄色
-            if 'SMA_F' in df.columns:
-                self.plot_widget.plot(x_axis_indices, df['SMA_F'].values, pen=pg.mkPen('#ffff00', width=1), name="SMA Fast")
-
-            # 慢线 (SMA_S): 紫色
-            if 'SMA_S' in df.columns:
-                self.plot_widget.plot(x_axis_indices, df['SMA_S'].values, pen=pg.mkPen('#da70d6', width=1), name="SMA Slow")
-
-            # 4. 绘制布林带 (Bollinger Bands) - 蓝色细线
-            if 'BBU' in df.columns:
-                self.plot_widget.plot(x_axis_indices, df['BBU'].values,
-                                      pen=pg.mkPen('#00bfff', width=1, style=Qt.PenStyle.DashLine))
-                self.plot_widget.plot(x_axis_indices, df['BBL'].values,
-                                      pen=pg.mkPen('#00bfff', width=1, style=Qt.PenStyle.DashLine))
+        # --- 核心绘图逻辑：常驻图元增量更新 (数组已在交易线程准备好) ---
+        if chart is not None and chart.n:
+            self.x_axis.set_ticks(chart.tick_labels)
+            self._prepare_hover(chart)
+
+            # 1. K 线：已收盘部分走缓存，只重绘 changed_from 之后的部分 (x 坐标 = 索引 0, 1, 2 ...)
+            self.candle_item.set_data(chart.open, chart.high, chart.low, chart.close,
+                                      changed_from=chart.changed_from)
+
+            # 2. 均线 / 布林带：直接 setData
+            for curve, values in ((self.curve_sma_f, chart.sma_f), (self.curve_sma_s, chart.sma_s),
+                                  (self.curve_bbu, chart.bbu), (self.curve_bbl, chart.bbl)):
+                if values is not None:
+                    curve.setData(chart.x, values, connect='finite')
+                else:
+                    curve.setData([], [])
 
             if self.is_first_plot:
                 self.plot_widget.plotItem.autoRange()
@@ -844,11 +893,15 @@ class MainWindow(QMainWindow):
         self.lbl_action.setText("正在计算最优策略...")
         self.lbl_action.setStyleSheet("color: #aaa;")
         self.btn_optimize.setEnabled(False)  # 禁用按钮防止重复点击
-        self.btn_optimize.setText("🧬 正在进化中 (约需10秒)...")
+        self.btn_optimize.setText("🧬 正在进化中...")
 
         # 启动线程
         self.opt_worker.start()
 
+    def on_optimization_progress(self, done, total, result):
+        """并行优化逐个回传结果，实时刷新进度"""
+        self.btn_optimize.setText(f"🧬 正在进化中 ({done}/{total})...")
+
     def apply_new_params(self, new_params):
         """优化完成，应用新参数"""
         logging.info(f"[System] 收到进化后的参数: {new_params}")
@@ -870,9 +923,20 @@ class MainWindow(QMainWindow):
 
         self.txt_tech_detail.setText(msg)
 
-    def on_mouse_moved(self, pos):
-        """鼠标移动事件 (已修改：显示完整年月日时分秒)"""
-        if self.df_cache is None or self.df_cache.empty:
+    def _prepare_hover(self, chart):
+        """十字光标查询数组：直接引用数据包里的列和格式化好的时间"""
+        self.hover_cols = {'Open': chart.open, 'High': chart.high, 'Low': chart.low, 'Close': chart.close}
+        if chart.rsi is not None: self.hover_cols['RSI'] = chart.rsi
+        self.hover_times = chart.hover_times
+        # 数据变了，下次移动鼠标时必须刷新浮窗
+        self.hover_idx = None
+
+    def on_mouse_moved(self, event):
+        """鼠标移动事件 (显示完整年月日时分秒)；经 SignalProxy 限流，悬停的 K 线没变时不重建浮窗"""
+        pos = event[0] if isinstance(event, tuple) else event
+        cols = self.hover_cols
+        n = len(self.hover_times)
+        if n == 0 or 'Close' not in cols:
             return
 
         view_box = self.plot_widget.plotItem.vb
@@ -881,46 +945,37 @@ class MainWindow(QMainWindow):
             x_val = mouse_point.x()
             y_val = mouse_point.y()
 
-            # 直接四舍五入获取索引
-            idx = int(round(x_val))
-
-            # 边界保护
-            if idx < 0: idx = 0
-            if idx >= len(self.df_cache): idx = len(self.df_cache) - 1
-
-            # 取数据
-            target_row = self.df_cache.iloc[idx]
-            target_time = self.df_cache.index[idx]
+            # 直接四舍五入获取索引 + 边界保护
+            idx = min(max(int(round(x_val)), 0), n - 1)
 
-            # 更新十字线
-            self.v_line.setPos(idx)
+            # 水平线跟随鼠标，浮窗固定在左上角 (视图可能被平移/缩放)
             self.h_line.setPos(y_val)
+            view_rect = view_box.viewRange()
+            self.cursor_label.setPos(view_rect[0][0], view_rect[1][1])
+            if idx == self.hover_idx:
+                return
+            self.hover_idx = idx
+            self.v_line.setPos(idx)
 
-            # 构造文本 (修改了时间格式)
-            color = "#ff4444" if target_row['Close'] >= target_row['Open'] else "#00cc00"
-
-            # --- 修改开始: 将 strftime('%H:%M') 改为 strftime('%Y-%m-%d %H:%M:%S') ---
-            time_str = target_time.strftime('%Y-%m-%d %H:%M:%S')
-            # ---------------------------------------------------------------------
+            # 构造文本
+            o, h, l, c = cols['Open'][idx], cols['High'][idx], cols['Low'][idx], cols['Close'][idx]
+            color = "#ff4444" if c >= o else "#00cc00"
+            time_str = self.hover_times[idx]
 
             info_html = f"""
             <div style='color: #eee; font-size: 12px; font-weight: bold;'>
                 <span style='color: #aaa;'>时间:</span> {time_str}<br>
-                <span style='color: #aaa;'>开盘:</span> <span style='color: {color};'>{target_row['Open']:.2f}</span><br>
-                <span style='color: #aaa;'>最高:</span> <span style='color: {color};'>{target_row['High']:.2f}</span><br>
-                <span style='color: #aaa;'>最低:</span> <span style='color: {color};'>{target_row['Low']:.2f}</span><br>
-                <span style='color: #aaa;'>收盘:</span> <span style='color: {color};'>{target_row['Close']:.2f}</span><br>
+                <span style='color: #aaa;'>开盘:</span> <span style='color: {color};'>{o:.2f}</span><br>
+                <span style='color: #aaa;'>最高:</span> <span style='color: {color};'>{h:.2f}</span><br>
+                <span style='color: #aaa;'>最低:</span> <span style='color: {color};'>{l:.2f}</span><br>
+                <span style='color: #aaa;'>收盘:</span> <span style='color: {color};'>{c:.2f}</span><br>
             """
-            if 'RSI' in target_row:
-                info_html += f"<span style='color: #aaa;'>RSI:</span> {target_row['RSI']:.1f}<br>"
+            if 'RSI' in cols:
+                info_html += f"<span style='color: #aaa;'>RSI:</span> {cols['RSI'][idx]:.1f}<br>"
             info_html += "</div>"
 
             self.cursor_label.setHtml(info_html)
 
-            # 标签固定在左上角
-            view_rect = view_box.viewRange()
-            self.cursor_label.setPos(view_rect[0][0], view_rect[1][1])
-
     def closeEvent(self, event):
         logging.info("正在关闭程序，清理线程中...")
 
@@ -928,15 +983,15 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'worker'): self.worker.stop()
         if hasattr(self, 'ai_worker'): self.ai_worker.stop()
         if hasattr(self, 'opt_worker'):
-            # 优化线程通常没有 stop 标志，且 backtesting 很难中断
-            # 这里我们可以选择 terminate (强制结束)，或者干脆不等待它
+            # 并行优化支持协作式取消：丢弃排队中的候选，进程池随即关闭
             if self.opt_worker.isRunning():
-                self.opt_worker.terminate()  # 强制结束计算
+                self.opt_worker.stop()
 
         # 2. 有限等待 (最多等 1 秒)
         # wait(1000) 表示最多等 1000 毫秒，如果线程还在跑，就返回 False，但也继续往下执行
         if hasattr(self, 'worker'): self.worker.wait(1000)
         if hasattr(self, 'ai_worker'): self.ai_worker.wait(1000)
+        if hasattr(self, 'opt_worker'): self.opt_worker.wait(1000)
 
         self.save_settings()
 
@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+CSV_NAMES = ['Date', 'Time'] + COLUMNS
+# 显式指定列类型：跳过 read_csv 的逐列类型推断，日期/时间保持字符串留给下面的向量化解析
+CSV_DTYPES = {'Date': str, 'Time': str, **{col: np.float64 for col in COLUMNS}}
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def parse_datetimes(date, time):
+    """
+    MetaTrader 的 Date (2024.01.02) + Time (17:00) -> int64 纳秒时间戳
+    M1 文件里不同的日期只有几百个、不同的时间最多 1440 个：
+    先 factorize 去重，只解析去重后的取值，再按编码相加，避免逐行拼接字符串再解析
+    """
+    d_codes, d_uniq = pd.factorize(np.asarray(date, dtype=object))
+    t_codes, t_uniq = pd.factorize(np.asarray(time, dtype=object))
+
+    days = pd.to_datetime(pd.Index(d_uniq), format='%Y.%m.%d').values.astype('datetime64[ns]').view(np.int64)
+    minutes = pd.to_timedelta(pd.Index(t_uniq) + ':00').values.astype('timedelta64[ns]').view(np.int64)
+
+    ts = days[d_codes] + minutes[t_codes]
+    valid = (d_codes >= 0) & (t_codes >= 0)
+    return ts, valid
+
+
+def make_frame(ts, columns):
+    """int64 时间戳 + 各列数组 -> 以 Datetime 为索引的 OHLCV DataFrame"""
+    index = pd.DatetimeIndex(np.asarray(ts, dtype=np.int64).view('datetime64[ns]'), name='Datetime')
+    return pd.DataFrame({col: columns[col] for col in COLUMNS}, index=index, copy=False)
+
+
+def read_mt_csv(csv_path):
+    """解析 MetaTrader M1 CSV (无表头: Date, Time, Open, High, Low, Close, Volume)"""
+    raw = pd.read_csv(csv_path, names=CSV_NAMES, dtype=CSV_DTYPES, engine='c')
+    ts, valid = parse_datetimes(raw['Date'], raw['Time'])
+    columns = {col: raw[col].to_numpy()[valid] for col in COLUMNS}
+    df = make_frame(ts[valid], columns)
+    return df.sort_index()
+
+
+def resample_ohlcv(df, rule):
+    """M1 -> 目标周期 (与原 load_data 的聚合规则一致，空 K 线丢弃)"""
+    return df.resample(rule).agg(OHLCV_AGG).dropna()
+
+
+def stream_resample(csv_path, rule, chunksize=500_000):
+    """
+    分块读取 CSV 并增量重采样，峰值内存 ≈ 一个分块 + 重采样后的结果 (不再整体载入 M1 数据)
+    MetaTrader 导出的文件按时间顺序排列：每个分块末尾那根尚未收完的 K 线，
+    其原始 M1 行留到下一个分块一起聚合，保证跨分块的 K 线与整体重采样结果一致
+    """
+    origin = None
+    carry = None
+    parts = []
+    # 只有固定长度的周期 (分钟/小时) 受分箱原点影响；日线及以上按日历对齐
+    tick_like = isinstance(pd.tseries.frequencies.to_offset(rule), pd.offsets.Tick)
+
+    reader = pd.read_csv(csv_path, names=CSV_NAMES, dtype=CSV_DTYPES, engine='c', chunksize=chunksize)
+    for raw in reader:
+        ts, valid = parse_datetimes(raw['Date'], raw['Time'])
+        chunk = make_frame(ts[valid], {col: raw[col].to_numpy()[valid] for col in COLUMNS})
+        if carry is not None: chunk = pd.concat([carry, chunk])
+        chunk = chunk.sort_index(kind='stable')
+        if chunk.empty: continue
+
+        # 分箱原点固定为数据第一天的零点 (与整体 resample 的默认 origin='start_day' 相同)
+        if origin is None: origin = chunk.index[0].normalize() if tick_like else 'start_day'
+        bins = chunk.resample(rule, origin=origin)
+        bars = bins.agg(OHLCV_AGG)
+
+        # 最后一根 K 线可能还没收完：它的原始行 (分块已排序，即从该箱第一行到末尾) 留给下一个分块
+        first_row = pd.Series(np.arange(len(chunk)), index=chunk.index).resample(rule, origin=origin).min()
+        carry = chunk.iloc[int(first_row.iloc[-1]):]
+        parts.append(bars.iloc[:-1].dropna())
+        del raw, chunk
+
+    if carry is not None and not carry.empty:
+        parts.append(carry.resample(rule, origin=origin).agg(OHLCV_AGG).dropna())
+    if not parts:
+        return make_frame(np.empty(0, dtype=np.int64), {col: np.empty(0) for col in COLUMNS})
+
+    df = pd.concat(parts)
+    if not df.index.is_unique:
+        # 文件中有乱序的行时，同一根 K 线可能在两个分块里各出现一次，按时间顺序合并
+        print("[Loader] ⚠️ 数据存在乱序，已合并跨分块的重复 K 线")
+        df = df.sort_index(kind='stable').groupby(level=0).agg(OHLCV_AGG)
+    return df
+
+
+class ParsedCache:
+    """
+    CSV 解析结果的列式二进制缓存 (与 CSV 同目录的 <文件名>.npcache/)
+    每个周期一个子目录，每列一个 .npy 文件；meta.json 记录源文件的 mtime/大小，
+    源文件变化后整个缓存作废重建
+    """
+    VERSION = 1
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.root = csv_path + ".npcache"
+        self.meta_path = os.path.join(self.root, "meta.json")
+        st = os.stat(csv_path)
+        self.source = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'version': self.VERSION}
+
+    @staticmethod
+    def key(rule):
+        """周期 -> 子目录名 (None 表示未重采样的 M1 原始数据)"""
+        if not rule: return "raw"
+        return "tf_" + re.sub(r'[^0-9A-Za-z]+', '_', str(rule)).strip('_')
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return None
+
+    def _write_meta(self, meta):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _valid_meta(self):
+        meta = self._read_meta()
+        if meta is None or meta.get('source') != self.source: return None
+        return meta
+
+    def load(self, rule):
+        """命中返回 DataFrame，未命中/缓存过期返回 None"""
+        meta = self._valid_meta()
+        key = self.key(rule)
+        if meta is None or key not in meta.get('frames', []): return None
+
+        folder = os.path.join(self.root, key)
+        try:
+            ts = np.load(os.path.join(folder, "ts.npy"))
+            columns = {col: np.load(os.path.join(folder, f"{col}.npy")) for col in COLUMNS}
+        except Exception:
+            return None
+        if any(len(v) != len(ts) for v in columns.values()): return None
+        return make_frame(ts, columns)
+
+    def save(self, rule, df):
+        meta = self._valid_meta()
+        if meta is None:
+            # 源文件已变化 (或首次写入)：清掉旧缓存
+            shutil.rmtree(self.root, ignore_errors=True)
+            meta = {'source': self.source, 'frames': []}
+
+        key = self.key(rule)
+        folder = os.path.join(self.root, key)
+        os.makedirs(folder, exist_ok=True)
+
+        arrays = {'ts': pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').view(np.int64)}
+        arrays.update({col: df[col].to_numpy(dtype=np.float64) for col in COLUMNS})
+        for name, values in arrays.items():
+            # 先写临时文件再替换，多个进程同时回测同一文件时不会读到写了一半的数组
+            tmp_path = os.path.join(folder, f"{name}.{os.getpid()}.tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(values))
+            os.replace(tmp_path, os.path.join(folder, f"{name}.npy"))
+
+        if key not in meta['frames']: meta['frames'].append(key)
+        self._write_meta(meta)
+
+
+def load_bars(csv_path, resample='15min', use_cache=True, chunksize=None):
+    """
+    加载 MetaTrader CSV 并重采样；use_cache=True 时优先读取 .npcache 列式缓存：
+    目标周期命中直接返回，否则复用已解析的 M1 数据重新聚合，只有都未命中才解析 CSV
+    chunksize 不为空时走分块流式重采样 (适合多年的 M1 数据)，只缓存重采样后的结果
+    """
+    stream = bool(chunksize) and bool(resample)
+    cache = None
+    if use_cache:
+        try:
+            cache = ParsedCache(csv_path)
+            df = cache.load(resample)
+            if df is not None: return df
+        except Exception as e:
+            print(f"[Loader] 缓存读取失败: {e}")
+            cache = None
+
+    if stream:
+        raw, parsed = None, False
+        df = stream_resample(csv_path, resample, chunksize)
+    else:
+        raw = cache.load(None) if cache is not None else None
+        parsed = raw is None
+        if parsed: raw = read_mt_csv(csv_path)
+        df = resample_ohlcv(raw, resample) if resample else raw
+
+    if cache is not None:
+        try:
+            if parsed and resample: cache.save(None, raw)
+            cache.save(resample, df)
+        except Exception as e:
+            print(f"[Loader] 缓存写入失败: {e}")
+    return df
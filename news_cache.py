@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+
+
+class HeadlineScoreCache:
+    """
+    本地 LLM 新闻打分的持久化缓存 (标题归一化后的哈希 -> 分数/时间/模型)
+    只有没见过的标题才需要送去 Ollama；按 TTL 过期，超过容量按 LRU 淘汰，
+    落盘为 JSON (写临时文件 + os.replace)，重启后第一次扫描不必全部重新打分
+    """
+
+    def __init__(self, path="news_score_cache.json", ttl=24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> {'score', 'ts' (打分时间), 'access' (最近使用), 'model'}，按最近使用排序
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def key(title):
+        """去掉来源标签、统一大小写/空白/标点后取哈希，同一条新闻换个源也能命中"""
+        text = re.sub(r'^\s*\[[^\]]*\]\s*', '', title)
+        text = re.sub(r'[\W_]+', ' ', text.lower()).strip()
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.path): return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            # 按最近使用时间恢复 LRU 顺序 (旧格式没有 access 字段，退回打分时间)
+            for k, v in sorted(data.items(), key=lambda kv: kv[1].get('access', kv[1]['ts'])):
+                if now - v['ts'] < self.ttl: self._entries[k] = v
+        except Exception as e:
+            print(f"[ScoreCache] 缓存读取失败，重新开始: {e}")
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, title, model):
+        """命中返回分数；未命中/已过期/换了模型返回 None"""
+        k = self.key(title)
+        entry = self._entries.get(k)
+        if entry is None: return None
+        if entry['model'] != model or time.time() - entry['ts'] >= self.ttl:
+            del self._entries[k]
+            self._dirty = True
+            return None
+        entry['access'] = time.time()
+        self._entries.move_to_end(k)
+        self._dirty = True
+        return entry['score']
+
+    def put(self, title, model, score):
+        k = self.key(title)
+        now = time.time()
+        self._entries[k] = {'score': int(score), 'ts': now, 'access': now, 'model': model}
+        self._entries.move_to_end(k)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def flush(self):
+        """有变化时原子地写回磁盘"""
+        if not self._dirty: return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            print(f"[ScoreCache] 缓存写入失败: {e}")
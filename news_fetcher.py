@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import feedparser
+import requests
+
+
+# === 默认新闻源 (可在 AIAgent(news_sources=...) 中整体替换) ===
+# url: RSS 地址；tag: 标题前缀；lang: en/cn (英文排在前面)；limit: 每个源最多取几条
+DEFAULT_NEWS_SOURCES = [
+    # 1. CNBC 全球市场 (宏观/美联储)
+    {"url": "https://search.cnbc.com/rs/search/combinedcms/view.xml?partnerId=wrss01&id=10000664",
+     "tag": "[CNBC]", "lang": "en", "limit": 8},
+    # 2. FXStreet (外汇/黄金/加密 交易员必看)
+    {"url": "https://www.fxstreet.com/rss/news", "tag": "[FXStreet]", "lang": "en", "limit": 8},
+    # 3. Investing.com 英文版 (大宗商品)
+    {"url": "https://www.investing.com/rss/news_25.rss", "tag": "[Inv-US]", "lang": "en", "limit": 8},
+    # 4. Investing.com 中文版 (作为补充)
+    {"url": "https://cn.investing.com/rss/news_285.rss", "tag": "[Inv-CN]", "lang": "cn", "limit": 5},
+]
+
+
+class FeedFetcher:
+    """
+    并发 RSS 抓取器
+    1. 所有源同时请求，整轮扫描耗时 ≈ 最慢 (或超时) 的那个源，而不是各源之和
+    2. 记住每个源的 ETag / Last-Modified，下一轮发条件请求；未更新的源只花一个 304，
+       直接复用上一轮解析好的条目
+    """
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Quantalytics/1.0"
+
+    def __init__(self, sources=None, timeout=8, max_workers=8):
+        self.sources = list(sources if sources is not None else DEFAULT_NEWS_SOURCES)
+        self.timeout = timeout  # 单个源的超时 (秒)，同时也是整轮扫描的截止时间
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rss")
+        self._session = requests.Session()
+        self._session.headers['User-Agent'] = self.USER_AGENT
+        self._lock = threading.Lock()
+        self._state = {}  # url -> {'etag', 'modified', 'items'}
+        self.stats = {}  # url -> {'status' (HTTP 状态码 / 'error' / 'timeout'), 'latency', 'not_modified'}
+
+    def _fetch_one(self, source):
+        url = source['url']
+        with self._lock:
+            state = dict(self._state.get(url, {}))
+
+        headers = {}
+        if state.get('etag'): headers['If-None-Match'] = state['etag']
+        if state.get('modified'): headers['If-Modified-Since'] = state['modified']
+
+        start = time.perf_counter()
+        try:
+            resp = self._session.get(url, headers=headers, timeout=self.timeout)
+        except Exception:
+            self._record(url, 'error', time.perf_counter() - start)
+            raise
+        latency = time.perf_counter() - start
+
+        if resp.status_code == 304:
+            items = state.get('items', [])
+        elif resp.status_code == 200:
+            feed = feedparser.parse(resp.content)
+            items = [{
+                'title': f"{source['tag']} {entry.title}",  # 加上来源标签
+                'link': entry.get('link', '#'),
+                'lang': source.get('lang', 'en'),
+            } for entry in feed.entries[:source.get('limit', 8)] if entry.get('title')]
+            with self._lock:
+                self._state[url] = {'etag': resp.headers.get('ETag'),
+                                    'modified': resp.headers.get('Last-Modified'),
+                                    'items': items}
+        else:
+            self._record(url, resp.status_code, latency)
+            raise RuntimeError(f"Status: {resp.status_code}")
+
+        self._record(url, resp.status_code, latency)
+        return items
+
+    def _record(self, url, status, latency):
+        with self._lock:
+            self.stats[url] = {'status': status, 'latency': latency, 'not_modified': status == 304}
+
+    def fetch_all(self):
+        """并发抓取全部源，按源列表顺序返回新闻条目；超时/失败的源本轮跳过"""
+        start = time.perf_counter()
+        futures = [self._pool.submit(self._fetch_one, source) for source in self.sources]
+        # 截止时间 = 单源超时 + 少量解析余量；超时未完成的请求留在后台自行结束
+        wait(futures, timeout=self.timeout + 2)
+
+        news = []
+        for source, future in zip(self.sources, futures):
+            if not future.done():
+                print(f"  -> {source['tag']} 超时 (>{self.timeout}s)，本轮跳过")
+                future.cancel()
+                self._record(source['url'], 'timeout', time.perf_counter() - start)
+                continue
+            try:
+                news.extend(future.result())
+            except Exception as e:
+                print(f"  -> {source['tag']} 连接失败 ({e})")
+        return news
+
+    def submit(self, fn, *args, **kwargs):
+        """在抓取线程池里执行其它取数函数 (如 AkShare 兜底)，调用方用 result(timeout) 控制等待"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
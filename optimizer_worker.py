@@ -1,83 +1,96 @@
+import pandas as pd
 from PyQt6.QtCore import QThread, pyqtSignal
-from backtesting import Backtest
-from strategy import AdaptiveMomentumReversion  # 确保目录下有 strategy.py
+from bar_db import BarDatabase
 from data_dispatcher import DataHandler
-import pandas as pd
-import numpy as np
+from parallel_optimizer import ParallelOptimizer  # 子进程中回测 strategy.py 的 AdaptiveMomentumReversion
 
 
 class OptimizerWorker(QThread):
     """
     参数优化工作线程
-    负责：拉取历史数据 -> 运行回测优化 -> 返回最优参数
+    负责：读取历史数据 -> 运行回测优化 -> 返回最优参数
+    历史数据只读本地 K 线库 (联网回填由界面的 DataHandler 负责)，不另建 DataHandler：
+    那会再启动一套报价源、打开正在写入的 gold_price_cache.bin 并注册退出钩子
     """
     # 信号：优化完成，传回一个字典 (best_params)
     optimization_finished = pyqtSignal(dict)
+    # 信号：单个候选回测完成 (已完成数, 总数, 结果)
+    candidate_finished = pyqtSignal(int, int, dict)
+
+    HISTORY_DAYS = 60
 
-    def __init__(self):
+    def __init__(self, history_db=None):
         super().__init__()
-        self.data_handler = DataHandler()  # 用于拉取历史数据
+        self.history_db = history_db if history_db is not None else BarDatabase(DataHandler.HISTORY_ROOT)
+        self.optimizer = None
+        self._stop_requested = False
 
     def run(self):
         print("[Optimizer] 启动参数进化程序...")
+        self._stop_requested = False
+        self.optimizer = None
 
-        # 1. 拉取数据 (例如过去 60 天的 15分钟线)
-        df = self.data_handler.fetch_long_history(days=60)
+        # 1. 读取数据 (过去 60 天的 1 分钟线)
+        try:
+            df = self.history_db.read(start=pd.Timestamp.now() - pd.Timedelta(days=self.HISTORY_DAYS))
+        except Exception as e:
+            print(f"[Optimizer] 本地 K 线库读取失败: {e}")
+            return
 
         if df.empty or len(df) < 500:
             print("[Optimizer] ⚠️ 历史数据不足，跳过优化。")
             return
 
+        if self._stop_requested: return
+
         # 2. 运行优化逻辑
         try:
             best_params = self._run_optimization_logic(df)
             # 3. 发送结果
-            self.optimization_finished.emit(best_params)
+            if best_params:
+                self.optimization_finished.emit(best_params)
         except Exception as e:
             print(f"[Optimizer] 优化过程出错: {e}")
 
+    def stop(self):
+        """请求中止优化 (进程池会丢弃排队任务，线程随即退出)"""
+        self._stop_requested = True
+        if self.optimizer is not None:
+            self.optimizer.cancel()
+
     def _run_optimization_logic(self, df):
         """
-        核心回测优化逻辑 (保留了你原来的逻辑)
+        核心回测优化逻辑：参数网格分发到多进程并行回测，结果逐个回传
         """
-        print(f"[Optimizer] 正在对 {len(df)} 条 K 线进行暴力计算...")
+        print(f"[Optimizer] 正在对 {len(df)} 条 K 线进行暴力计算 (并行)...")
 
-        # 初始化回测引擎
         # 必须指定 cash 和 commission，否则 backtesting 可能会报错
-        bt = Backtest(df, AdaptiveMomentumReversion, cash=100000, commission=0.00002)
-
-        def robust_sharpe(stats):
-            # 1. 如果交易次数为 0，直接给负分
-            if stats['# Trades'] == 0:
-                return -1.0
+        # engine='fast'：向量化回测，结果与 bt.run() 一致，可以直接跑完整网格
+        self.optimizer = ParallelOptimizer(df, cash=100000, commission=0.00002, engine='fast')
+        # 先赋值再检查：stop() 要么在这里被看到，要么能拿到 self.optimizer 直接取消，不会丢失
+        if self._stop_requested: self.optimizer.cancel()
 
-            # 2. 如果夏普比率是 nan，给 0 分
-            if np.isnan(stats['Sharpe Ratio']):
-                return 0.0
+        def on_result(done, total, result):
+            self.candidate_finished.emit(done, total, result)
 
-            # 3. 正常返回
-            return stats['Sharpe Ratio']
-
-        # 运行优化
         # 注意：这里的参数名必须和 strategy.py 里的变量名一致
-        stats = bt.optimize(
-            rsi_period=range(10, 25, 2),  # 10, 12... 24
-            sma_slow=range(20, 60, 5),  # 20, 25... 55
-            bb_period=range(15, 30, 3),  # 15, 18... 27
-            maximize=robust_sharpe,  # 目标：最大化夏普比率
-            return_heatmap=False,  # 不需要热力图，只要结果
-            max_tries=200  # 限制尝试次数
+        best = self.optimizer.run(
+            grid={
+                'rsi_period': range(10, 25, 2),  # 10, 12... 24
+                'sma_slow': range(20, 60, 5),  # 20, 25... 55
+                'bb_period': range(15, 30, 3),  # 15, 18... 27
+            },
+            max_tries=None,  # 快速引擎下不再抽样
+            on_result=on_result,
         )
 
-        # 提取最优参数
-        # stats._strategy 是回测中表现最好的那个策略实例
-        best_params = {
-            'rsi_period': stats._strategy.rsi_period,
-            'sma_slow': stats._strategy.sma_slow,
-            'bb_period': stats._strategy.bb_period,
-        }
+        if best is None:
+            print("[Optimizer] ⚠️ 优化已取消或全部失败。")
+            return None
+
+        best_params = dict(best['params'])
 
-        print(f"[Optimizer] ✅ 优化完成! 最佳夏普比率: {stats['Sharpe Ratio']:.2f}")
+        print(f"[Optimizer] ✅ 优化完成! 最佳夏普比率: {best['sharpe']:.2f}")
         print(f"[Optimizer] 推荐参数: {best_params}")
 
-        return best_params
\ No newline at end of file
+        return best_params
@@ -0,0 +1,195 @@
+import itertools
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+def robust_sharpe(stats):
+    """优化目标：无交易给负分，夏普为 nan 给 0 分"""
+    # 1. 如果交易次数为 0，直接给负分
+    if stats['# Trades'] == 0:
+        return -1.0
+
+    # 2. 如果夏普比率是 nan，给 0 分
+    if np.isnan(stats['Sharpe Ratio']):
+        return 0.0
+
+    # 3. 正常返回
+    return stats['Sharpe Ratio']
+
+
+class SharedOHLC:
+    """
+    把 OHLCV 矩阵和时间戳放进共享内存，子进程按名字挂载，避免每个任务都 pickle 一遍 DataFrame
+    """
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, df):
+        n = len(df)
+        self.shape = (len(self.COLUMNS), n)
+        self._values = shared_memory.SharedMemory(create=True, size=max(8 * len(self.COLUMNS) * n, 1))
+        self._ts = shared_memory.SharedMemory(create=True, size=max(8 * n, 1))
+
+        values = np.ndarray(self.shape, dtype=np.float64, buffer=self._values.buf)
+        for i, col in enumerate(self.COLUMNS):
+            values[i] = df[col].to_numpy(dtype=np.float64) if col in df.columns else 0.0
+        ts = np.ndarray((n,), dtype=np.int64, buffer=self._ts.buf)
+        ts[:] = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').view(np.int64)
+        del values, ts
+
+    @property
+    def handle(self):
+        """传给子进程的轻量描述 (只有名字和形状)"""
+        return self._values.name, self._ts.name, self.shape
+
+    def release(self):
+        for shm in (self._values, self._ts):
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+
+    @staticmethod
+    def attach(handle):
+        """子进程侧：挂载共享内存并构建 DataFrame (列直接引用共享内存，不拷贝)"""
+        values_name, ts_name, shape = handle
+        blocks = [_open_shared(values_name), _open_shared(ts_name)]
+        values = np.ndarray(shape, dtype=np.float64, buffer=blocks[0].buf)
+        ts = np.ndarray((shape[1],), dtype=np.int64, buffer=blocks[1].buf)
+
+        index = pd.DatetimeIndex(ts.view('datetime64[ns]'))
+        df = pd.DataFrame({col: values[i] for i, col in enumerate(SharedOHLC.COLUMNS)}, index=index, copy=False)
+        return df, blocks
+
+
+def _open_shared(name):
+    # Python 3.13+ 可关闭 resource_tracker 跟踪，避免子进程退出时误删父进程的共享内存
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# === 子进程全局状态 (每个进程在 initializer 里只构建一次) ===
+_worker_bt = None
+_worker_blocks = None
+
+
+def _init_worker(handle, cash, commission, engine):
+    global _worker_bt, _worker_blocks
+    df, _worker_blocks = SharedOHLC.attach(handle)
+
+    if engine == 'fast':
+        # 向量化快速回测，统计结果与 bt.run() 一致
+        from fast_backtest import FastBacktest
+        _worker_bt = FastBacktest(df, cash=cash, commission=commission)
+    else:
+        from backtesting import Backtest
+        from strategy import AdaptiveMomentumReversion
+        _worker_bt = Backtest(df, AdaptiveMomentumReversion, cash=cash, commission=commission)
+
+
+def _run_candidate(params):
+    """在子进程中回测一组参数，只回传精简结果"""
+    try:
+        stats = _worker_bt.run(**params)
+        return {
+            'params': params,
+            'score': float(robust_sharpe(stats)),
+            'sharpe': float(stats['Sharpe Ratio']),
+            'trades': int(stats['# Trades']),
+            'return_pct': float(stats['Return [%]']),
+        }
+    except Exception as e:
+        return {'params': params, 'score': float('-inf'), 'error': str(e)}
+
+
+class ParallelOptimizer:
+    """
+    多进程参数搜索引擎
+    参数网格按候选分发到进程池，结果完成一个回传一个；cancel() 可随时安全中止
+    """
+    CANCEL_POLL = 0.2  # 等待回测结果时检查取消请求的间隔 (秒)
+
+    def __init__(self, df, cash=100000, commission=0.00002, processes=None, engine='backtesting'):
+        self.df = df
+        self.cash = cash
+        self.commission = commission
+        self.engine = engine  # 'backtesting' (bt.run) 或 'fast' (FastBacktest)
+        self.processes = processes or os.cpu_count() or 1
+        self._cancel = threading.Event()
+
+    @staticmethod
+    def build_candidates(grid, max_tries=None, seed=None):
+        """展开参数网格；超过 max_tries 时随机抽样 (与 bt.optimize 的行为一致)"""
+        keys = list(grid.keys())
+        candidates = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+        if max_tries and len(candidates) > max_tries:
+            candidates = random.Random(seed).sample(candidates, max_tries)
+        return candidates
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self, grid, max_tries=None, on_result=None):
+        """
+        执行搜索，返回最优结果 (dict)；被取消或全部失败时返回 None
+        on_result(done, total, result) 在每个候选完成时回调
+        """
+        candidates = self.build_candidates(grid, max_tries)
+        total = len(candidates)
+        if total == 0 or self.cancelled: return None
+
+        shared = SharedOHLC(self.df)
+        # spawn：Qt 进程里有多个线程，fork 不安全
+        ctx = multiprocessing.get_context('spawn')
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.processes, total),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(shared.handle, self.cash, self.commission, self.engine),
+        )
+
+        best = None
+        done = 0
+        try:
+            pending = {executor.submit(_run_candidate, params) for params in candidates}
+            # 带超时地等待：单个回测很慢时，取消请求也能在 CANCEL_POLL 秒内被看到
+            while pending and not self.cancelled:
+                finished, pending = wait(pending, timeout=self.CANCEL_POLL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if self.cancelled: break
+
+                    result = future.result()
+                    done += 1
+                    if best is None or result['score'] > best['score']:
+                        best = result
+                    if on_result: on_result(done, total, result)
+        finally:
+            if self.cancelled:
+                # 取消时立即返回：由后台线程丢弃排队中的任务，等正在运行的回测结束后再释放共享内存
+                # (该线程同时持有 executor 的引用，否则它被回收后排队任务不会被取消，仍会逐个跑完)
+                threading.Thread(target=self._release_after, args=(executor, shared),
+                                 name="optimizer-cleanup", daemon=True).start()
+            else:
+                self._release_after(executor, shared)
+
+        if self.cancelled or best is None or 'error' in best:
+            return None
+        return best
+
+    @staticmethod
+    def _release_after(executor, shared):
+        executor.shutdown(wait=True, cancel_futures=True)
+        shared.release()
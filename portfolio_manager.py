@@ -1,7 +1,32 @@
+import numpy as np
+
+
 class PortfolioManager:
     """
     资金管理与仓位建议系统 (双账户版)
     """
+    # 动作代码 (批量接口返回的 action 数组)
+    HOLD, BUY, SELL = 0, 1, 2
+    ACTIONS = ("观望", "买入", "卖出")
+
+    # 理由代码 (批量接口返回的 reason 数组)，文字见 REASON_TEXT
+    (R_NONE, R_BAD_PRICE, R_NEUTRAL, R_NO_CASH, R_BUY_AI_BULL, R_BUY_AI_BEAR, R_BUY_AI_WEAK,
+     R_NO_HOLDINGS, R_SELL_PANIC, R_SELL_AI_BEAR, R_SELL_AI_BULL) = range(11)
+    REASON_TEXT = (
+        "",
+        "当前价格数据异常，无法计算。",
+        "技术面无明确方向，建议持仓不动。",
+        "资金不足。",
+        "技术金叉 + AI看多({ai_score}分)，建议积极加仓。",
+        "技术看涨但 AI 严重看空({ai_score}分)，建议空仓避险！",
+        "技术看涨但 AI 微弱分歧({ai_score}分)，建议减半试仓。",
+        "无持仓。",
+        "恐慌清仓！",
+        "技术死叉 + AI看空({ai_score}分)，减仓。",
+        "AI看多({ai_score}分)，少量止盈。",
+    )
+    # 带克重说明的理由 (按建议金额 / 价格估算)
+    _WITH_GRAMS = {R_BUY_AI_BULL, R_BUY_AI_WEAK, R_SELL_PANIC, R_SELL_AI_BEAR, R_SELL_AI_BULL}
 
     def __init__(self):
         # 资金分配策略
@@ -13,49 +38,47 @@ class PortfolioManager:
         """
         [改进版] 增加基于价格的手数计算
         """
+        action, amount, code = self._decide(current_holdings, cash_balance, signal, ai_score, current_price)
+        return self.ACTIONS[action], round(amount, 2), self.reason_text(code, ai_score, amount, current_price)
+
+    def decide(self, current_holdings, cash_balance, signal, ai_score, current_price):
+        """单笔决策 (回放/模拟用) -> (动作代码, 金额 (已取整到分), 理由代码)，与 calculate_suggestion 一致"""
+        action, amount, code = self._decide(current_holdings, cash_balance, signal, ai_score, current_price)
+        return action, round(amount, 2), code
+
+    def _decide(self, current_holdings, cash_balance, signal, ai_score, current_price):
+        """单笔决策 -> (动作代码, 未取整金额, 理由代码)"""
         # 防止价格为 0 或 None 导致除零错误
         if not current_price or current_price <= 0:
-            return "观望", 0.0, "当前价格数据异常，无法计算。"
+            return self.HOLD, 0.0, self.R_BAD_PRICE
 
         if signal == "NEUTRAL":
-            return "观望", 0.0, "技术面无明确方向，建议持仓不动。"
+            return self.HOLD, 0.0, self.R_NEUTRAL
 
-        amount = 0.0
-        reason = ""
-        action = "观望"
         confidence_multiplier = 1.0 + (abs(ai_score) / 20.0)
 
         # --- 买入逻辑 ---
         if signal == "BUY":
-            action = "买入"
             if cash_balance < 100:
-                return "买入", 0.0, "资金不足。"
+                return self.BUY, 0.0, self.R_NO_CASH
 
             base_buy = max(cash_balance * self.buy_ratio, self.min_trade_amount)
 
             if ai_score > 0:
                 suggested_amount = base_buy * confidence_multiplier
-                reason = f"技术金叉 + AI看多({ai_score}分)，建议积极加仓。"
+                code = self.R_BUY_AI_BULL
             else:
                 if ai_score < -2:
-                    suggested_amount = 0.0
-                    reason = f"技术看涨但 AI 严重看空({ai_score}分)，建议空仓避险！"
-                    return "观望", 0.0, reason  # 直接返回观望
-                else:
-                    suggested_amount = base_buy * 0.5
-                    reason = f"技术看涨但 AI 微弱分歧({ai_score}分)，建议减半试仓。"
-
-            amount = min(suggested_amount, cash_balance)
+                    return self.HOLD, 0.0, self.R_BUY_AI_BEAR  # 直接返回观望
+                suggested_amount = base_buy * 0.5
+                code = self.R_BUY_AI_WEAK
 
-            # 计算大概能买多少克 (仅作展示)
-            grams = amount / current_price
-            reason += f" (约 {grams:.2f} 克)"
+            return self.BUY, min(suggested_amount, cash_balance), code
 
         # --- 卖出逻辑 ---
-        elif signal == "SELL":
-            action = "卖出"
+        if signal == "SELL":
             if current_holdings < 100:
-                return "卖出", 0.0, "无持仓。"
+                return self.SELL, 0.0, self.R_NO_HOLDINGS
 
             base_sell = max(current_holdings * self.sell_ratio, self.min_trade_amount)
 
@@ -63,17 +86,92 @@ class PortfolioManager:
                 suggested_amount = base_sell * confidence_multiplier * 1.5
                 if ai_score < -7:
                     suggested_amount = current_holdings
-                    reason = "恐慌清仓！"
+                    code = self.R_SELL_PANIC
                 else:
-                    reason = f"技术死叉 + AI看空({ai_score}分)，减仓。"
+                    code = self.R_SELL_AI_BEAR
             else:
                 suggested_amount = base_sell * 0.5
-                reason = f"AI看多({ai_score}分)，少量止盈。"
+                code = self.R_SELL_AI_BULL
+
+            return self.SELL, min(suggested_amount, current_holdings), code
+
+        return self.HOLD, 0.0, self.R_NONE
+
+    def reason_text(self, code, ai_score, amount, current_price):
+        """理由代码 -> 界面显示的文字 (买卖建议附带约合克重)"""
+        text = self.REASON_TEXT[code].format(ai_score=ai_score)
+        if code in self._WITH_GRAMS:
+            # 计算大概能买/卖多少克 (仅作展示)
+            text += f" (约 {amount / current_price:.2f} 克)"
+        return text
+
+    def calculate_suggestions(self, holdings, cash, signal, ai_score, price,
+                              buy_ratio=None, sell_ratio=None, min_trade_amount=None):
+        """
+        批量版 calculate_suggestion (研究/回放用)，逐元素结果与单笔版本完全一致
+        输入都是可广播的数组；signal 可以是 "BUY"/"SELL"/"NEUTRAL" 字符串数组，
+        也可以是数值 (>0 买、<0 卖、0 观望)。buy_ratio / sell_ratio / min_trade_amount 不传时用实例参数，
+        传入形如 (k, 1) 的数组即可一次算出 k 组参数 × n 根 K 线的网格
+        返回 (action 代码数组, 金额数组 (已取整到分), reason 代码数组)
+        """
+        buy_ratio = self.buy_ratio if buy_ratio is None else np.asarray(buy_ratio, dtype=float)
+        sell_ratio = self.sell_ratio if sell_ratio is None else np.asarray(sell_ratio, dtype=float)
+        min_amt = self.min_trade_amount if min_trade_amount is None else np.asarray(min_trade_amount, dtype=float)
+
+        holdings = np.asarray(holdings, dtype=float)
+        cash = np.asarray(cash, dtype=float)
+        ai = np.asarray(ai_score, dtype=float)
+        price = np.asarray(price, dtype=float)
+        signal = np.asarray(signal)
+        if signal.dtype.kind in 'iufb':
+            is_buy, is_sell, is_neutral = signal > 0, signal < 0, signal == 0
+        else:
+            is_buy, is_sell, is_neutral = signal == "BUY", signal == "SELL", signal == "NEUTRAL"
+        bad_price = price <= 0  # 与 `not price or price <= 0` 一致 (NaN 不算异常)
+
+        multiplier = 1.0 + np.abs(ai) / 20.0
+
+        # --- 买入 ---
+        base_buy = np.maximum(cash * buy_ratio, min_amt)
+        buy_reason = np.where(cash < 100, self.R_NO_CASH,
+                              np.where(ai > 0, self.R_BUY_AI_BULL,
+                                       np.where(ai < -2, self.R_BUY_AI_BEAR, self.R_BUY_AI_WEAK)))
+        buy_action = np.where(buy_reason == self.R_BUY_AI_BEAR, self.HOLD, self.BUY)
+        buy_amount = np.where((cash < 100) | (buy_reason == self.R_BUY_AI_BEAR), 0.0,
+                              np.minimum(np.where(ai > 0, base_buy * multiplier, base_buy * 0.5), cash))
+
+        # --- 卖出 ---
+        base_sell = np.maximum(holdings * sell_ratio, min_amt)
+        sell_suggest = np.where(ai < 0, np.where(ai < -7, holdings, base_sell * multiplier * 1.5), base_sell * 0.5)
+        sell_amount = np.where(holdings < 100, 0.0, np.minimum(sell_suggest, holdings))
+        sell_reason = np.where(holdings < 100, self.R_NO_HOLDINGS,
+                               np.where(ai < 0, np.where(ai < -7, self.R_SELL_PANIC, self.R_SELL_AI_BEAR),
+                                        self.R_SELL_AI_BULL))
 
-            amount = min(suggested_amount, current_holdings)
+        # 与单笔版本相同的优先级：价格异常 > 观望信号 > 买 / 卖
+        conditions = [bad_price, is_neutral, is_buy, is_sell]
+        action = np.select(conditions, [self.HOLD, self.HOLD, buy_action, self.SELL], self.HOLD).astype(np.int8)
+        reason = np.select(conditions, [self.R_BAD_PRICE, self.R_NEUTRAL, buy_reason, sell_reason],
+                           self.R_NONE).astype(np.int8)
+        amount = np.select(conditions, [0.0, 0.0, buy_amount, sell_amount], 0.0)
 
-            # === 新增：计算卖出克重 ===
-            grams = amount / current_price
-            reason += f" (约 {grams:.2f} 克)"
+        # 三个结果统一成全部输入广播后的形状 (只有部分输入是数组时，np.select 的结果可能更小)
+        shape = np.broadcast_shapes(holdings.shape, cash.shape, ai.shape, price.shape, signal.shape,
+                                    np.shape(buy_ratio), np.shape(sell_ratio), np.shape(min_amt))
+        action = np.broadcast_to(action, shape).copy()
+        reason = np.broadcast_to(reason, shape).copy()
+        amount = np.broadcast_to(amount, shape)
+        return action, self._round_cents(amount), reason
 
-        return action, round(amount, 2), reason
\ No newline at end of file
+    @staticmethod
+    def _round_cents(amount):
+        """与内置 round(x, 2) 逐元素一致：整体用 np.round，恰好落在 .xx5 附近的少数值改用内置 round"""
+        amount = np.asarray(amount, dtype=float)
+        # 0 维 (标量输入) 先升成 1 维，才能按掩码改写，最后再还原形状
+        flat = np.atleast_1d(amount)
+        rounded = np.round(flat, 2)
+        frac = np.abs(flat * 100.0) % 1.0
+        tie = np.abs(frac - 0.5) < 1e-6
+        if tie.any():
+            rounded[tie] = [round(float(x), 2) for x in flat[tie]]
+        return rounded.reshape(amount.shape)
@@ -0,0 +1,232 @@
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from portfolio_manager import PortfolioManager
+
+
+SIGNAL_CODES = {"BUY": 1, "SELL": -1, "NEUTRAL": 0}
+
+
+def compute_signals(df, params=None):
+    """
+    用 QuantalyticsEngine 的实盘信号逻辑 (signal_series) 逐根回放历史 K 线 -> int8 信号数组 (1 买 / -1 卖 / 0 观望)
+    信号只取决于策略参数，与资金管理参数无关，所有资金管理情景共用一份
+    """
+    from strategy_engine import QuantalyticsEngine
+
+    signals = QuantalyticsEngine(params).signal_series(df)
+    return signals.map(SIGNAL_CODES).to_numpy(dtype=np.int8)
+
+
+def trading_days_per_year(index):
+    """
+    年化用的每年交易日数 (与 backtesting 的口径一致)：
+    数据里周末占比明显 (7×24 连续交易的品种) 按 365，否则按 252
+    """
+    weekday = pd.DatetimeIndex(index).dayofweek
+    have_weekends = len(weekday) and (weekday >= 5).mean() > 2 / 7 * .6
+    return 365 if have_weekends else 252
+
+
+def align_scores(index, scores, default=0.0):
+    """
+    把 AI 分数对齐到 K 线 -> 与 index 等长的 float 数组
+    1. 时间索引的 Series (或 {时间: 分数} 字典)：每根 K 线取当时最近一次已知的分数，之前没有分数的位置填 default
+    2. 其它序列 (ndarray/list)：视为已经逐根对齐，长度必须与 index 相同
+    """
+    if scores is None or len(scores) == 0:
+        return np.full(len(index), float(default))
+    if isinstance(scores, dict): scores = pd.Series(scores)
+    if isinstance(scores, pd.Series):
+        if not isinstance(scores.index, pd.DatetimeIndex):
+            raise ValueError("AI 分数 Series 必须以 DatetimeIndex 为索引 (逐根对齐的分数请传数组)")
+        aligned = scores.sort_index().reindex(pd.DatetimeIndex(index), method='ffill')
+        return aligned.fillna(default).to_numpy(dtype=float)
+
+    scores = np.asarray(scores, dtype=float)
+    if scores.shape != (len(index),):
+        raise ValueError(f"AI 分数数组形状 {scores.shape} 与 K 线数量 {len(index)} 不一致")
+    return scores
+
+
+class PortfolioSimulator:
+    """
+    PortfolioManager 资金管理层的事件驱动模拟器
+    按界面的实盘流程回放：技术信号从观望变为 BUY/SELL (或反转) 时才计算一次建议，
+    AI 一票否决规则与邮件提醒一致 (BUY 且 AI <= -5、SELL 且 AI >= 5 时放弃)；
+    建议金额按下一根 K 线开盘价成交，持仓记为克重，现金/克重只在成交时变化，
+    权益曲线 = 现金 + 克重 × 收盘价，事件之间整段向量化填充
+    periods_per_year: 夏普比率的年化天数 (日收益按交易日计)，默认由 K 线索引推断 (见 trading_days_per_year)
+    """
+
+    def __init__(self, df, signals, ai_scores=None, cash=100000.0, grams=0.0, commission=0.0, veto=True,
+                 periods_per_year=None):
+        self.index = pd.DatetimeIndex(df.index)
+        self.open = df['Open'].to_numpy(dtype=float)
+        self.close = df['Close'].to_numpy(dtype=float)
+        self.signals = np.asarray(signals, dtype=np.int8)
+        self.ai = align_scores(self.index, ai_scores)
+        self.cash = float(cash)
+        self.grams = float(grams)
+        self.commission = float(commission)  # 按成交金额收取的比例
+        self.veto = veto
+        self.periods_per_year = periods_per_year or trading_days_per_year(self.index)
+
+        # 信号"边沿"：进入 BUY/SELL 或多空反转的位置 (同一方向持续期间只提醒一次)
+        prev = np.concatenate([[0], self.signals[:-1]])
+        edges = (self.signals != 0) & (self.signals != prev)
+        if veto:
+            vetoed = ((self.signals > 0) & (self.ai <= -5)) | ((self.signals < 0) & (self.ai >= 5))
+            edges &= ~vetoed
+        # 最后一根 K 线的信号没有下一根开盘价可成交
+        self.events = np.flatnonzero(edges[:-1])
+
+    def run(self, buy_ratio=None, sell_ratio=None, min_trade_amount=None, keep_curve=True):
+        """按一组资金管理参数回放，返回统计结果 (dict)；keep_curve 时附带权益曲线 (pd.Series)"""
+        pm = PortfolioManager()
+        if buy_ratio is not None: pm.buy_ratio = buy_ratio
+        if sell_ratio is not None: pm.sell_ratio = sell_ratio
+        if min_trade_amount is not None: pm.min_trade_amount = min_trade_amount
+
+        n = len(self.close)
+        cash, grams = self.cash, self.grams
+        fills = []  # (成交位置, 成交后现金, 成交后克重)
+        trades = buys = sells = 0
+        turnover = fees = 0.0
+
+        for i in self.events:
+            price = self.close[i]
+            signal = "BUY" if self.signals[i] > 0 else "SELL"
+            action, amount, _ = pm.decide(grams * price, cash, signal, self.ai[i], price)
+            if amount <= 0 or action == pm.HOLD: continue
+
+            fill = self.open[i + 1]
+            if action == pm.BUY:
+                amount = min(amount, cash)
+                fee = amount * self.commission
+                cash -= amount
+                grams += (amount - fee) / fill
+                buys += 1
+            else:
+                sold = min(amount / fill, grams)
+                amount = sold * fill
+                fee = amount * self.commission
+                grams -= sold
+                cash += amount - fee
+                sells += 1
+            trades += 1
+            turnover += amount
+            fees += fee
+            fills.append((i + 1, cash, grams))
+
+        # 现金/克重在两次成交之间不变：按成交位置整段展开
+        cash_at = np.full(len(fills) + 1, self.cash)
+        grams_at = np.full(len(fills) + 1, self.grams)
+        if fills:
+            at, cash_after, grams_after = map(np.asarray, zip(*fills))
+            cash_at[1:], grams_at[1:] = cash_after, grams_after
+            seg = np.searchsorted(at, np.arange(n), side='right')
+        else:
+            seg = np.zeros(n, dtype=np.int64)
+        equity = cash_at[seg] + grams_at[seg] * self.close
+
+        result = {
+            'params': {'buy_ratio': pm.buy_ratio, 'sell_ratio': pm.sell_ratio,
+                       'min_trade_amount': pm.min_trade_amount},
+            **self._stats(equity),
+            '# Trades': trades,
+            '# Buys': buys,
+            '# Sells': sells,
+            'Turnover': float(turnover),
+            'Fees': float(fees),
+            'Final Cash': float(cash),
+            'Final Grams': float(grams),
+        }
+        if keep_curve: result['equity'] = pd.Series(equity, index=self.index, name='Equity')
+        return result
+
+    def _stats(self, equity):
+        start = self.cash + self.grams * self.close[0]
+        peak = np.maximum.accumulate(equity)
+        drawdown = equity / peak - 1
+
+        # 日收益 (每个交易日最后一根 K 线的权益)
+        day = self.index.normalize()
+        day_last = np.flatnonzero(np.append(day[1:] != day[:-1], True))
+        day_equity = np.concatenate([[start], equity[day_last]])
+        daily = day_equity[1:] / day_equity[:-1] - 1
+        if len(daily) > 1 and daily.std(ddof=1) > 0:
+            sharpe = daily.mean() / daily.std(ddof=1) * np.sqrt(self.periods_per_year)
+        else:
+            sharpe = np.nan
+
+        return {
+            'Equity Final': float(equity[-1]),
+            'Return [%]': float(equity[-1] / start - 1) * 100,
+            'Buy & Hold Return [%]': float(self.close[-1] / self.close[0] - 1) * 100,
+            'Max. Drawdown [%]': float(drawdown.min()) * 100,
+            'Sharpe Ratio': float(sharpe),
+        }
+
+
+def build_scenarios(grid):
+    """展开资金管理参数网格 {'buy_ratio': [...], 'sell_ratio': [...], 'min_trade_amount': [...]}"""
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+# === 子进程全局状态 (每个进程在 initializer 里只构建一次) ===
+_worker_sim = None
+
+
+def _init_worker(df, signals, ai_scores, options):
+    global _worker_sim
+    _worker_sim = PortfolioSimulator(df, signals, ai_scores, **options)
+
+
+def _run_scenario(params, keep_curve):
+    try:
+        return _worker_sim.run(keep_curve=keep_curve, **params)
+    except Exception as e:
+        return {'params': params, 'error': str(e)}
+
+
+def run_scenarios(df, scenarios, signals=None, ai_scores=None, strategy_params=None, processes=None,
+                  keep_curve=False, on_result=None, **options):
+    """
+    多进程并行跑多组资金管理情景，按传入顺序返回结果列表
+    信号只计算一次；K 线/信号/AI 分数通过 initializer 每个进程只传一次，任务本身只传参数
+    options 透传给 PortfolioSimulator (cash / grams / commission / veto / periods_per_year)
+    """
+    if signals is None: signals = compute_signals(df, strategy_params)
+    # 在主进程里对齐/校验一次，子进程只收到逐根的数组
+    if ai_scores is not None: ai_scores = align_scores(df.index, ai_scores)
+    if isinstance(scenarios, dict): scenarios = build_scenarios(scenarios)
+    total = len(scenarios)
+    if total == 0: return []
+
+    data = df[['Open', 'Close']]
+    processes = min(processes or os.cpu_count() or 1, total)
+    if processes == 1:
+        _init_worker(data, signals, ai_scores, options)
+        results = []
+        for done, params in enumerate(scenarios, 1):
+            results.append(_run_scenario(params, keep_curve))
+            if on_result: on_result(done, total, results[-1])
+        return results
+
+    # spawn：与参数优化器一致，Qt 进程里 fork 不安全
+    ctx = multiprocessing.get_context('spawn')
+    results = [None] * total
+    with ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=_init_worker,
+                             initargs=(data, signals, ai_scores, options)) as executor:
+        futures = {executor.submit(_run_scenario, params, keep_curve): i for i, params in enumerate(scenarios)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if on_result: on_result(done, total, results[futures[future]])
+    return results
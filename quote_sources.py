@@ -0,0 +1,365 @@
+import datetime
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import requests
+
+
+class QuoteSource(ABC):
+    """
+    报价源基类：子类实现 _fetch() -> price (float) 或 None
+    quote() 负责计时、记录成功/失败，并按 min_interval 限流 (限流期间直接返回上一次的报价)；
+    同一个源的 quote() 串行执行 (请求线程与后台探测线程不会同时驱动同一个浏览器/Session)
+    """
+
+    def __init__(self, name, min_interval=0.0):
+        self.name = name
+        self.min_interval = min_interval
+        self.last_latency = None
+        self.avg_latency = None  # 成功请求耗时的滑动平均 (秒)
+        self.successes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_quote = None  # (price, dt)
+        self._last_call = 0.0
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _fetch(self):
+        """取一次最新价 -> float 或 None (抛异常同样记为失败)"""
+
+    def quote(self):
+        """返回 (price, dt) 或 None"""
+        with self._lock:
+            return self._quote()
+
+    def _quote(self):
+        now = time.monotonic()
+        if self.min_interval and now - self._last_call < self.min_interval:
+            return self.last_quote
+        self._last_call = now
+
+        start = time.perf_counter()
+        try:
+            price = self._fetch()
+        except Exception as e:
+            price = None
+            self.last_error = str(e)
+        latency = time.perf_counter() - start
+        self.last_latency = latency
+
+        if price is None or not price > 0:
+            self.failures += 1
+            return None
+
+        self.successes += 1
+        self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+        # 使用系统时间对齐 K 线
+        self.last_quote = (float(price), datetime.datetime.now().replace(microsecond=0))
+        return self.last_quote
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class HttpQuoteSource(QuoteSource):
+    """
+    普通 HTTP 报价接口 (长连接 Session，一次请求通常几十毫秒)
+    parser(text) -> price，默认取响应里的第一个数字
+    """
+
+    def __init__(self, name, url, parser=None, headers=None, timeout=2.0, min_interval=0.0):
+        super().__init__(name, min_interval)
+        self.url = url
+        self.parser = parser or parse_first_number
+        self.timeout = timeout
+        self.session = requests.Session()
+        if headers: self.session.headers.update(headers)
+
+    def _fetch(self):
+        resp = self.session.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        return self.parser(resp.text)
+
+    def close(self):
+        self.session.close()
+
+
+def parse_first_number(text):
+    match = re.search(r'[-+]?\d+(?:\.\d+)?', text.replace(',', ''))
+    return float(match.group()) if match else None
+
+
+def sina_hq_parser(field=0):
+    """新浪行情接口 var hq_str_xxx="f0,f1,...";  取第 field 个字段"""
+    def parse(text):
+        match = re.search(r'"([^"]*)"', text)
+        if not match or not match.group(1): return None
+        return float(match.group(1).split(',')[field])
+    return parse
+
+
+class SinaQuoteSource(HttpQuoteSource):
+    """新浪行情接口 (与原爬虫页面同一数据源，但不需要浏览器)；gds_AUTD = 上金所 Au(T+D)，首字段为最新价"""
+
+    def __init__(self, symbol="gds_AUTD", field=0, timeout=2.0):
+        super().__init__(
+            f"Sina:{symbol}", f"https://hq.sinajs.cn/list={symbol}",
+            parser=sina_hq_parser(field),
+            # 新浪行情接口要求带 Referer
+            headers={'Referer': 'https://finance.sina.com.cn/', 'User-Agent': 'Mozilla/5.0'},
+            timeout=timeout,
+        )
+
+
+class StreamQuoteSource(QuoteSource):
+    """
+    推送/流式报价：后台线程持续读取一个按行推送的 HTTP 流 (SSE / chunked)，只保留最新价
+    quote() 直接返回内存里的最新价，超过 max_age 秒没有新推送视为失效
+    """
+
+    def __init__(self, name, url, parser=None, headers=None, max_age=5.0, reconnect_delay=2.0):
+        super().__init__(name)
+        self.url = url
+        self.parser = parser or parse_first_number
+        self.headers = headers or {}
+        self.max_age = max_age
+        self.reconnect_delay = reconnect_delay
+        self._latest = None  # (price, monotonic 时间, 到达耗时)
+        self._stop = threading.Event()
+        self._thread = None
+        self._resp = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._reader, name=f"quote-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _reader(self):
+        while not self._stop.is_set():
+            try:
+                with requests.get(self.url, headers=self.headers, stream=True, timeout=(3, self.max_age * 2)) as resp:
+                    self._resp = resp
+                    last = time.perf_counter()
+                    for line in resp.iter_lines(decode_unicode=True):
+                        if self._stop.is_set(): break
+                        if not line: continue
+                        if line.startswith('data:'): line = line[5:]
+                        price = self.parser(line)
+                        now = time.perf_counter()
+                        if price: self._latest = (price, time.monotonic(), now - last)
+                        last = now
+            except Exception as e:
+                self.last_error = str(e)
+            self._resp = None
+            self._stop.wait(self.reconnect_delay)
+
+    def _fetch(self):
+        self.start()
+        latest = self._latest
+        if latest is None or time.monotonic() - latest[1] > self.max_age: return None
+        return latest[0]
+
+    def quote(self):
+        result = super().quote()
+        # 推送源的"延迟"记为相邻两次推送的间隔，而不是读内存的耗时
+        if result is not None and self._latest is not None:
+            self.last_latency = self._latest[2]
+        return result
+
+    def close(self):
+        self._stop.set()
+        resp = self._resp
+        if resp is not None:
+            try:
+                resp.close()
+            except:
+                pass
+
+
+class CallableQuoteSource(QuoteSource):
+    """把已有的取价函数包装成报价源 (如 SGE 官方接口、Selenium 爬虫)；func() -> price 或 (price, dt)"""
+
+    def __init__(self, name, func, min_interval=0.0, on_close=None):
+        super().__init__(name, min_interval)
+        self.func = func
+        self.on_close = on_close
+
+    def _fetch(self):
+        result = self.func()
+        return result[0] if isinstance(result, tuple) else result
+
+    def close(self):
+        if self.on_close: self.on_close()
+
+
+class FakeQuoteSource(QuoteSource):
+    """本地模拟报价 (随机游走)，用于测试/离线演示；可设置固定延迟和失败率"""
+
+    def __init__(self, name="Fake", start_price=600.0, step=0.05, latency=0.0, fail_rate=0.0, seed=None):
+        super().__init__(name)
+        self.price = start_price
+        self.step = step
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+
+    def _fetch(self):
+        if self.latency: time.sleep(self.latency)
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            raise ConnectionError("simulated failure")
+        self.price = round(self.price + self.rng.gauss(0, self.step), 2)
+        return self.price
+
+
+class SourceHealth:
+    """单个报价源的健康状态：滚动窗口内的延迟/错误率 + 熔断器 (closed -> open -> half-open)"""
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, window=20):
+        self.samples = deque(maxlen=window)  # (成功?, 耗时)
+        self.consecutive_failures = 0
+        self.last_success = None  # 最近一次拿到新鲜报价的时间 (monotonic)
+        self.state = self.CLOSED
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.trips = 0  # 熔断次数
+
+    @property
+    def error_rate(self):
+        if not self.samples: return 0.0
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)
+
+    @property
+    def latency(self):
+        lat = [t for ok, t in self.samples if ok]
+        return sum(lat) / len(lat) if lat else None
+
+
+class QuoteSourceManager:
+    """
+    报价源调度：按滚动延迟、错误率和报价陈旧度给每个源打分，每次请求优先走当前最健康的源
+    连续失败的源触发熔断，熔断期间不再占用请求路径；后台线程在冷却结束后探测，恢复了再放回
+    """
+
+    def __init__(self, sources, failure_threshold=3, base_cooldown=15.0, max_cooldown=300.0,
+                 max_staleness=10.0, probe_interval=2.0, priority_weight=0.5):
+        self.sources = list(sources)
+        # 健康状态按源名记录，重名的源会共用一个熔断器
+        names = [source.name for source in self.sources]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"报价源名称重复: {', '.join(duplicates)}")
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.max_staleness = max_staleness  # 报价时间早于该秒数视为陈旧 (如限流期间返回的旧价)
+        self.probe_interval = probe_interval
+        self.priority_weight = priority_weight  # 列表中每靠后一位加的分 (秒)，让慢而重的兜底源只在前面的明显变差时才上
+        self.health = {source.name: SourceHealth() for source in self.sources}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._probe_thread = None
+
+    # --- 打分与路由 ---
+    def _score(self, index, source):
+        """越小越好：平均延迟 × (1 + 4 × 错误率) + 陈旧惩罚 + 列表顺序带来的优先级加分"""
+        h = self.health[source.name]
+        latency = h.latency if h.latency is not None else 0.5  # 未知源给一个中等的先验
+        score = latency * (1 + 4 * h.error_rate)
+        if h.last_success is not None and time.monotonic() - h.last_success > self.max_staleness:
+            score += 1.0
+        return score + self.priority_weight * index
+
+    def ranked(self):
+        """当前可用 (未熔断) 的源，按健康度排序"""
+        with self._lock:
+            candidates = [(self._score(i, s), i, s) for i, s in enumerate(self.sources)
+                          if self.health[s.name].state == SourceHealth.CLOSED]
+        return [s for _, _, s in sorted(candidates)]
+
+    def quote(self):
+        """返回 (price, dt, 来源名)；全部失败返回 (None, None, "None")"""
+        self._start_probes()
+        order = self.ranked()
+        if not order:
+            # 全部熔断：按原优先级兜底尝试一次，避免彻底断流；
+            # 半开的源正由探测线程试探，交给它处理，不在请求路径上重复调用
+            with self._lock:
+                order = [s for s in self.sources if self.health[s.name].state != SourceHealth.HALF_OPEN]
+        for source in order:
+            result = self._attempt(source)
+            if result is not None:
+                return result[0], result[1], source.name
+        return None, None, "None"
+
+    def _attempt(self, source):
+        result = source.quote()
+        fresh = result is not None and \
+            (datetime.datetime.now() - result[1]).total_seconds() <= self.max_staleness
+        self._record(source, fresh, source.last_latency)
+        return result if fresh else None
+
+    def _record(self, source, ok, latency):
+        with self._lock:
+            h = self.health[source.name]
+            h.samples.append((ok, latency or 0.0))
+            if ok:
+                h.consecutive_failures = 0
+                h.last_success = time.monotonic()
+                if h.state != SourceHealth.CLOSED:
+                    print(f"[QuoteSource] ✅ {source.name} 已恢复")
+                h.state = SourceHealth.CLOSED
+                h.cooldown = 0.0
+                return
+
+            h.consecutive_failures += 1
+            tripped = h.state == SourceHealth.HALF_OPEN or h.consecutive_failures >= self.failure_threshold
+            if tripped:
+                # 冷却时间逐次翻倍，直到上限
+                h.cooldown = min(self.max_cooldown, h.cooldown * 2 if h.cooldown else self.base_cooldown)
+                h.open_until = time.monotonic() + h.cooldown
+                if h.state != SourceHealth.OPEN:
+                    h.trips += 1
+                    print(f"[QuoteSource] ⚠️ {source.name} 熔断 {h.cooldown:.0f}s ({source.last_error or '无数据'})")
+                h.state = SourceHealth.OPEN
+
+    # --- 后台探测 ---
+    def _start_probes(self):
+        if self._probe_thread is None and len(self.sources) > 1:
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="quote-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            now = time.monotonic()
+            with self._lock:
+                due = [s for s in self.sources
+                       if self.health[s.name].state == SourceHealth.OPEN and now >= self.health[s.name].open_until]
+                for s in due: self.health[s.name].state = SourceHealth.HALF_OPEN
+            for source in due:
+                if self._stop.is_set(): break
+                self._attempt(source)
+
+    def snapshot(self):
+        """各源的健康概况 (供界面/日志展示)"""
+        with self._lock:
+            return {s.name: {'state': self.health[s.name].state,
+                             'latency': self.health[s.name].latency,
+                             'error_rate': self.health[s.name].error_rate,
+                             'trips': self.health[s.name].trips} for s in self.sources}
+
+    def close(self):
+        self._stop.set()
+        for source in self.sources:
+            try:
+                source.close()
+            except:
+                pass
@@ -9,6 +9,54 @@ import talib as ta
 import talib.stream
 import sys
 import os
+import glob
+import time
+import functools
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from mt_loader import load_bars
+
+
+# === 指标缓存 (同一进程内所有优化候选共享) ===
+# key = (指标名, 参数, 数据指纹)；同一数据集上每组指标参数只计算一次
+_INDICATOR_CACHE = OrderedDict()
+_INDICATOR_CACHE_SIZE = 256
+
+
+def _cache_key_part(arg):
+    """数组按内容做指纹，其它参数原样参与 key"""
+    if isinstance(arg, np.ndarray):
+        data = np.ascontiguousarray(arg)
+        digest = hashlib.blake2b(data.view(np.uint8), digest_size=16).hexdigest()
+        return ('array', data.dtype.str, data.shape, digest)
+    return arg
+
+
+def cached_indicator(func):
+    """
+    包装指标函数，结果按 (指标, 参数, 数据指纹) 缓存 (LRU)
+    用法: self.I(cached_indicator(self._rsi), p, self.rsi_period)
+    """
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = (func.__qualname__,) + tuple(_cache_key_part(a) for a in args)
+        if key in _INDICATOR_CACHE:
+            _INDICATOR_CACHE.move_to_end(key)
+            return _INDICATOR_CACHE[key]
+
+        value = func(*args)
+        # 缓存结果在多个候选之间共享，设为只读防止被意外修改
+        for arr in (value if isinstance(value, tuple) else (value,)):
+            if isinstance(arr, np.ndarray): arr.flags.writeable = False
+
+        _INDICATOR_CACHE[key] = value
+        if len(_INDICATOR_CACHE) > _INDICATOR_CACHE_SIZE:
+            _INDICATOR_CACHE.popitem(last=False)
+        return value
+
+    return wrapper
 
 
 class AdaptiveMomentumReversion(Strategy):
@@ -45,27 +93,27 @@ class AdaptiveMomentumReversion(Strategy):
         c = self.data.Close
         o = self.data.Open
         
-        # Technical indicators
-        self.rsi = self.I(self._rsi, p, self.rsi_period)
+        # Technical indicators (经 cached_indicator 缓存，优化时各候选共享未变化的指标)
+        self.rsi = self.I(cached_indicator(self._rsi), p, self.rsi_period)
         self.bb_upper, self.bb_mid, self.bb_lower = self.I(
-            self._bollinger_bands, p, self.bb_period, self.bb_std
+            cached_indicator(self._bollinger_bands), p, self.bb_period, self.bb_std
         )
-        self.atr = self.I(self._atr, h, l, c, self.atr_period)
-        self.sma_f = self.I(SMA, p, self.sma_fast)
-        self.sma_s = self.I(SMA, p, self.sma_slow)
-        self.vol = self.I(self._volatility, p, self.vol_period)
+        self.atr = self.I(cached_indicator(self._atr), h, l, c, self.atr_period)
+        self.sma_f = self.I(cached_indicator(SMA), p, self.sma_fast)
+        self.sma_s = self.I(cached_indicator(SMA), p, self.sma_slow)
+        self.vol = self.I(cached_indicator(self._volatility), p, self.vol_period)
         self.macd_line, self.macd_signal, self.macd_hist = self.I(
-            self._macd, p, self.macd_fast, self.macd_slow, self.macd_signal
+            cached_indicator(self._macd), p, self.macd_fast, self.macd_slow, self.macd_signal
         )
         
         # ADX for trend strength
-        self.adx = self.I(self._adx, h, l, c, 14)
+        self.adx = self.I(cached_indicator(self._adx), h, l, c, 14)
         
         # Volume MA for confirmation
-        self.vol_ma = self.I(self._volume_ma, self.data.Volume, 20)
+        self.vol_ma = self.I(cached_indicator(self._volume_ma), self.data.Volume, 20)
         
         # Longer term trend (50-period SMA)
-        self.sma_trend = self.I(SMA, p, 50)
+        self.sma_trend = self.I(cached_indicator(SMA), p, 50)
         
         # Trade tracking
         self.daily_trades = 0
@@ -283,32 +331,18 @@ class AdaptiveMomentumReversion(Strategy):
                 self.daily_trades += 1
 
 
-def load_data(csv_path, resample='15min'):
-    """Load and prepare OHLC data from CSV, with optional resampling"""
-    df = pd.read_csv(
-        csv_path,
-        names=['Date', 'Time', 'Open', 'High', 'Low', 'Close', 'Volume'],
-    )
-    # Combine Date and Time columns
-    df['Datetime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], format='%Y.%m.%d %H:%M')
-    df = df.set_index('Datetime')
-    df = df.drop(['Date', 'Time'], axis=1)
-    df = df.sort_index()
-    
-    # Resample to reduce noise (M1 -> 15min by default)
-    if resample:
-        df = df.resample(resample).agg({
-            'Open': 'first',
-            'High': 'max',
-            'Low': 'min',
-            'Close': 'last',
-            'Volume': 'sum'
-        }).dropna()
-    
-    return df
+def load_data(csv_path, resample='15min', use_cache=True, chunksize=None):
+    """
+    Load and prepare OHLC data from CSV, with optional resampling
+    Parsed columns and resampled frames are cached next to the CSV (<file>.npcache/)
+    and reused until the CSV changes; pass use_cache=False to always re-parse.
+    With chunksize set, the CSV is read and resampled in chunks so peak memory
+    is bounded by the resampled output instead of the raw M1 data
+    """
+    return load_bars(csv_path, resample=resample, use_cache=use_cache, chunksize=chunksize)
 
 
-def calculate_metrics(stats):
+def calculate_metrics(stats, verbose=True):
     """Extract and display key performance metrics"""
     metrics = {
         'Sharpe Ratio': stats['Sharpe Ratio'],
@@ -323,6 +357,8 @@ def calculate_metrics(stats):
         'Profit Factor': stats.get('Profit Factor', 'N/A'),
         'Exposure Time': stats['Exposure Time [%]'],
     }
+    if not verbose:
+        return metrics
     
     print("\n" + "="*60)
     print("PERFORMANCE METRICS")
@@ -334,17 +370,28 @@ def calculate_metrics(stats):
     return metrics
 
 
-def run_backtest(csv_path, cash=100000, commission_pct=0.00002):
+def _plot_filename(label):
+    """HTML report name for a CSV label (batch labels keep their sub-directories so the names stay unique)"""
+    name = label.replace('\\', '/').replace('.csv', '').replace('/', '__')
+    return f"backtest_results_{name}.html"
+
+
+def run_backtest(csv_path, cash=100000, commission_pct=0.00002, chunksize=None, plot=True, verbose=True,
+                 label=None):
     """
     Main backtest execution
     Commission: $2 or 0.002% (whichever is lower)
     For typical trade sizes, 0.002% = 0.00002 in decimal
+    chunksize: stream the CSV in chunks of this many M1 rows (multi-year datasets)
+    label: name for the plot file (run_batch passes the unique batch label; default: the CSV basename)
     """
-    print(f"\nLoading data from: {csv_path}")
-    df = load_data(csv_path)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log(f"\nLoading data from: {csv_path}")
+    if chunksize: log(f"Streaming mode: {chunksize} rows per chunk")
+    df = load_data(csv_path, chunksize=chunksize)
     
-    print(f"Data loaded: {len(df)} bars")
-    print(f"Period: {df.index[0]} to {df.index[-1]}")
+    log(f"Data loaded: {len(df)} bars")
+    log(f"Period: {df.index[0]} to {df.index[-1]}")
     
     # Initialize backtest
     bt = Backtest(
@@ -357,40 +404,151 @@ def run_backtest(csv_path, cash=100000, commission_pct=0.00002):
         finalize_trades=True  # Close open trades at end
     )
     
-    print("\nRunning backtest...")
+    log("\nRunning backtest...")
     stats = bt.run()
     
     # Calculate and display metrics
-    metrics = calculate_metrics(stats)
+    metrics = calculate_metrics(stats, verbose=verbose)
     
     # Generate plot
-    print("\nGenerating performance plot...")
-    bt.plot()
+    if plot:
+        log("\nGenerating performance plot...")
+        bt.plot(filename=_plot_filename(label or os.path.basename(csv_path)), open_browser=verbose)
     
     return stats, bt
 
 
+def _batch_labels(csv_paths):
+    """Row labels for run_batch: each path relative to the files' common root (unique, unlike basenames)"""
+    paths = [os.path.abspath(p) for p in csv_paths]
+    root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    return [os.path.relpath(p, root).replace(os.sep, '/') for p in paths]
+
+
+def _batch_job(csv_path, label, cash, commission_pct, chunksize, plot):
+    """Worker-process entry for run_batch: one CSV -> one row of the comparison table"""
+    row = {'File': label}
+    start = time.perf_counter()
+    try:
+        stats, bt = run_backtest(csv_path, cash=cash, commission_pct=commission_pct,
+                                 chunksize=chunksize, plot=plot, verbose=False, label=label)
+        row['Bars'] = len(stats['_equity_curve'])
+        row['Start'] = str(stats['Start'])
+        row['End'] = str(stats['End'])
+        for k, v in calculate_metrics(stats, verbose=False).items():
+            # Timedelta / NaN must survive CSV and JSON output
+            row[k] = str(v) if isinstance(v, pd.Timedelta) else v
+        row['Error'] = ''
+    except Exception as e:
+        row['Error'] = f"{type(e).__name__}: {e}"
+    row['Seconds'] = round(time.perf_counter() - start, 2)
+    return row
+
+
+def run_batch(csv_paths, cash=100000, commission_pct=0.00002, chunksize=None, plot=False,
+              processes=None, output='backtest_summary'):
+    """
+    Backtest many CSVs in parallel (one process per file) and write a comparison table
+    to <output>.csv and <output>.json. Plots are skipped unless plot=True
+    """
+    # the same file given twice (e.g. relative and absolute) is only run once
+    csv_paths = list({os.path.normcase(os.path.abspath(p)): p for p in csv_paths}.values())
+    processes = min(processes or os.cpu_count() or 1, len(csv_paths)) or 1
+    print(f"\nBatch backtest: {len(csv_paths)} files on {processes} processes")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(_batch_job, path, label, cash, commission_pct, chunksize, plot): path
+                   for path, label in zip(csv_paths, _batch_labels(csv_paths))}
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            status = f"FAILED ({row['Error']})" if row['Error'] else f"Sharpe {row['Sharpe Ratio']:.2f}"
+            print(f"[{len(rows)}/{len(csv_paths)}] {row['File']}: {status} in {row['Seconds']}s")
+
+    table = pd.DataFrame(rows).set_index('File').sort_index()
+    table = table[[c for c in table.columns if c not in ('Seconds', 'Error')] + ['Seconds', 'Error']]
+    table.to_csv(f"{output}.csv")
+    table.to_json(f"{output}.json", orient='index', indent=2)
+
+    print("\n" + "="*60)
+    print("BATCH COMPARISON")
+    print("="*60)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.drop(columns=['Error']))
+    print(f"\nSaved comparison table to: {output}.csv / {output}.json")
+    return table
+
+
+def _has_magic(pattern):
+    """True if the argument is a glob pattern (glob.has_magic is not public API)"""
+    return any(c in pattern for c in '*?[')
+
+
+def _expand_paths(patterns):
+    """Expand glob patterns (quoted on the shell) into a sorted list of CSV files"""
+    paths = []
+    for pattern in patterns:
+        if _has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+    return paths
+
+
 def main():
     """Main execution function"""
+    args = sys.argv[1:]
     # Check command line arguments
-    if len(sys.argv) < 2:
-        print("Usage: python strategy.py <path_to_csv>")
+    if not args:
+        print("Usage: python strategy.py <csv_or_glob> [more csv ...] [--stream [ROWS]] [--jobs N] [--plot] [--out NAME]")
         print("\nExample:")
         print("  python strategy.py data/XAUUSD_M1/DAT_MT_XAUUSD_M1_2024.csv")
         print("  python strategy.py data/XAGUSD_M1/DAT_MT_XAGUSD_M1_2024.csv")
+        print("  python strategy.py data/XAUUSD_M1/DAT_MT_XAUUSD_M1_ALL.csv --stream")
+        print('  python strategy.py "data/*_M1/*.csv" --jobs 4 --out nightly')
         sys.exit(1)
     
-    csv_path = sys.argv[1]
+    def option(name, default=None, kind=str):
+        """--name [VALUE] -> VALUE / True if given without a value (removed from args)"""
+        if name not in args: return default
+        pos = args.index(name)
+        has_next = pos + 1 < len(args)
+        value = args[pos + 1] if has_next else ''
+        takes_value = has_next and (kind is str and not value.startswith('--') or kind is int and value.isdigit())
+        del args[pos:pos + (2 if takes_value else 1)]
+        # an empty value ("--out ''") counts as "given without a value"
+        return kind(value) if takes_value and value else True
+    
+    # --stream [ROWS]: read large CSVs in chunks (default 500000 M1 rows per chunk)
+    stream = option('--stream', kind=int)
+    chunksize = (500_000 if stream is True else stream) or None
+    jobs = option('--jobs', kind=int)
+    plot = option('--plot', False, kind=bool)
+    output = option('--out', 'backtest_summary')
+    if output is True:
+        print("Warning: --out needs a name, using 'backtest_summary'")
+        output = 'backtest_summary'
     
-    if not os.path.exists(csv_path):
-        print(f"Error: File not found: {csv_path}")
+    csv_paths = _expand_paths(args)
+    missing = [p for p in csv_paths if not os.path.exists(p)]
+    if missing or not csv_paths:
+        print(f"Error: File not found: {', '.join(missing) or ' '.join(args)}")
         sys.exit(1)
     
+    # Several files (or a glob): run them in parallel and compare
+    if len(csv_paths) > 1 or any(_has_magic(a) for a in args):
+        return run_batch(csv_paths, cash=100000, commission_pct=0.00002, chunksize=chunksize,
+                         plot=plot, processes=jobs if jobs is not True else None,
+                         output=output)
+    
+    csv_path = csv_paths[0]
+    
     # Run backtest
-    stats, bt = run_backtest(csv_path, cash=100000, commission_pct=0.00002)
+    stats, bt = run_backtest(csv_path, cash=100000, commission_pct=0.00002, chunksize=chunksize)
     
     # Save results
-    output_file = f"backtest_results_{os.path.basename(csv_path).replace('.csv', '.html')}"
+    output_file = _plot_filename(os.path.basename(csv_path))
     print(f"\nSaving results to: {output_file}")
     
     return stats
@@ -1,6 +1,8 @@
 import pandas as pd
 import pandas_ta as ta
 
+from incremental_indicators import IncrementalIndicators
+
 
 class QuantalyticsEngine:
     """
@@ -8,7 +10,7 @@ class QuantalyticsEngine:
     从 backtesting 框架剥离，专用于实盘信号计算
     """
 
-    def __init__(self, params=None):
+    def __init__(self, params=None, incremental=True):
         # 默认参数 (与 strategy.py 完全对齐)
         self.params = {
             # --- 核心指标参数 ---
@@ -39,6 +41,11 @@ class QuantalyticsEngine:
         if params:
             self.params.update(params)
 
+        # 增量模式：指标保存递推状态，每个 tick 只更新最后一根 K 线
+        # 关闭后回退到 calculate_indicators 全量重算
+        self.incremental = incremental
+        self._stream = None
+
     def update_params(self, new_params):
         """用于动态适应机制：接收新参数"""
         print(f"[Engine] 更新策略参数: {new_params}")
@@ -77,8 +84,7 @@ class QuantalyticsEngine:
         data['SMA_S'] = ta.sma(data['Close'], length=self.params['sma_slow'])
 
         # 5. Volatility (波动率)
-        data['pct_change'] = data['Close'].pct_change()
-        data['vol'] = data['pct_change'].rolling(window=self.params['vol_period']).std()
+        data['vol'] = data['Close'].pct_change().rolling(window=self.params['vol_period']).std()
         data['vol_ma'] = data['vol'].rolling(window=self.params['vol_ma_period']).mean()
 
         # 6. [新增] ATR 计算
@@ -87,23 +93,81 @@ class QuantalyticsEngine:
 
         return data
 
-    def check_signal(self, df_raw):
-        # 1. 确保数据量足够
+    def _min_len(self):
         max_period = max(
             self.params['sma_slow'],
             self.params['vol_ma_period'],
             self.params['atr_period']
         )
-        min_len = max_period + 2
+        return max_period + 2
 
-        if len(df_raw) < min_len:
+    def _indicator_stream(self):
+        # 参数变化 (优化器/手动调整) 后重建指标状态
+        if self._stream is None or self._stream.params != self.params:
+            self._stream = IncrementalIndicators(self.params)
+        return self._stream
+
+    def check_signal(self, df_raw):
+        # 1. 确保数据量足够
+        if len(df_raw) < self._min_len():
             return "NEUTRAL", "数据预热中...", df_raw
 
         # 2. 计算指标
-        df = self.calculate_indicators(df_raw)
-        curr = df.iloc[-1]
-        prev = df.iloc[-2]  # 以此判断交叉
-
+        if self.incremental:
+            stream = self._indicator_stream()
+            curr = stream.sync(df_raw)
+            curr['Close'] = df_raw['Close'].iat[-1]
+            df = stream.frame(df_raw)
+        else:
+            df = self.calculate_indicators(df_raw)
+            curr = df.iloc[-1]
+
+        signal, reason_str = self._evaluate(curr)
+        return signal, reason_str, df
+
+    def check_signal_bars(self, bars):
+        """
+        列式版本：直接读 BarRingBuffer 的零拷贝视图，不构建 DataFrame
+        返回 (信号, 理由, 列字典)；列字典 = K 线各列视图 + 指标块各列视图，
+        都是只读视图，下一次写入缓冲区前要用完 (如交给 ChartPayloadBuilder 拷贝)
+        """
+        columns = bars.columns()
+        if len(bars) < self._min_len() or not self.incremental:
+            if len(bars) >= self._min_len():
+                # 非增量模式回退到 DataFrame 全量计算
+                signal, reason, df = self.check_signal(bars.to_frame())
+                return signal, reason, {col: df[col].to_numpy() for col in df.columns}
+            return "NEUTRAL", "数据预热中...", columns
+
+        stream = self._indicator_stream()
+        curr = stream.sync_arrays(bars.timestamps(), columns['High'], columns['Low'], columns['Close'],
+                                  generation=bars.generation)
+        curr['Close'] = float(columns['Close'][-1])
+        signal, reason_str = self._evaluate(curr)
+        return signal, reason_str, {**columns, **stream.columns()}
+
+    def signal_series(self, df):
+        """
+        逐根回放历史 K 线 -> 每根 K 线收盘时的信号 (与 df.index 对齐的 "BUY"/"SELL"/"NEUTRAL" Series)
+        指标用一份独立的增量状态按已收盘 K 线推进 (每根 O(1))，不影响 check_signal 的实时状态；
+        数据量不足 min_len 的部分与实盘一样为观望
+        """
+        stream = IncrementalIndicators(self.params)
+        min_len = self._min_len()
+        high = df['High'].to_numpy(dtype=float)
+        low = df['Low'].to_numpy(dtype=float)
+        close = df['Close'].to_numpy(dtype=float)
+
+        signals = ["NEUTRAL"] * len(df)
+        for i in range(len(df)):
+            curr = stream.update(high[i], low[i], close[i])
+            if i + 1 < min_len: continue
+            curr['Close'] = close[i]
+            signals[i] = self._evaluate(curr)[0]
+        return pd.Series(signals, index=df.index, name='Signal')
+
+    def _evaluate(self, curr):
+        """根据最新一根 K 线的指标值生成信号 (curr 可以是 Series 或 dict)"""
         # --- 信号逻辑优化 (放宽版) ---
 
         # A. 趋势判断 (维持原样)
@@ -153,4 +217,4 @@ class QuantalyticsEngine:
             if bb_upper_touch: reasons.append("触布林上轨")
 
         reason_str = " + ".join(reasons) if reasons else "等待机会"
-        return signal, reason_str, df
\ No newline at end of file
+        return signal, reason_str
\ No newline at end of file
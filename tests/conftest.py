@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 模块都在仓库根目录 (平铺结构)，测试直接按模块名导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 各测试共用的数据构造工具 (测试文件里 `from conftest import ...`)
+
+# 与 QuantalyticsEngine 默认值一致的指标参数
+INDICATOR_PARAMS = {"rsi_period": 14, "bb_period": 20, "bb_std": 2.0, "sma_fast": 10, "sma_slow": 30,
+                    "macd_fast": 12, "macd_slow": 26, "macd_signal": 9, "vol_period": 20, "vol_ma_period": 50,
+                    "atr_period": 14}
+
+
+def make_bars(close, start="2026-01-05 09:00", freq="min", opens=None, spread=0.1):
+    """收盘价序列 -> OHLCV K 线 (High/Low = Close ± spread，Open 默认等于 Close)"""
+    close = np.asarray(close, dtype=float)
+    opens = close if opens is None else np.asarray(opens, dtype=float)
+    index = pd.date_range(start, periods=len(close), freq=freq)
+    return pd.DataFrame({"Open": opens, "High": np.maximum(opens, close) + spread,
+                         "Low": np.minimum(opens, close) - spread, "Close": close, "Volume": 0.0}, index=index)
+
+
+def random_walk(rows, seed=0, base=600.0, step=0.3, start="2026-01-05 09:00", freq="min", spread=0.1):
+    """随机游走 K 线：开盘价 = 上一根收盘价"""
+    close = base + np.random.default_rng(seed).normal(0, step, rows).cumsum()
+    opens = np.concatenate([[base], close[:-1]])
+    return make_bars(close, start=start, freq=freq, opens=opens, spread=spread)
+
+
+def sync_stream(stream, bars):
+    """用 BarRingBuffer 的列视图推进 IncrementalIndicators，返回最新一根的指标"""
+    cols = bars.columns()
+    return stream.sync_arrays(bars.timestamps(), cols["High"], cols["Low"], cols["Close"],
+                              generation=bars.generation)
+
+
+def write_mt_csv(path, df):
+    """K 线写成 MetaTrader M1 CSV (无表头: Date, Time, Open, High, Low, Close, Volume)"""
+    frame = pd.DataFrame({"Date": df.index.strftime("%Y.%m.%d"), "Time": df.index.strftime("%H:%M"),
+                          **{col: df[col].to_numpy() for col in ("Open", "High", "Low", "Close", "Volume")}})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame.to_csv(path, header=False, index=False)
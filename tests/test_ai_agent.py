@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+for module in ("ollama", "google.genai", "openai", "PyQt6.QtCore", "akshare"):
+    pytest.importorskip(module)
+
+from ai_agent import AIAgent
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = AIAgent({}, news_sources=[])
+    yield agent
+    agent.stop()
+
+
+def test_stop_during_a_round_does_not_submit_or_report_errors(agent):
+    news = [{'title': '[T] Gold rallies', 'link': '#', 'lang': 'en'}]
+    emitted = []
+    agent.ai_advice_signal.connect(lambda *args: emitted.append(args))
+
+    def fetch():
+        agent.stop()  # 这一轮进行中收到停止请求
+        return news
+
+    agent._fetch_financial_news = fetch
+    agent._filter_by_local_llm = lambda items: [dict(n, local_score=10) for n in items]
+    agent._consult_committee = lambda prompt: pytest.fail("stop() 之后不应再调用云端")
+    agent.run()
+    assert emitted == []
+
+
+@pytest.fixture
+def committee(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = AIAgent({'gemini': 'test-key', 'committee_deadline': 0.3}, news_sources=[])
+    agent.ds_client = object()  # 只需要为真，实际调用由下面的替身完成
+    yield agent
+    agent.stop()
+
+
+@pytest.mark.parametrize("config, expected", [
+    ({'committee_deadline': 0.3}, {'timeout': 300}),
+    ({'gemini_base_url': 'http://127.0.0.1:9/'}, {'timeout': 20000, 'base_url': 'http://127.0.0.1:9/'}),
+])
+def test_gemini_client_gets_the_committee_deadline_as_http_timeout(tmp_path, monkeypatch, config, expected):
+    import ai_agent
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ai_agent, "COMMITTEE_DEADLINE", 20)
+    created = []
+
+    def fake_client(**kwargs):
+        created.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(ai_agent.genai, "Client", fake_client)
+    agent = AIAgent({'gemini': 'test-key', **config}, news_sources=[])
+    agent.stop()
+
+    # genai 的 timeout 单位是毫秒
+    assert created == [{'api_key': 'test-key', 'http_options': expected}]
+
+
+def test_slow_expert_abstains_after_deadline(committee):
+    release = threading.Event()
+    committee._call_deepseek = lambda prompt: "情绪：偏多\n打分：6"
+    committee._call_gemini = lambda prompt: release.wait(5) and None
+
+    start = time.perf_counter()
+    answers = committee._consult_committee("prompt")
+    elapsed = time.perf_counter() - start
+    release.set()
+
+    assert answers == {'deepseek': "情绪：偏多\n打分：6", 'gemini': None}
+    assert elapsed < 2
+    ds, gm = committee.provider_stats['deepseek'], committee.provider_stats['gemini']
+    assert (ds['calls'], ds['ok'], ds['errors'], ds['timeouts']) == (1, 1, 0, 0)
+    assert ds['last_latency'] is not None and ds['avg_latency'] == ds['last_latency']
+    assert (gm['calls'], gm['ok'], gm['errors'], gm['timeouts']) == (1, 0, 0, 1)
+    assert gm['last_latency'] is None
+
+
+def test_failed_expert_counts_as_error_and_round_uses_the_other(committee):
+    committee._call_deepseek = lambda prompt: None
+    committee._call_gemini = lambda prompt: "情绪：偏空\n打分：-4"
+    emitted = []
+
+    def on_advice(text, score, news):
+        emitted.append((text, score))
+        committee.stop()
+
+    committee.ai_advice_signal.connect(on_advice)
+    committee._get_sentry_mode_config = lambda: (0, 0)
+    committee._fetch_financial_news = lambda: [{'title': '[T] Fed holds rates', 'link': '#', 'lang': 'en'}]
+    committee._filter_by_local_llm = lambda items: [dict(n, local_score=8) for n in items]
+    committee.run()
+
+    assert len(emitted) == 1
+    text, score = emitted[0]
+    assert score == -4 and text.startswith("【Gemini 独家】")
+    assert committee.provider_stats['deepseek']['errors'] == 1
+    assert committee.provider_stats['gemini']['ok'] == 1
+
+
+def test_headlines_are_deduplicated_on_the_cache_key(agent):
+    sent = []
+
+    def score_batch(titles):
+        sent.extend(titles)
+        return [7] * len(titles)
+
+    agent._score_batch = score_batch
+    titles = ["[CNBC] Gold rallies", "[FXStreet] gold rallies!", "[Inv-US] Fed holds rates"]
+    assert agent._score_titles(titles) == [7, 7, 7]
+    assert sent == ["[CNBC] Gold rallies", "[Inv-US] Fed holds rates"]
+
+    sent.clear()
+    assert agent._score_titles(["[Inv-CN] GOLD RALLIES"]) == [7]
+    assert sent == []
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"scores": [7, 3, 10]}', [7, 3, 10]),
+    ('[7, 3, 10]', [7, 3, 10]),
+    ('{"result": [7.4, "3", 9.6]}', [7, 3, 10]),  # 键名不对时取第一个值；数字字符串 / 小数四舍五入
+    ('1: 7\n2. 3\n3、10', [7, 3, 10]),
+    ('打分如下：\n  3) 10\n1] 7\n2：3\n', [7, 3, 10]),  # 逐行格式顺序打乱也按编号对应
+])
+def test_parse_batch_scores_accepts_supported_formats(content, expected):
+    assert AIAgent._parse_batch_scores(content, 3) == expected
+
+
+@pytest.mark.parametrize("content", [
+    '1: 7\n3: 10',  # 缺编号
+    '1: 7\n2: 3\n4: 10',  # 编号越界
+    '0: 7\n1: 3\n2: 10',  # 从 0 开始编号
+    'a: 7\nb: 3\nc: 10',  # 编号不是数字
+    '1: 七\n2: 3\n3: 10',  # 分数不是数字
+    '{"scores": [7, "高", 10]}',
+    '{"scores": [7, NaN, 10]}',
+    '{"scores": [7, Infinity, 10]}',
+    '{"scores": [7, [3], 10]}',
+    '{"scores": [7, 3, 10',  # 截断的 JSON
+    '',
+])
+def test_parse_batch_scores_rejects_malformed_output(content):
+    assert AIAgent._parse_batch_scores(content, 3) is None
+
+
+@pytest.mark.parametrize("content", ['{"scores": [7, 3]}', '[7, 3, 10, 2]', '1: 7\n2: 3', '1: 7\n2: 3\n3: 10\n4: 2'])
+def test_parse_batch_scores_rejects_a_count_mismatch(content):
+    assert AIAgent._parse_batch_scores(content, 3) is None
+
+
+def test_parse_batch_scores_clamps_out_of_range_scores():
+    assert AIAgent._parse_batch_scores('{"scores": [-4, 11, 250, 0.4]}', 4) == [0, 10, 10, 0]
+    assert AIAgent._parse_batch_scores('1: 12\n2: 99', 2) == [10, 10]
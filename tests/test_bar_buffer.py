@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_buffer import BarRingBuffer
+from conftest import random_walk
+
+MINUTE = 60 * 10 ** 9
+
+
+def _fill(bars, df):
+    for ts, row in zip(df.index, df.itertuples(index=False)):
+        bars.append(pd.Timestamp(ts).value, row.Open, row.High, row.Low, row.Close, row.Volume)
+
+
+def _expected(df, capacity):
+    tail = df.iloc[-capacity:]
+    return tail.set_axis(tail.index.as_unit('ns'))
+
+
+@pytest.mark.parametrize("rows", [1, 7, 8, 9, 15, 16, 17, 8 * 12 + 3])
+def test_ordered_view_across_wraparound(rows):
+    df = random_walk(rows, seed=rows)
+    df['Volume'] = np.arange(rows, dtype=float)
+    bars = BarRingBuffer(capacity=8)
+    _fill(bars, df)
+
+    expected = _expected(df, 8)
+    assert len(bars) == len(expected)
+    assert np.array_equal(bars.timestamps(), expected.index.asi8)
+    for col, values in bars.columns().items():
+        assert np.array_equal(values, expected[col].to_numpy()), col
+    # 两份镜像写入保持一致：任意起点的窗口都能取到连续视图
+    assert np.array_equal(bars._ts[:8], bars._ts[8:])
+    assert np.array_equal(bars._ohlcv[:, :8], bars._ohlcv[:, 8:])
+
+
+def test_update_last_after_wrap_writes_both_mirrors():
+    df = random_walk(21, seed=1)
+    bars = BarRingBuffer(capacity=8)
+    _fill(bars, df)
+
+    high = bars.last(BarRingBuffer.HIGH)
+    bars.update_last(high + 1.0)
+    assert bars.columns()['Close'][-1] == high + 1.0
+    assert bars.columns()['High'][-1] == high + 1.0
+    assert np.array_equal(bars._ohlcv[:, :8], bars._ohlcv[:, 8:])
+
+
+def test_views_stay_contiguous_and_read_only_after_many_wraps():
+    bars = BarRingBuffer(capacity=50)
+    _fill(bars, random_walk(50 * 40 + 13, seed=2))
+
+    views = [bars.timestamps(), *bars.columns().values(), bars.column(BarRingBuffer.CLOSE)]
+    for view in views:
+        assert view.flags.c_contiguous
+        assert not view.flags.writeable
+        assert np.shares_memory(view, bars._ts) or np.shares_memory(view, bars._ohlcv)  # 零拷贝
+        with pytest.raises(ValueError):
+            view[0] = 0
+
+    # 视图只读不影响缓冲区自身的写入
+    bars.update_last(123.0)
+    assert bars.column(BarRingBuffer.CLOSE)[-1] == 123.0
+
+
+def test_generation_marks_rebuilds_not_window_shifts():
+    df = random_walk(30, seed=3)
+    bars = BarRingBuffer(capacity=10)
+    bars.load_frame(df.iloc[:10])
+    generation = bars.generation
+    first = bars.timestamps()[0]
+
+    # 窗口滑动 (满了追加挤掉最旧一根) 只改变首根时间戳，generation 不变
+    _fill(bars, df.iloc[10:15])
+    assert bars.generation == generation
+    assert bars.timestamps()[0] == first + 5 * MINUTE
+
+    # 整体重新载入 (哪怕窗口一样长、首尾时间戳不变) 必须换代
+    bars.load_frame(df.iloc[5:15])
+    assert bars.generation == generation + 1
+    bars.clear()
+    assert bars.generation == generation + 2 and bars.empty
+
+
+@pytest.mark.parametrize("dtype, with_volume", [(np.float64, True), (np.float32, False)])
+def test_to_frame_matches_logical_contents(dtype, with_volume):
+    df = random_walk(37, seed=4)
+    df['Volume'] = 2.0
+    bars = BarRingBuffer(capacity=16, dtype=dtype, with_volume=with_volume)
+    bars.load_frame(df.iloc[:20])
+    _fill(bars, df.iloc[20:])
+
+    frame = bars.to_frame()
+    expected = _expected(df, 16)[list(bars.columns())].astype(dtype)
+    pd.testing.assert_frame_equal(frame, expected, check_freq=False, check_names=False)
+    # to_frame 是拷贝：之后的写入不影响已构建的 DataFrame
+    bars.update_last(999.0)
+    assert frame['Close'].iloc[-1] == expected['Close'].iloc[-1]
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_buffer import BarRingBuffer
+from bar_db import BarDatabase
+from conftest import random_walk
+
+
+def _assert_frame(got, expected):
+    expected = expected[BarRingBuffer.COLUMNS].set_axis(expected.index.as_unit('ns'))  # 库里存的是 ns 时间戳
+    pd.testing.assert_frame_equal(got, expected, check_freq=False, check_names=False)
+
+
+def test_round_trip_across_day_partitions(tmp_path):
+    # 15 分钟线跨 5 个自然日 (23:00 起)，写入后按天分区
+    df = random_walk(300, seed=1, start="2026-01-05 23:00", freq="15min")
+    df['Volume'] = np.arange(len(df), dtype=float)
+    db = BarDatabase(str(tmp_path))
+    assert db.write(df) == len(df)
+
+    assert db.partitions() == ['2026-01-05', '2026-01-06', '2026-01-07', '2026-01-08', '2026-01-09']
+    assert db.last_ts() == df.index[-1].value
+    _assert_frame(db.read(), df)
+    # 一个新实例 (重新扫描目录) 读出同样的数据
+    _assert_frame(BarDatabase(str(tmp_path)).read(), df)
+
+    # 区间读取：起止落在分区中间；max_rows 只保留最近的若干根
+    start, end = pd.Timestamp("2026-01-06 12:07"), pd.Timestamp("2026-01-08 01:00")
+    _assert_frame(db.read(start, end), df[(df.index >= start) & (df.index <= end)])
+    _assert_frame(db.read(max_rows=50), df.iloc[-50:])
+    _assert_frame(db.read(start=start, max_rows=10), df.iloc[-10:])
+
+
+def test_appending_in_order_keeps_earlier_bars(tmp_path):
+    df = random_walk(200, seed=2, start="2026-01-05 22:00")
+    db = BarDatabase(str(tmp_path))
+    db.write(df.iloc[:120])
+    db.write(df.iloc[120:])
+    _assert_frame(db.read(), df)
+
+
+def test_rewriting_an_overlapping_range(tmp_path):
+    df = random_walk(400, seed=3, start="2026-01-05 20:00", freq="5min")
+    db = BarDatabase(str(tmp_path))
+    db.write(df)
+
+    # 重叠的一段 (跨分区边界) 以新数据为准，区间外的 K 线不变；同一批里的重复时间戳以最后一条为准
+    patch = df.iloc[100:250].copy()
+    patch[['Open', 'High', 'Low', 'Close']] += 7.0
+    duplicate = patch.iloc[[-1]].copy()
+    duplicate['Close'] += 1.0
+    db.write(pd.concat([patch, duplicate]))
+
+    expected = df.copy()
+    expected.iloc[100:250] = patch
+    expected.iloc[249, expected.columns.get_loc('Close')] += 1.0
+    _assert_frame(db.read(), expected)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_reading_a_range_that_spans_a_gap(tmp_path):
+    before = random_walk(60, seed=4, start="2026-01-05 10:00")
+    after = random_walk(60, seed=5, start="2026-01-09 10:00")
+    db = BarDatabase(str(tmp_path))
+    db.write(pd.concat([before, after]))
+    assert db.partitions() == ['2026-01-05', '2026-01-09']
+
+    both = pd.concat([before, after])
+    _assert_frame(db.read("2026-01-05 10:30", "2026-01-09 10:29"), both.iloc[30:90])
+    # 区间完全落在空档里
+    assert db.read("2026-01-06", "2026-01-08 23:59").empty
+    assert BarDatabase(str(tmp_path / "empty")).read().empty
+
+
+@pytest.mark.parametrize("dtype, with_volume", [(np.float32, False), (np.float32, True), (np.float64, False)])
+def test_compact_buffer_layouts_round_trip(tmp_path, dtype, with_volume):
+    df = random_walk(500, seed=6, start="2026-01-05 23:30")
+    df['Volume'] = 3.0
+    bars = BarRingBuffer(capacity=300, dtype=dtype, with_volume=with_volume)
+    bars.load_frame(df)
+
+    # 紧凑缓冲区的 to_frame (float32 / 没有 Volume 列) 写库后按 float64 读回，缺失的成交量记为 0
+    db = BarDatabase(str(tmp_path))
+    db.write(bars.to_frame())
+    got = db.read()
+    assert all(got[col].dtype == np.float64 for col in BarRingBuffer.COLUMNS)
+    expected = df.iloc[-300:].copy()
+    expected[['Open', 'High', 'Low', 'Close']] = expected[['Open', 'High', 'Low', 'Close']].astype(dtype)
+    expected['Volume'] = 3.0 if with_volume else 0.0
+    _assert_frame(got, expected.astype(np.float64))
+
+    # 再载入同样布局的缓冲区，内容一致
+    reloaded = BarRingBuffer(capacity=300, dtype=dtype, with_volume=with_volume)
+    reloaded.load_frame(got)
+    for col, values in bars.columns().items():
+        assert np.array_equal(reloaded.columns()[col], values), col
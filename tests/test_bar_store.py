@@ -0,0 +1,30 @@
+import pandas as pd
+
+from bar_store import BarLog
+
+
+def test_append_after_invalid_header_starts_a_fresh_log(tmp_path):
+    path = tmp_path / "cache.bin"
+    path.write_bytes(b"Datetime,Open,High,Low,Close,Volume\n" * 4)
+
+    log = BarLog(str(path))
+    ts = pd.Timestamp("2026-01-05 09:00").value
+    log.append(ts, 600.0, 601.0, 599.0, 600.5)
+    log.close()
+
+    assert path.read_bytes()[:len(BarLog.MAGIC)] == BarLog.MAGIC
+    df = BarLog(str(path)).load()
+    assert len(df) == 1 and df['Close'].iloc[0] == 600.5
+
+
+def test_append_keeps_existing_records(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    ts = pd.Timestamp("2026-01-05 09:00").value
+    log = BarLog(path)
+    log.append(ts, 600.0, 601.0, 599.0, 600.5)
+    log.close()
+
+    log = BarLog(path)
+    log.append(ts + 60 * 10 ** 9, 600.5, 602.0, 600.0, 601.5)
+    log.close()
+    assert list(BarLog(path).load()['Close']) == [600.5, 601.5]
@@ -0,0 +1,187 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_buffer import BarRingBuffer
+from chart_payload import ChartPayloadBuilder
+from conftest import INDICATOR_PARAMS, random_walk, sync_stream
+from incremental_indicators import IncrementalIndicators
+
+MINUTE = 60 * 10 ** 9
+
+
+@pytest.fixture
+def formatted(monkeypatch):
+    """记录每次 strftime 格式化了多少根 K 线的时间"""
+    sizes = []
+    strftime = pd.DatetimeIndex.strftime
+
+    def counting(self, fmt):
+        sizes.append(len(self))
+        return strftime(self, fmt)
+
+    monkeypatch.setattr(pd.DatetimeIndex, "strftime", counting)
+    return sizes
+
+
+def _bars(rows=120, capacity=200, seed=0):
+    bars = BarRingBuffer(capacity=capacity)
+    bars.load_frame(random_walk(rows, seed=seed))
+    return bars
+
+
+def _build(builder, bars):
+    return builder.build_columns(bars.timestamps(), bars.columns(), bars.generation)
+
+
+def _labels(bars):
+    index = pd.DatetimeIndex(bars.timestamps().astype('datetime64[ns]'))
+    return list(index.strftime('%H:%M')), list(index.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def test_same_generation_only_rebuilds_the_tail(formatted):
+    bars = _bars()
+    builder = ChartPayloadBuilder()
+    first = _build(builder, bars)
+    assert first.changed_from == 0 and formatted == [120, 120]
+
+    # 同一分钟跳动：只有最后一根需要重新格式化
+    formatted.clear()
+    bars.update_last(bars.last(bars.CLOSE) + 0.5)
+    tick = _build(builder, bars)
+    assert tick.changed_from == 119 and formatted == [1, 1]
+
+    # 新的一分钟：上一根 (可能是跳动中的最终值) 和新 K 线
+    formatted.clear()
+    ts = bars.last_ts() + MINUTE
+    bars.append(ts, 601.0, 601.2, 600.8, 601.1)
+    bar = _build(builder, bars)
+    assert bar.changed_from == 119 and bar.n == 121 and formatted == [2, 2]
+
+    assert (list(bar.tick_labels), list(bar.hover_times)) == _labels(bars)
+    assert np.array_equal(bar.close, bars.column(bars.CLOSE))
+
+
+def test_generation_change_forces_a_full_rebuild(formatted):
+    bars = _bars()
+    builder = ChartPayloadBuilder()
+    _build(builder, bars)
+
+    # 长度、首尾时间戳都不变，只是换了一代 (历史合并改写了中间的 K 线)
+    formatted.clear()
+    rewritten = bars.to_frame()
+    rewritten.iloc[40:60, rewritten.columns.get_loc('Close')] += 3.0
+    bars.load_frame(rewritten)
+    payload = _build(builder, bars)
+    assert payload.changed_from == 0 and payload.generation == bars.generation
+    assert formatted == [120, 120]
+    assert np.array_equal(payload.close, rewritten['Close'].to_numpy())
+    assert (list(payload.tick_labels), list(payload.hover_times)) == _labels(bars)
+
+
+def test_window_shift_redraws_fully():
+    bars = _bars(rows=100, capacity=100)
+    builder = ChartPayloadBuilder()
+    _build(builder, bars)
+    bars.append(bars.last_ts() + MINUTE, 601.0, 601.2, 600.8, 601.1)  # 满了，挤掉最旧一根
+    payload = _build(builder, bars)
+    assert payload.changed_from == 0 and payload.n == 100
+    assert (list(payload.tick_labels), list(payload.hover_times)) == _labels(bars)
+
+
+def test_payload_built_on_a_worker_thread_owns_its_arrays():
+    bars = _bars()
+    stream = IncrementalIndicators(INDICATOR_PARAMS)
+    builder = ChartPayloadBuilder()
+    payloads = []
+
+    def worker():
+        sync_stream(stream, bars)
+        payloads.append(builder.build_columns(bars.timestamps(), {**bars.columns(), **stream.columns()},
+                                              bars.generation))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    payload = payloads[0]
+    arrays = [payload.x, payload.ts, payload.open, payload.high, payload.low, payload.close,
+              payload.sma_f, payload.sma_s, payload.bbu, payload.bbl, payload.rsi]
+    for arr in arrays:
+        assert arr.flags.c_contiguous and arr.flags.writeable
+        assert not np.shares_memory(arr, bars._ohlcv) and not np.shares_memory(arr, stream.block.data)
+    assert all(arr.dtype == np.float64 for arr in arrays if arr is not payload.ts)
+
+    # 交易线程继续写缓冲区，已发出的数据包不受影响
+    close = payload.close.copy()
+    bars.update_last(close[-1] + 9.0)
+    sync_stream(stream, bars)
+    assert np.array_equal(payload.close, close)
+
+
+@pytest.fixture
+def main_ui(tmp_path, monkeypatch):
+    for module in ("pandas_ta", "PyQt6.QtWidgets", "pyqtgraph", "akshare", "ollama", "google.genai", "openai"):
+        pytest.importorskip(module)
+    monkeypatch.setenv("QT_QPA_PLATFORM", os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    monkeypatch.chdir(tmp_path)  # main_ui 导入时会在当前目录建日志文件
+    import main_ui
+    import pyqtgraph as pg
+    pg.mkQApp()
+    return main_ui
+
+
+class _FakeHandler:
+    def __init__(self, max_len=200, stream_url=None):
+        self.bars = _bars(rows=150, capacity=max_len)
+
+
+def test_trading_worker_builds_the_payload_off_the_gui_thread(main_ui, monkeypatch):
+    from PyQt6.QtCore import Qt
+
+    monkeypatch.setattr(main_ui, "DataHandler", _FakeHandler)
+    worker = main_ui.TradingWorker()
+    built_on, received = [], []
+    build_columns = worker.chart_builder.build_columns
+
+    def recording(*args):
+        built_on.append(threading.current_thread())
+        return build_columns(*args)
+
+    worker.chart_builder.build_columns = recording
+    worker.data_updated.connect(lambda *args: received.append(args), Qt.ConnectionType.DirectConnection)
+
+    thread = threading.Thread(target=worker._publish)
+    thread.start()
+    thread.join()
+
+    assert built_on == [thread]
+    price, signal, reason, payload = received[0]
+    assert payload.n == 150 and payload.changed_from == 0
+    assert price == worker.data_handler.bars.last(BarRingBuffer.CLOSE)
+
+
+def test_candles_keep_the_closed_bar_cache_for_tail_updates(main_ui):
+    bars = _bars()
+    builder = ChartPayloadBuilder()
+    item = main_ui.CandlestickItem()
+
+    def show(payload):
+        item.set_data(payload.open, payload.high, payload.low, payload.close, changed_from=payload.changed_from)
+
+    show(_build(builder, bars))
+    version = item._version
+
+    bars.update_last(bars.last(bars.CLOSE) + 0.3)
+    show(_build(builder, bars))
+    assert item._version == version  # 只有跳动中的最后一根变化，已收盘 K 线的路径缓存保留
+
+    rewritten = bars.to_frame()
+    rewritten.iloc[10:20, rewritten.columns.get_loc('Low')] -= 5.0
+    bars.load_frame(rewritten)
+    show(_build(builder, bars))
+    assert item._version == version + 1  # 换代：已收盘部分整体重建
+    assert item._closed_range[0] == rewritten['Low'].iloc[:-1].min()
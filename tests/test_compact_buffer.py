@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_buffer import BarRingBuffer
+from conftest import INDICATOR_PARAMS, random_walk, sync_stream
+from incremental_indicators import IncrementalIndicators
+from tick_store import TickStore
+
+SECOND = 10 ** 9
+
+
+def _stores(minutes=240):
+    """紧凑存储与 float64 标准存储 (带成交量列) 喂同一串按 float32 取整的报价，每分钟 4 个"""
+    prices = random_walk(minutes * 4, seed=0)['Close'].to_numpy().astype(np.float32)
+    compact = TickStore(timeframes=('1min',), bar_capacity=200, tick_capacity=1000,
+                        dtype=np.float32, with_volume=False)
+    full = TickStore(timeframes=('1min',), bar_capacity=200, tick_capacity=1000)
+    t0 = pd.Timestamp("2026-01-05 09:00").value
+    for i, price in enumerate(prices):
+        compact.add(t0 + i * 15 * SECOND, price)
+        full.add(t0 + i * 15 * SECOND, float(price))
+    return compact.bars['1min'], full.bars['1min']
+
+
+@pytest.fixture(scope="module")
+def buffers():
+    return _stores()
+
+
+def test_compact_buffer_layout(buffers):
+    compact, full = buffers
+    assert len(compact) == len(full) == 200
+    assert list(compact.columns()) == ['Open', 'High', 'Low', 'Close']
+    assert all(values.dtype == np.float32 for values in compact.columns().values())
+    # 没有存储的成交量按全 0 读取，DataFrame 里也不再物化这一列
+    assert np.array_equal(compact.column(BarRingBuffer.VOLUME), np.zeros(200))
+    assert 'Volume' not in compact.to_frame().columns
+    # 价格减半、少一列：时间戳 8 字节 + 4 列 x 4 字节 vs 8 + 5 x 8
+    assert compact.nbytes * 48 == full.nbytes * 24
+    for col, values in compact.columns().items():
+        assert np.array_equal(values, full.columns()[col]), col
+
+
+def test_indicator_views_on_the_compact_buffer(buffers):
+    compact, full = buffers
+    stream = IncrementalIndicators(INDICATOR_PARAMS)
+    expected = IncrementalIndicators(INDICATOR_PARAMS)
+    latest = sync_stream(stream, compact)
+    sync_stream(expected, full)
+
+    views = stream.columns()
+    for col in IncrementalIndicators.COLUMNS:
+        view = views[col]
+        assert len(view) == len(compact) and view.dtype == np.float64
+        assert np.shares_memory(view, stream.block.data)  # 零拷贝
+        assert not view.flags.writeable
+        assert np.array_equal(view, expected.columns()[col], equal_nan=True), col
+        assert np.isclose(view[-1], latest[col], equal_nan=True), col
+    assert not np.isnan(views['vol_ma'][-1])
+
+
+def test_check_signal_bars_on_the_compact_buffer(buffers):
+    pytest.importorskip("pandas_ta")
+    from strategy_engine import QuantalyticsEngine
+
+    compact, full = buffers
+    signal, reason, columns = QuantalyticsEngine().check_signal_bars(compact)
+    expected_signal, expected_reason, expected = QuantalyticsEngine().check_signal_bars(full)
+
+    assert (signal, reason) == (expected_signal, expected_reason)
+    assert 'Volume' not in columns and 'Volume' in expected
+    for col, values in columns.items():
+        assert np.array_equal(values, expected[col], equal_nan=True), col
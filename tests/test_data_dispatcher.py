@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("akshare")
+pytest.importorskip("selenium")
+
+from conftest import INDICATOR_PARAMS, make_bars, sync_stream
+from data_dispatcher import DataHandler
+from incremental_indicators import IncrementalIndicators
+from quote_sources import FakeQuoteSource, StreamQuoteSource
+
+@pytest.fixture
+def handler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    h = DataHandler(max_len=300, sources=[FakeQuoteSource(seed=1)])
+    yield h
+    h.close_sources()
+    h.store.close()
+
+
+def test_history_merge_invalidates_incremental_state(handler):
+    rng = np.random.default_rng(2)
+    close = 600 + rng.normal(0, .3, 200).cumsum()
+    handler.buffer = make_bars(close)
+    stream = IncrementalIndicators(INDICATOR_PARAMS)
+    sync_stream(stream, handler.bars)
+    generation = handler.bars.generation
+
+    # 后台历史任务返回的数据与缓冲区首尾重合，只改写了中间一段
+    history = make_bars(close)
+    history.iloc[50:80, :4] += 4.0
+    job = Future()
+    job.set_result(history)
+    handler._history_job = job
+    assert handler.poll_startup()
+
+    assert handler.bars.generation != generation
+    assert handler.bars.last_ts() == pd.Timestamp(history.index[-1]).value
+    got = sync_stream(stream, handler.bars)
+    expected = sync_stream(IncrementalIndicators(INDICATOR_PARAMS), handler.bars)
+    for col in IncrementalIndicators.COLUMNS:
+        assert np.isclose(got[col], expected[col], equal_nan=True), col
+
+
+class _PushHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for price in (601.5, 602.25):
+            self.wfile.write(f"data: {price}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(0.05)
+        time.sleep(1.0)  # 保持连接，模拟常驻推送
+
+    def log_message(self, *args):
+        pass
+
+
+def test_stream_url_adds_push_source_first(tmp_path, monkeypatch):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _PushHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.chdir(tmp_path)
+    handler = DataHandler(max_len=300, stream_url=f"http://127.0.0.1:{httpd.server_port}/quotes")
+    try:
+        stream = handler.sources[0]
+        assert isinstance(stream, StreamQuoteSource)
+        deadline = time.monotonic() + 3
+        while stream._latest is None or stream._latest[0] != 602.25:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+        price, _, source = handler.quotes.quote()
+        assert (price, source) == (602.25, "Stream")
+    finally:
+        handler.close_sources()
+        handler.store.close()
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("backtesting")
+pytest.importorskip("talib")
+
+from backtesting import Backtest
+
+from conftest import random_walk
+from fast_backtest import FastBacktest
+from strategy import AdaptiveMomentumReversion
+
+# finalize_trades=False 时末尾持仓不计入统计正是要对比的口径
+pytestmark = pytest.mark.filterwarnings("ignore:Some trades remain open")
+
+# FastBacktest 声称与 bt.run() 同口径的统计量
+STATS = ['# Trades', 'Return [%]', 'Sharpe Ratio', 'Max. Drawdown [%]', 'Equity Final [$]',
+         'Exposure Time [%]', 'Profit Factor', 'Sortino Ratio']
+
+FRAMES = {
+    '1min': lambda: random_walk(3000, seed=11, base=2000.0, step=0.5, start="2024-01-02", spread=0.3),
+    '15min': lambda: random_walk(2500, seed=12, base=2000.0, step=1.5, start="2024-01-02", freq="15min",
+                                 spread=0.5),
+    '15min_gold': lambda: random_walk(2000, seed=13, base=600.0, step=0.6, start="2024-03-01", freq="15min"),
+}
+
+
+def _assert_same_stats(fast, slow):
+    assert fast['# Trades'] > 0
+    for key in STATS:
+        assert np.isclose(fast[key], slow[key], rtol=1e-9, atol=1e-9, equal_nan=True), \
+            (key, fast[key], slow[key])
+
+
+@pytest.mark.parametrize("finalize_trades", [False, True])
+@pytest.mark.parametrize("frame", sorted(FRAMES))
+def test_fast_backtest_matches_backtesting(frame, finalize_trades):
+    df = FRAMES[frame]()
+    slow = Backtest(df, AdaptiveMomentumReversion, cash=100000, commission=0.00002,
+                    finalize_trades=finalize_trades).run()
+    fast = FastBacktest(df, cash=100000, commission=0.00002, finalize_trades=finalize_trades).run()
+    _assert_same_stats(fast, slow)
+
+
+@pytest.mark.parametrize("finalize_trades", [False, True])
+@pytest.mark.parametrize("max_trades", [1, 2])
+def test_daily_trade_cap_matches_backtesting(max_trades, finalize_trades):
+    df = FRAMES['1min']()
+    params = {'max_trades_per_day': max_trades, 'sl_atr_mult': 0.8, 'tp_atr_mult': 1.2}
+    slow = Backtest(df, AdaptiveMomentumReversion, cash=100000, commission=0.00002,
+                    finalize_trades=finalize_trades).run(**params)
+    fast = FastBacktest(df, cash=100000, commission=0.00002, finalize_trades=finalize_trades).run(**params)
+    _assert_same_stats(fast, slow)
+
+    # 上限确实生效：放开上限后交易数更多
+    uncapped = FastBacktest(df, cash=100000, commission=0.00002,
+                            finalize_trades=finalize_trades).run(**{**params, 'max_trades_per_day': 1000})
+    assert uncapped['# Trades'] > fast['# Trades']
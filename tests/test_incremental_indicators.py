@@ -0,0 +1,64 @@
+import numpy as np
+
+from bar_buffer import BarRingBuffer
+from chart_payload import ChartPayloadBuilder
+from conftest import INDICATOR_PARAMS, make_bars, sync_stream
+from incremental_indicators import IncrementalIndicators
+
+def test_mid_buffer_rewrite_with_same_endpoints_reseeds():
+    rng = np.random.default_rng(0)
+    close = 600 + rng.normal(0, .3, 150).cumsum()
+    bars = BarRingBuffer(capacity=150)
+    bars.load_frame(make_bars(close))
+    stream = IncrementalIndicators(INDICATOR_PARAMS)
+    sync_stream(stream, bars)
+
+    # 历史合并：首尾时间戳和长度不变，只改写中间一段
+    rewritten = close.copy()
+    rewritten[60:90] += 5.0
+    bars.load_frame(make_bars(rewritten))
+    got = sync_stream(stream, bars)
+
+    fresh = IncrementalIndicators(INDICATOR_PARAMS)
+    expected = sync_stream(fresh, bars)
+    for col in IncrementalIndicators.COLUMNS:
+        assert np.isclose(got[col], expected[col], equal_nan=True), col
+    assert np.allclose(stream.block.view(), fresh.block.view(), equal_nan=True)
+
+
+def test_ticks_within_a_generation_stay_incremental():
+    rng = np.random.default_rng(1)
+    close = 600 + rng.normal(0, .3, 100).cumsum()
+    bars = BarRingBuffer(capacity=200)
+    bars.load_frame(make_bars(close))
+    stream = IncrementalIndicators(INDICATOR_PARAMS)
+    sync_stream(stream, bars)
+
+    generation = bars.generation
+    bars.update_last(close[-1] + 0.2)
+    bars.append(bars.last_ts() + 60_000_000_000, close[-1], close[-1], close[-1], close[-1])
+    got = sync_stream(stream, bars)
+    assert bars.generation == generation
+
+    fresh = IncrementalIndicators(INDICATOR_PARAMS)
+    expected = sync_stream(fresh, bars)
+    for col in IncrementalIndicators.COLUMNS:
+        assert np.isclose(got[col], expected[col], equal_nan=True), col
+
+
+def test_chart_payload_redraws_fully_after_rewrite():
+    close = np.linspace(600, 610, 80)
+    bars = BarRingBuffer(capacity=80)
+    bars.load_frame(make_bars(close))
+    builder = ChartPayloadBuilder()
+    builder.build_columns(bars.timestamps(), bars.columns(), bars.generation)
+
+    bars.update_last(611.0)
+    assert builder.build_columns(bars.timestamps(), bars.columns(), bars.generation).changed_from == 79
+
+    rewritten = close.copy()
+    rewritten[10:20] -= 3.0
+    bars.load_frame(make_bars(rewritten))
+    payload = builder.build_columns(bars.timestamps(), bars.columns(), bars.generation)
+    assert payload.changed_from == 0
+    assert np.allclose(payload.close, rewritten)
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+pytest.importorskip("backtesting")
+pytest.importorskip("talib")
+
+import strategy
+from strategy import cached_indicator
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(strategy, "_INDICATOR_CACHE", OrderedDict())
+
+
+def _counting(calls):
+    def rolling_mean(values, n):
+        calls.append(n)
+        return np.convolve(values, np.ones(n) / n, mode='same')
+
+    def bands(values, n):
+        calls.append(n)
+        mid = rolling_mean(values, n)
+        return mid - 1.0, mid, mid + 1.0
+
+    return rolling_mean, bands
+
+
+def test_repeated_identical_input_hits():
+    calls = []
+    rolling_mean, _ = _counting(calls)
+    values = np.random.default_rng(0).normal(size=200)
+
+    first = cached_indicator(rolling_mean)(values, 10)
+    # 新的包装器、内容相同的另一个数组 (优化器每个候选各自 init) 也命中
+    second = cached_indicator(rolling_mean)(values.copy(), 10)
+    assert calls == [10]
+    assert second is first
+
+
+def test_changed_input_misses():
+    calls = []
+    rolling_mean, _ = _counting(calls)
+    values = np.random.default_rng(1).normal(size=200)
+    cached = cached_indicator(rolling_mean)
+
+    base = cached(values, 10)
+    cached(values, 12)  # 参数变化
+    changed = values.copy()
+    changed[-1] += 1e-9  # 内容变化 (形状不变)
+    cached(changed, 10)
+    cached(values.astype(np.float32), 10)  # dtype 变化
+    assert calls == [10, 12, 10, 10]
+    assert cached(values, 10) is base
+
+
+def test_returned_arrays_are_read_only():
+    calls = []
+    rolling_mean, bands = _counting(calls)
+    values = np.random.default_rng(2).normal(size=100)
+
+    single = cached_indicator(rolling_mean)(values, 5)
+    lower, mid, upper = cached_indicator(bands)(values, 5)
+    for arr in (single, lower, mid, upper):
+        assert not arr.flags.writeable
+        with pytest.raises(ValueError):
+            arr[0] = 0.0
+    assert values.flags.writeable  # 输入数组不受影响
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(strategy, "_INDICATOR_CACHE_SIZE", 2)
+    calls = []
+    rolling_mean, _ = _counting(calls)
+    values = np.random.default_rng(3).normal(size=50)
+    cached = cached_indicator(rolling_mean)
+
+    cached(values, 3)
+    cached(values, 4)
+    cached(values, 3)  # 命中后移到最新
+    cached(values, 5)  # 挤掉最久未用的 n=4
+    cached(values, 3)
+    cached(values, 4)
+    assert calls == [3, 4, 5, 4]
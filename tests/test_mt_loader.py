@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mt_loader
+from conftest import random_walk, write_mt_csv
+from mt_loader import ParsedCache, load_bars, read_mt_csv, resample_ohlcv, stream_resample
+
+
+def _assert_same(got, expected):
+    # 缓存读回的索引不带 freq，其余 (时间戳、列、dtype) 都要一致
+    pd.testing.assert_frame_equal(got, expected, check_freq=False)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "DAT_MT_XAUUSD_M1_2024.csv"
+    df = random_walk(3000, seed=0, base=2000.0, step=0.5, start="2024-01-02 17:00", spread=0.3)
+    df['Volume'] = 1.0
+    write_mt_csv(path, df)
+    return str(path)
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """记录真正解析 CSV 的次数 (缓存命中时不应调用 read_mt_csv)"""
+    calls = []
+
+    def counting(path):
+        calls.append(path)
+        return read_mt_csv(path)
+
+    monkeypatch.setattr(mt_loader, "read_mt_csv", counting)
+    return calls
+
+
+def test_sidecars_reload_identical_frames(csv_path, parses):
+    df = load_bars(csv_path, resample='15min')
+    assert len(parses) == 1
+
+    cache = ParsedCache(csv_path)
+    assert sorted(os.listdir(cache.root)) == ['meta.json', 'raw', 'tf_15min']
+    with open(cache.meta_path, encoding='utf-8') as f:
+        assert sorted(json.load(f)['frames']) == ['raw', 'tf_15min']
+
+    _assert_same(cache.load(None), read_mt_csv(csv_path))
+    _assert_same(cache.load('15min'), df)
+    _assert_same(load_bars(csv_path, resample='15min'), df)
+    assert len(parses) == 1
+
+
+def test_new_timeframe_reuses_the_parsed_m1_data(csv_path, parses):
+    load_bars(csv_path, resample='15min')
+    cache = ParsedCache(csv_path)
+    assert cache.load('1h') is None
+
+    df = load_bars(csv_path, resample='1h')
+    assert len(parses) == 1  # 由缓存的 M1 数据重新聚合，不再解析 CSV
+    _assert_same(df, resample_ohlcv(read_mt_csv(csv_path), '1h'))
+    _assert_same(cache.load('1h'), df)
+    _assert_same(cache.load('15min'), load_bars(csv_path, resample='15min'))
+
+
+def test_cache_is_invalidated_when_the_mtime_changes(csv_path, parses):
+    load_bars(csv_path, resample='15min')
+    st = os.stat(csv_path)
+    os.utime(csv_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    assert ParsedCache(csv_path).load('15min') is None
+    assert ParsedCache(csv_path).load(None) is None
+    load_bars(csv_path, resample='15min')
+    assert len(parses) == 2
+
+
+def test_cache_is_invalidated_when_the_size_changes(csv_path, parses):
+    before = load_bars(csv_path, resample='15min')
+    mtime_ns = os.stat(csv_path).st_mtime_ns
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write("2024.01.05,00:00,2100.0,2101.0,2099.0,2100.5,1\n")
+    os.utime(csv_path, ns=(mtime_ns, mtime_ns))  # mtime 不变，只有大小变化
+
+    assert ParsedCache(csv_path).load('15min') is None
+    after = load_bars(csv_path, resample='15min')
+    assert len(parses) == 2
+    assert after.index[-1] == pd.Timestamp("2024-01-05 00:00") and len(after) == len(before) + 1
+
+    # 旧周期的缓存随之清掉，只剩重建后的条目
+    with open(ParsedCache(csv_path).meta_path, encoding='utf-8') as f:
+        assert sorted(json.load(f)['frames']) == ['raw', 'tf_15min']
+
+
+def _gapped_m1():
+    """M1 数据带空档：周末休市、每日收盘后一小时停盘、随机缺失的分钟"""
+    df = random_walk(7200, seed=1, base=2000.0, step=0.5, start="2024-01-04 20:13", spread=0.3)
+    df['Volume'] = np.random.default_rng(1).integers(1, 50, len(df)).astype(float)
+    index = df.index
+    keep = (index.dayofweek < 5) & (index.hour != 22)
+    keep &= np.random.default_rng(2).random(len(df)) > 0.1
+    return df[keep]
+
+
+@pytest.mark.parametrize("chunksize", [1, 37, 1440, 100_000])
+@pytest.mark.parametrize("rule", ['15min', '1h', '4h', '1D', '7min'])
+def test_stream_resample_matches_whole_file_resample(tmp_path, rule, chunksize):
+    df = _gapped_m1()
+    if chunksize == 1: df = df.iloc[:400]  # 逐行分块很慢，截短一些 (仍跨过停盘空档和零点)
+    path = tmp_path / "m1.csv"
+    write_mt_csv(path, df)
+
+    expected = resample_ohlcv(read_mt_csv(str(path)), rule)
+    got = stream_resample(str(path), rule, chunksize=chunksize)
+    _assert_same(got, expected)
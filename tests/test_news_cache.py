@@ -0,0 +1,27 @@
+import json
+import time
+
+from news_cache import HeadlineScoreCache
+
+
+def test_lru_order_survives_reload(tmp_path):
+    path = str(tmp_path / "scores.json")
+    cache = HeadlineScoreCache(path, max_entries=2)
+    cache.put("[A] Gold rallies", "m", 7)
+    time.sleep(0.01)
+    cache.put("[B] Fed holds rates", "m", 3)
+    time.sleep(0.01)
+    assert cache.get("[CNBC] gold RALLIES!", "m") == 7  # 最早写入、但最近使用
+    cache.flush()
+
+    reloaded = HeadlineScoreCache(path, max_entries=2)
+    reloaded.put("[C] Oil slips", "m", 1)  # 超出容量：淘汰最久未使用的 Fed
+    assert reloaded.get("Gold rallies", "m") == 7
+    assert reloaded.get("Fed holds rates", "m") is None
+
+
+def test_old_files_without_access_field_still_load(tmp_path):
+    path = tmp_path / "scores.json"
+    key = HeadlineScoreCache.key("Gold rallies")
+    path.write_text(json.dumps({key: {'score': 5, 'ts': time.time(), 'model': 'm'}}), encoding='utf-8')
+    assert HeadlineScoreCache(str(path)).get("Gold rallies", "m") == 5
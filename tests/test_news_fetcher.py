@@ -0,0 +1,83 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("feedparser")
+
+from news_fetcher import FeedFetcher
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><title>Gold rallies</title><link>http://x/1</link></item>
+<item><title>Fed holds rates</title><link>http://x/2</link></item>
+</channel></rss>"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/broken':
+            self.send_response(500)
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(RSS)))
+        self.end_headers()
+        self.wfile.write(RSS)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    Handler.hits = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_conditional_requests_reuse_items(server):
+    url = server + '/feed'
+    fetcher = FeedFetcher([{'url': url, 'tag': '[T]', 'lang': 'en', 'limit': 8}], timeout=2)
+    try:
+        first = fetcher.fetch_all()
+        assert [n['title'] for n in first] == ['[T] Gold rallies', '[T] Fed holds rates']
+        assert fetcher.stats[url]['status'] == 200
+
+        second = fetcher.fetch_all()
+        assert second == first
+        assert fetcher.stats[url]['status'] == 304
+        assert fetcher.stats[url]['not_modified']
+        assert Handler.hits[-1] == ('/feed', '"v1"')
+    finally:
+        fetcher.close()
+
+
+def test_failures_are_recorded_in_stats(server):
+    broken, refused = server + '/broken', f"http://127.0.0.1:{_closed_port()}/feed"
+    fetcher = FeedFetcher([{'url': broken, 'tag': '[B]'}, {'url': refused, 'tag': '[R]'}], timeout=2)
+    try:
+        assert fetcher.fetch_all() == []
+        assert fetcher.stats[broken]['status'] == 500
+        assert fetcher.stats[refused]['status'] == 'error'
+        assert all(s['latency'] is not None for s in fetcher.stats.values())
+    finally:
+        fetcher.close()
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("PyQt6")
+pytest.importorskip("akshare")
+
+import optimizer_worker
+from bar_db import BarDatabase
+from conftest import random_walk
+from optimizer_worker import OptimizerWorker
+
+
+def test_history_is_read_from_the_bar_database_without_a_data_handler(tmp_path, monkeypatch):
+    monkeypatch.setattr(optimizer_worker, "DataHandler", None)  # 构造 DataHandler 会直接报错
+    now = pd.Timestamp.now().floor("min")
+    db = BarDatabase(str(tmp_path))
+    db.write(random_walk(1000, seed=0, start=now - pd.Timedelta(days=65), freq="15min"))  # 早于 60 天的部分不读
+    db.write(random_walk(800, seed=1, start=now - pd.Timedelta(minutes=800)))
+
+    worker = OptimizerWorker(history_db=db)
+    seen = []
+    monkeypatch.setattr(worker, "_run_optimization_logic", lambda df: seen.append(df) or None)
+    worker.run()
+
+    df = seen[0]
+    cutoff = now - pd.Timedelta(days=OptimizerWorker.HISTORY_DAYS)
+    assert df.index[0] >= cutoff - pd.Timedelta(minutes=1)
+    assert len(df) > 800  # 60 天内的 15 分钟线 + 最近的 1 分钟线
+    assert df.index[-1] == now - pd.Timedelta(minutes=1)
@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("backtesting")
+pytest.importorskip("talib")
+
+from conftest import random_walk
+from parallel_optimizer import ParallelOptimizer
+
+
+def _frame(rows=3000):
+    return random_walk(rows, base=2000.0, step=0.5, start="2024-01-02", freq="15min", spread=0.3)
+
+
+def test_cancel_before_run_returns_immediately():
+    optimizer = ParallelOptimizer(_frame(100), processes=1)
+    optimizer.cancel()
+    start = time.perf_counter()
+    assert optimizer.run({'rsi_period': [10, 12]}) is None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_cancel_is_seen_while_a_backtest_is_running():
+    optimizer = ParallelOptimizer(_frame(), processes=1)
+    results, finished = [], threading.Event()
+
+    def target():
+        results.append(optimizer.run({'rsi_period': range(10, 40), 'sma_slow': range(20, 60, 5)}))
+        finished.set()
+
+    threading.Thread(target=target, daemon=True).start()
+    time.sleep(1.0)  # 子进程启动并开始回测
+    cancelled_at = time.perf_counter()
+    optimizer.cancel()
+    assert finished.wait(10)
+    assert time.perf_counter() - cancelled_at < 1.5
+    assert results == [None]
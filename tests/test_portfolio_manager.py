@@ -0,0 +1,58 @@
+import numpy as np
+
+from portfolio_manager import PortfolioManager
+
+
+def _scalar(pm, h, c, s, ai, p):
+    action, amount, reason = pm.calculate_suggestion(float(h), float(c), str(s), int(ai), float(p))
+    return action, amount
+
+
+def test_batch_matches_scalar_on_random_rows():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    holdings = np.where(rng.random(n) < .5, np.round(rng.uniform(0, 20000, n), 3),
+                        rng.choice([0., 50., 99.99, 100., 1000., 5000.], n))
+    cash = np.where(rng.random(n) < .5, np.round(rng.uniform(0, 50000, n), 3),
+                    rng.choice([0., 99., 100., 1000., 4999.995], n))
+    signal = rng.choice(np.array(["BUY", "SELL", "NEUTRAL", "X"]), n)
+    ai = rng.integers(-10, 11, n)
+    price = rng.choice([0., -1., 600.5, 612.34, np.nan], n)
+
+    pm = PortfolioManager()
+    action, amount, reason = pm.calculate_suggestions(holdings, cash, signal, ai, price)
+    for i in range(n):
+        expected = _scalar(pm, holdings[i], cash[i], signal[i], ai[i], price[i])
+        assert (pm.ACTIONS[action[i]], float(amount[i])) == expected
+        assert pm.calculate_suggestion(float(holdings[i]), float(cash[i]), str(signal[i]), int(ai[i]),
+                                       float(price[i]))[2].startswith(
+            pm.reason_text(int(reason[i]), int(ai[i]), 0.0, 1.0).split(" (约")[0])
+
+
+def test_batch_matches_scalar_on_cent_ties():
+    pm = PortfolioManager()
+    # 恐慌清仓时建议金额 = 持仓本身，正好落在 .xx5 上
+    ties = [150.125, 100.005, 1234.565, 2.675 * 100, 1000.015, 99999.995]
+    action, amount, _ = pm.calculate_suggestions(ties, 0, "SELL", -10, 500)
+    for i, h in enumerate(ties):
+        assert (pm.ACTIONS[action[i]], float(amount[i])) == _scalar(pm, h, 0, "SELL", -10, 500)
+
+
+def test_scalar_inputs_keep_scalar_shape():
+    pm = PortfolioManager()
+    action, amount, reason = pm.calculate_suggestions(150.125, 0, "SELL", -10, 500)
+    assert amount.shape == () and action.shape == () and reason.shape == ()
+    assert float(amount) == pm.calculate_suggestion(150.125, 0, "SELL", -10, 500)[1]
+
+
+def test_numeric_signals_and_parameter_grid():
+    pm = PortfolioManager()
+    holdings = np.array([0., 5000., 20000.])
+    cash = np.array([50000., 0., 10000.])
+    _, by_name, _ = pm.calculate_suggestions(holdings, cash, ["BUY", "SELL", "NEUTRAL"], 3, 600)
+    _, by_code, _ = pm.calculate_suggestions(holdings, cash, [1, -1, 0], 3, 600)
+    assert np.array_equal(by_name, by_code)
+
+    _, grid, _ = pm.calculate_suggestions(holdings, cash, [1, -1, 0], 3, 600, buy_ratio=[[0.1], [0.2]])
+    assert grid.shape == (2, 3)
+    assert np.array_equal(grid[1], by_name)
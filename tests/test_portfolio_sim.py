@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from portfolio_manager import PortfolioManager
+from portfolio_sim import PortfolioSimulator, align_scores, trading_days_per_year
+
+
+def test_replay_matches_hand_computed_fills():
+    df = make_bars([100, 100, 110, 120, 120], opens=[100, 100, 105, 115, 125])
+    sim = PortfolioSimulator(df, [1, 1, -1, 0, 0], ai_scores=[3, 3, -5, 0, 0], cash=100000, commission=0.001)
+    result = sim.run()
+
+    # 第 0 根 BUY (AI +3)：max(100000×0.2, 1000)×(1+3/20) = 23000，按第 1 根开盘 100 成交
+    buy_fee = 23000 * 0.001
+    cash = 100000 - 23000
+    grams = (23000 - buy_fee) / 100
+    # 第 2 根 SELL (AI -5)：持仓市值 grams×110，max(市值×0.2, 1000)×1.25×1.5 取整到分，按第 3 根开盘 115 成交
+    sell_amount = round(max(grams * 110 * 0.2, 1000) * 1.25 * 1.5, 2)
+    assert sell_amount == 9478.01
+    sold = sell_amount / 115
+    sell_fee = sell_amount * 0.001
+    cash_end = cash + sell_amount - sell_fee
+    grams_end = grams - sold
+
+    assert result['# Trades'] == 2 and result['# Buys'] == 1 and result['# Sells'] == 1
+    assert result['Final Cash'] == pytest.approx(cash_end)
+    assert result['Final Grams'] == pytest.approx(grams_end)
+    assert result['Turnover'] == pytest.approx(23000 + sell_amount)
+    assert result['Fees'] == pytest.approx(buy_fee + sell_fee)
+    expected = [100000, cash + grams * 100, cash + grams * 110, cash_end + grams_end * 120, cash_end + grams_end * 120]
+    assert result['equity'].to_numpy() == pytest.approx(expected)
+
+
+def test_veto_and_last_bar_do_not_trade():
+    df = make_bars([100, 100, 100], opens=[100, 100, 100])
+    # BUY 且 AI <= -5 被否决；最后一根的信号没有下一根开盘价可成交
+    result = PortfolioSimulator(df, [1, 0, -1], ai_scores=[-6, 0, 0], grams=50).run()
+    assert result['# Trades'] == 0
+    assert result['Final Cash'] == 100000 and result['Final Grams'] == 50
+
+
+def test_decide_rounds_like_calculate_suggestion():
+    pm = PortfolioManager()
+    action, amount, code = pm.decide(0, 12345.678, "BUY", 3, 600)
+    assert (PortfolioManager.ACTIONS[action], amount) == pm.calculate_suggestion(0, 12345.678, "BUY", 3, 600)[:2]
+    assert code == pm.R_BUY_AI_BULL
+
+
+def test_align_scores():
+    index = pd.date_range("2026-01-05 09:00", periods=4, freq="min")
+    series = pd.Series([2.0, -3.0], index=[index[1], index[3]])
+    assert list(align_scores(index, series)) == [0.0, 2.0, 2.0, -3.0]
+    assert list(align_scores(index, [1, 2, 3, 4])) == [1.0, 2.0, 3.0, 4.0]
+    assert list(align_scores(index, None)) == [0.0] * 4
+
+    with pytest.raises(ValueError):
+        align_scores(index, [1, 2, 3])
+    with pytest.raises(ValueError):
+        align_scores(index, np.zeros(5))
+    with pytest.raises(ValueError):
+        align_scores(index, pd.Series([1.0, 2.0]))
+
+
+def test_sharpe_annualisation_follows_the_trading_calendar():
+    weekdays = make_bars(600 + np.random.default_rng(0).normal(0, 1, 30).cumsum(), start="2026-01-05", freq="B")
+    every_day = make_bars(weekdays['Close'].to_numpy(), start="2026-01-05", freq="D")
+    signals = [1] + [0] * 29
+    assert trading_days_per_year(weekdays.index) == 252
+    assert trading_days_per_year(every_day.index) == 365
+
+    derived = PortfolioSimulator(weekdays, signals).run()['Sharpe Ratio']
+    explicit = PortfolioSimulator(weekdays, signals, periods_per_year=252).run()['Sharpe Ratio']
+    assert derived == explicit and np.isfinite(derived)
+    # 同样的日收益：连续交易 (含周末) 按 365 年化；也可以显式指定
+    assert PortfolioSimulator(every_day, signals).run()['Sharpe Ratio'] == pytest.approx(derived * np.sqrt(365 / 252))
+    assert PortfolioSimulator(weekdays, signals, periods_per_year=52).run()['Sharpe Ratio'] == \
+        pytest.approx(derived * np.sqrt(52 / 252))
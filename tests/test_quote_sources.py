@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from quote_sources import FakeQuoteSource, QuoteSource, QuoteSourceManager, SourceHealth
+
+
+class SlowSource(QuoteSource):
+    """记录 _fetch 的最大并发数"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    def _fetch(self):
+        self.active += 1
+        self.calls += 1
+        self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        self.active -= 1
+        return 600.0
+
+
+def test_duplicate_source_names_are_rejected():
+    with pytest.raises(ValueError):
+        QuoteSourceManager([FakeQuoteSource("A"), FakeQuoteSource("A")])
+
+
+def test_quote_calls_on_one_source_are_serialized():
+    source = SlowSource("slow")
+    threads = [threading.Thread(target=source.quote) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert source.calls == 4
+    assert source.max_active == 1
+
+
+def test_fallback_skips_half_open_sources():
+    a, b = SlowSource("A"), SlowSource("B")
+    manager = QuoteSourceManager([a, b])
+    manager._probe_thread = object()  # 不启动后台探测
+    manager.health["A"].state = SourceHealth.HALF_OPEN
+    manager.health["B"].state = SourceHealth.OPEN
+
+    price, _, name = manager.quote()
+    assert (price, name) == (600.0, "B")
+    assert a.calls == 0
+
+
+def test_quote_source_requires_fetch():
+    with pytest.raises(TypeError):
+        QuoteSource("abstract")
+
+    class NoFetch(QuoteSource):
+        pass
+
+    with pytest.raises(TypeError):
+        NoFetch("incomplete")
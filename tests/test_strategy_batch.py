@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+pytest.importorskip("backtesting")
+pytest.importorskip("talib")
+
+import strategy
+from conftest import random_walk, write_mt_csv
+
+
+def _write_mt_csv(path, seed, rows=4000):
+    write_mt_csv(path, random_walk(rows, seed, base=2000.0, step=0.5, start="2024-01-02", spread=0.3))
+
+
+def test_has_magic():
+    assert strategy._has_magic("data/*.csv")
+    assert strategy._has_magic("data/DAT_[12].csv")
+    assert not strategy._has_magic("data/XAUUSD_M1/DAT_MT_XAUUSD_M1_2024.csv")
+
+
+def test_batch_labels_are_relative_to_common_root(tmp_path):
+    paths = [str(tmp_path / "XAUUSD_M1" / "2024.csv"), str(tmp_path / "XAGUSD_M1" / "2024.csv")]
+    assert strategy._batch_labels(paths) == ["XAUUSD_M1/2024.csv", "XAGUSD_M1/2024.csv"]
+    assert strategy._batch_labels(paths[:1]) == ["2024.csv"]
+
+
+def test_run_batch_with_duplicate_basenames(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    a, b = tmp_path / "XAUUSD_M1" / "2024.csv", tmp_path / "XAGUSD_M1" / "2024.csv"
+    _write_mt_csv(a, 0)
+    _write_mt_csv(b, 1)
+
+    table = strategy.run_batch([str(a), str(b), str(a)], processes=1, output=str(tmp_path / "summary"))
+    assert sorted(table.index) == ["XAGUSD_M1/2024.csv", "XAUUSD_M1/2024.csv"]
+    with open(tmp_path / "summary.json", encoding="utf-8") as f:
+        assert sorted(json.load(f)) == sorted(table.index)
+
+
+def test_batch_plots_with_duplicate_basenames_do_not_overwrite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    a, b = tmp_path / "XAUUSD_M1" / "2024.csv", tmp_path / "XAGUSD_M1" / "2024.csv"
+    _write_mt_csv(a, 0, rows=1500)
+    _write_mt_csv(b, 1, rows=1500)
+
+    strategy.run_batch([str(a), str(b)], processes=1, plot=True, output=str(tmp_path / "summary"))
+    assert sorted(p.name for p in tmp_path.glob("*.html")) == [
+        "backtest_results_XAGUSD_M1__2024.html", "backtest_results_XAUUSD_M1__2024.html"]
+
+
+@pytest.mark.parametrize("out_args", [["--out"], ["--out", ""]])
+def test_empty_out_falls_back_to_default(tmp_path, monkeypatch, out_args):
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    a.touch()
+    b.touch()
+    calls = []
+    monkeypatch.setattr(strategy, "run_batch", lambda paths, **kwargs: calls.append((paths, kwargs)))
+    monkeypatch.setattr(strategy.sys, "argv", ["strategy.py", str(a), str(b), *out_args])
+
+    strategy.main()
+    paths, kwargs = calls[0]
+    assert paths == [str(a), str(b)]
+    assert kwargs["output"] == "backtest_summary"
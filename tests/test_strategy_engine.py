@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from conftest import random_walk
+from incremental_indicators import IncrementalIndicators
+from strategy_engine import QuantalyticsEngine
+
+COLUMNS = IncrementalIndicators.COLUMNS
+
+# 滑动窗口下的容差：增量模式的 EMA / Wilder 状态带着窗口之前的全部历史，
+# 全量重算只看得到窗口内的 K 线 (从窗口首根重新做 SMA 种子)，差值按 (1-alpha)^窗口长度 衰减。
+# 窗口 200、random_walk(seed=3) 上实测：RSI 最大差 ~3e-5，MACD / MACD_SIG ~1e-6，ATR ~1e-7，
+# 取 atol=1e-4 留出余量；滚动窗口类指标 (BB / SMA / vol) 与历史无关，仍按 1e-9 比较
+RECURSIVE = {'RSI': 1e-4, 'MACD': 1e-4, 'MACD_SIG': 1e-4, 'ATR': 1e-4}
+TIGHT = 1e-9
+
+
+def _assert_row_close(got, expected, atol):
+    for col in COLUMNS:
+        assert np.isclose(got[col], expected[col], rtol=1e-9, atol=atol.get(col, TIGHT), equal_nan=True), \
+            (col, got[col], expected[col])
+
+
+def test_incremental_matches_full_recompute_on_growing_buffer():
+    bars = random_walk(260, seed=2)
+    fast = QuantalyticsEngine(incremental=True)
+    full = QuantalyticsEngine(incremental=False)
+
+    for n in range(fast._min_len(), len(bars) + 1):
+        # 每根 K 线先来一个盘中 tick，再来收盘价 (覆盖同一分钟改写最后一根的路径)
+        ticking = bars.iloc[:n].copy()
+        ticking.iloc[-1, ticking.columns.get_loc('Close')] += 0.15
+        for df in (ticking, bars.iloc[:n]):
+            signal, reason, got = fast.check_signal(df)
+            full_signal, full_reason, expected = full.check_signal(df)
+            assert (signal, reason) == (full_signal, full_reason), n
+            _assert_row_close(got.iloc[-1], expected.iloc[-1], {})
+
+    # 整段指标也一致 (不只是最后一行)
+    np.testing.assert_allclose(got[COLUMNS].to_numpy(), expected[COLUMNS].to_numpy(), rtol=1e-9, atol=TIGHT)
+
+
+def test_incremental_matches_full_recompute_on_sliding_window():
+    bars = random_walk(900, seed=3)
+    window = 200
+    fast = QuantalyticsEngine(incremental=True)
+    full = QuantalyticsEngine(incremental=False)
+
+    for n in range(window, len(bars) + 1):
+        df = bars.iloc[n - window:n]
+        signal, reason, got = fast.check_signal(df)
+        full_signal, _, expected = full.check_signal(df)
+        # 理由里带 RSI 的一位小数，容差内的差值可能在舍入边界上翻转，只比较信号
+        assert signal == full_signal, n
+        _assert_row_close(got.iloc[-1], expected.iloc[-1], RECURSIVE)
+
+    # 增量状态确实一直沿用 (没有每根都退回全量重建)
+    assert fast._stream.rsi.gain.count > window
+
+
+def test_signal_series_replays_check_signal_bar_by_bar():
+    from portfolio_sim import SIGNAL_CODES, compute_signals
+
+    bars = random_walk(220, seed=4)
+    engine = QuantalyticsEngine()
+    series = engine.signal_series(bars)
+    assert series.index.equals(bars.index)
+
+    live = QuantalyticsEngine(incremental=False)
+    expected = [live.check_signal(bars.iloc[:n])[0] for n in range(1, len(bars) + 1)]
+    assert list(series) == expected
+    assert set(expected) > {"NEUTRAL"}
+    # 回放用独立的指标状态，不改动实时路径的缓存
+    assert engine._stream is None
+    assert list(compute_signals(bars)) == [SIGNAL_CODES[s] for s in expected]
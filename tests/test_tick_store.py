@@ -0,0 +1,24 @@
+import pandas as pd
+
+from bar_buffer import BarRingBuffer
+from tick_store import TickStore
+
+MIN = 60 * 10 ** 9
+
+
+def test_new_bar_follows_baseline_rule():
+    store = TickStore(timeframes=('1min', '5min'), bar_capacity=10, tick_capacity=10)
+    t0 = pd.Timestamp("2026-01-05 09:00").value
+    store.add(t0, 600.0)
+    store.add(t0 + 10 ** 9, 601.0)
+
+    # 新的一分钟：开盘沿用上一根收盘，最高/最低只由本分钟报价决定
+    store.add(t0 + MIN, 598.0)
+    assert store.latest('1min')[1:] == (601.0, 598.0, 598.0, 598.0)
+
+    store.add(t0 + MIN + 10 ** 9, 599.5)
+    assert store.latest('1min')[1:] == (601.0, 599.5, 598.0, 599.5)
+    # 5 分钟周期仍在同一根 K 线里
+    assert store.latest('5min')[1:] == (600.0, 601.0, 598.0, 599.5)
+    assert len(store.bars['1min']) == 2
+    assert store.bars['1min'].last(BarRingBuffer.OPEN) == 601.0
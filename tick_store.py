@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from bar_buffer import BarRingBuffer
+from mt_loader import resample_ohlcv
+
+
+DEFAULT_TIMEFRAMES = ('1min', '5min', '15min', '1h')
+
+
+class TickStore:
+    """
+    逐笔报价存储 + 多周期 K 线增量聚合
+    1. 每个报价 (int64 纳秒时间戳, 价格) 写入预分配的环形数组，不再在聚合成 1 分钟 K 线后丢失
+    2. 同一个报价流同时更新 1m/5m/15m/1h 等周期的 K 线环形缓冲区：每个报价对每个周期只是
+       "追加新 K 线" 或 "改写最后一根"，任意周期的最新 K 线都是 O(1) 读取，不再对整段历史重采样
+    新 K 线的开盘价沿用上一根的收盘价，最高/最低价取首个报价 (与 DataHandler 原有的 1 分钟 K 线规则一致)
+    dtype / with_volume 同 BarRingBuffer (紧凑模式)，逐笔价格也按 dtype 存储
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, bar_capacity=3000, tick_capacity=200_000,
+                 dtype=np.float64, with_volume=True):
+        self.timeframes = tuple(timeframes)
+        self.steps = {rule: int(pd.to_timedelta(rule).value) for rule in self.timeframes}
+        self.bars = {rule: BarRingBuffer(capacity=bar_capacity, dtype=dtype, with_volume=with_volume)
+                     for rule in self.timeframes}
+
+        self.tick_capacity = int(tick_capacity)
+        self._tick_ts = np.zeros(self.tick_capacity, dtype=np.int64)
+        self._tick_price = np.zeros(self.tick_capacity, dtype=dtype)
+        self._tick_count = 0  # 累计写入的报价数 (环形写入位置 = count % capacity)
+
+    def __len__(self):
+        return min(self._tick_count, self.tick_capacity)
+
+    def add(self, ts_ns, price):
+        """写入一个报价，并增量更新所有周期的最后一根 K 线"""
+        ts_ns = int(ts_ns)
+        price = float(self._tick_price.dtype.type(price))  # 与存储精度一致
+        i = self._tick_count % self.tick_capacity
+        self._tick_ts[i] = ts_ns
+        self._tick_price[i] = price
+        self._tick_count += 1
+
+        for rule in self.timeframes:
+            bars = self.bars[rule]
+            bucket = ts_ns - ts_ns % self.steps[rule]
+            last_ts = bars.last_ts()
+            if last_ts is None or bucket > last_ts:
+                open_price = price if bars.empty else bars.last(BarRingBuffer.CLOSE)
+                bars.append(bucket, open_price, price, price, price, 0)
+            elif bucket == last_ts:
+                bars.update_last(price)
+            # 早于最后一根的乱序报价只保留在逐笔数组里，不改写已收盘的 K 线
+
+    def seed(self, df):
+        """
+        用 1 分钟历史 K 线初始化各周期 (启动/合并历史时调用一次)
+        高周期由 1 分钟数据重采样得到，之后的报价全部走 add() 增量更新
+        """
+        for rule in self.timeframes:
+            if df is None or df.empty:
+                self.bars[rule].clear()
+            elif self.steps[rule] == self.steps[self.timeframes[0]]:
+                self.bars[rule].load_frame(df)
+            else:
+                self.bars[rule].load_frame(resample_ohlcv(df, rule))
+
+    def latest(self, rule):
+        """某周期最新一根 K 线 -> (时间戳 ns, open, high, low, close)；没有数据返回 None"""
+        bars = self.bars[rule]
+        if bars.empty: return None
+        return (bars.last_ts(), bars.last(BarRingBuffer.OPEN), bars.last(BarRingBuffer.HIGH),
+                bars.last(BarRingBuffer.LOW), bars.last(BarRingBuffer.CLOSE))
+
+    def frame(self, rule):
+        """某周期的全部 K 线 (DataFrame 拷贝)"""
+        return self.bars[rule].to_frame()
+
+    def ticks(self, since_ns=None):
+        """按时间顺序返回 (时间戳数组, 价格数组) 的拷贝；since_ns 只取该时刻之后的报价"""
+        n = len(self)
+        start = self._tick_count % self.tick_capacity if self._tick_count > self.tick_capacity else 0
+        order = (np.arange(n) + start) % self.tick_capacity
+        ts, price = self._tick_ts[order], self._tick_price[order]
+        if since_ns is not None:
+            keep = ts > since_ns
+            ts, price = ts[keep], price[keep]
+        return ts, price